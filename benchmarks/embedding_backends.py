@@ -0,0 +1,105 @@
+"""
+Compares the embedding backends on the chunks of a vault.
+
+Each backend runs in a fresh process, so that its import time and peak
+memory (RSS) aren't skewed by the others:
+
+    $ python benchmarks/embedding_backends.py
+    $ python benchmarks/embedding_backends.py --vault ~/notes --backends onnx onnx-int8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from settings import ENDING, EMBEDDING_BATCH_SIZE
+
+DEFAULT_VAULT = os.path.join(ROOT, "tests", "fixtures", "vault")
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def load_chunks(vault: str, min_chunks: int):
+    from chunking import split_into_chunks
+
+    chunks = []
+    for filename in sorted(os.listdir(vault)):
+        if filename.endswith(ENDING):
+            with open(os.path.join(vault, filename), encoding="utf-8") as f:
+                chunks.extend(split_into_chunks(f.read()))
+    if not chunks:
+        raise SystemExit(f"No notes found in {vault}")
+    # Small vaults (like the fixture) are repeated to get stable timings
+    while len(chunks) < min_chunks:
+        chunks = chunks + chunks
+    return chunks
+
+
+def run_backend(backend: str, vault: str, min_chunks: int) -> dict:
+    """Measures one backend in this process."""
+    chunks = load_chunks(vault, min_chunks)
+
+    started = time.perf_counter()
+    from embedding_backends import create_embedding_function
+    from embedder import Embedder
+
+    embedding_fn = create_embedding_function(backend, MODEL_NAME)
+    embedding_fn(["warm up"])
+    load_seconds = time.perf_counter() - started
+
+    embedder = Embedder(embedding_fn, backend, MODEL_NAME, batch_size=EMBEDDING_BATCH_SIZE, processes=1)
+    started = time.perf_counter()
+    embedder.embed(chunks)
+    seconds = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "chunks": len(chunks),
+        "load_s": round(load_seconds, 2),
+        "chunks_per_s": round(len(chunks) / seconds, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the embedding backends.")
+    parser.add_argument("--vault", default=DEFAULT_VAULT, help="Directory with notes (default: test fixture)")
+    parser.add_argument("--backends", nargs="+", default=["sentence-transformers", "onnx", "onnx-int8"])
+    parser.add_argument("--min-chunks", type=int, default=1024, help="Repeat small vaults up to this many chunks")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_backend(args.child, args.vault, args.min_chunks)))
+        return
+
+    print(f"{'backend':<22} {'chunks':>7} {'load s':>7} {'chunks/s':>9} {'peak RSS MB':>12}")
+    for backend in args.backends:
+        result = subprocess.run(
+            [sys.executable, __file__, "--child", backend, "--vault", args.vault, "--min-chunks", str(args.min_chunks)],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            print(f"{backend:<22} failed: {result.stderr.strip().splitlines()[-1:]}")
+            continue
+        row = json.loads(result.stdout.strip().splitlines()[-1])
+        print(
+            f"{row['backend']:<22} {row['chunks']:>7} {row['load_s']:>7} "
+            f"{row['chunks_per_s']:>9} {row['peak_rss_mb']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
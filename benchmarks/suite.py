@@ -0,0 +1,281 @@
+"""
+Benchmarks keyword and semantic search on synthetic vaults.
+
+For every vault size it measures:
+
+- keyword index: build from scratch, sync after 1% of the notes changed,
+  sync without changes
+- keyword queries: cold (empty note cache, index loaded from disk) and warm
+  latency, unlimited and limited to 10 hits, and the warm time per tier
+- semantic index (with --semantic): build throughput, incremental and
+  no-op sync, query latency with and without the caches
+
+Results are written as JSON. Metrics ending in "_ms" or "_s" are times
+(lower is better), metrics ending in "_per_s" throughputs. With --baseline,
+metrics that got worse by more than --tolerance are listed and the exit
+status is 1:
+
+    $ python benchmarks/suite.py --notes 1000 10000 --output baseline.json
+    $ python benchmarks/suite.py --notes 1000 10000 --baseline baseline.json
+    $ python benchmarks/suite.py --notes 5000 --semantic --vector-store numpy
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_vault import generate_vault, make_vocabulary
+
+FORMAT_VERSION = 1
+SINGLE_WORD_TIERS = [
+    "very_exact_filename", "exact_filename", "substring_filename", "exact_content", "substring_content",
+]
+MULTI_WORD_TIERS = [
+    "very_exact_filename", "exact_filename", "substring_filename", "all_words_filename",
+    "exact_content", "substring_content", "all_words_exact_content", "all_words_content",
+]
+
+
+def timed(function: Callable, *args, **kwargs) -> Tuple[float, object]:
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def median_seconds(function: Callable, repeat: int) -> float:
+    return statistics.median(timed(function)[0] for _ in range(repeat))
+
+
+def ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def make_queries(filenames: List[str], seed: int) -> Dict[str, str]:
+    """Queries of different selectivity, derived from the vault."""
+    vocabulary = make_vocabulary(random.Random(seed))
+    title = filenames[len(filenames) // 2].split(" ", 1)[1][:-len(".md")]
+    return {
+        "title": title.lower(),
+        "common_word": "note",
+        "rare_word": vocabulary[5000],
+        "two_words": "memory learning",
+    }
+
+
+def change_notes(vault: str, filenames: List[str], fraction: float) -> Dict[str, Tuple[str, os.stat_result]]:
+    """Appends a line to every 1/fraction-th note. Returns what restore_notes() needs."""
+    step = max(1, int(1 / fraction))
+    originals = {}
+    for filename in filenames[::step]:
+        path = os.path.join(vault, filename)
+        with open(path, encoding="utf-8") as f:
+            originals[filename] = (f.read(), os.stat(path))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\nAn added line about benchmarks.\n")
+    return originals
+
+
+def restore_notes(vault: str, originals: Dict[str, Tuple[str, os.stat_result]]):
+    for filename, (text, stat) in originals.items():
+        path = os.path.join(vault, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def keyword_benchmarks(vault: str, filenames: List[str], work_dir: str, seed: int, repeat: int) -> Dict[str, float]:
+    from zkss import ZKSearcher
+    from keyword_index import KeywordIndex
+    from note_cache import NoteCache
+
+    index_path = os.path.join(work_dir, "keyword_index")
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+    def searcher(keyword_index=None) -> "ZKSearcher":
+        new = ZKSearcher(vault, ".md", use_keyword_index=True, jobs=1)
+        new.note_cache = NoteCache()
+        new.keyword_index = keyword_index or KeywordIndex(vault, path=index_path)
+        new.console.quiet = True
+        return new
+
+    metrics: Dict[str, float] = {}
+
+    # Index maintenance
+    build = searcher()
+    build.get_sorted_filenames()
+    seconds, _ = timed(build.load_keyword_index)
+    metrics["keyword_index.build_ms"] = ms(seconds)
+    metrics["keyword_index.build_notes_per_s"] = round(len(filenames) / seconds, 1)
+    metrics["keyword_index.noop_sync_ms"] = ms(median_seconds(
+        lambda: (build.get_sorted_filenames(), build.load_keyword_index()), repeat
+    ))
+    originals = change_notes(vault, filenames, 0.01)
+    try:
+        build.get_sorted_filenames()
+        metrics["keyword_index.incremental_sync_ms"] = ms(timed(build.load_keyword_index)[0])
+    finally:
+        restore_notes(vault, originals)
+    build.get_sorted_filenames()
+    build.load_keyword_index()
+
+    for name, query in make_queries(filenames, seed).items():
+        prefix = f"keyword.{name}"
+        for limit, suffix in ((None, ""), (10, "_limit10")):
+            metrics[f"{prefix}.cold{suffix}_ms"] = ms(timed(lambda: list(searcher().iter_hits(query, limit)))[0])
+            warm = searcher()
+            list(warm.iter_hits(query, limit))
+            metrics[f"{prefix}.warm{suffix}_ms"] = ms(median_seconds(lambda: list(warm.iter_hits(query, limit)), repeat))
+        metrics[f"{prefix}.hits"] = sum(1 for _ in warm.iter_hits(query))
+
+        # Time per tier, evaluated one after the other as a limited search does
+        remaining = warm.get_sorted_filenames()
+        tiers = warm.build_tiers(query.lower(), warm.load_keyword_index())
+        labels = MULTI_WORD_TIERS if len(query.split()) > 1 else SINGLE_WORD_TIERS
+        for label, (_, predicate) in zip(labels, tiers):
+            seconds, unmatched = timed(
+                lambda: [f for f, matched in warm.evaluate(remaining, predicate) if not matched]
+            )
+            metrics[f"{prefix}.tier.{label}_ms"] = ms(seconds)
+            remaining = unmatched
+    return metrics
+
+
+def semantic_benchmarks(vault: str, filenames: List[str], work_dir: str, seed: int, repeat: int, vector_store: str) -> Dict[str, float]:
+    from indexer import IndexManager
+
+    db_dir = os.path.join(work_dir, "semantic_index")
+    shutil.rmtree(db_dir, ignore_errors=True)
+
+    class BenchmarkIndexManager(IndexManager):
+        # An absolute path replaces the home directory
+        DB_DIR_NAME = db_dir
+
+    indexer = BenchmarkIndexManager(vault, vector_store=vector_store)
+    indexer.console.quiet = True
+    indexer.warm_up()
+
+    metrics: Dict[str, float] = {}
+    seconds, _ = timed(indexer.update_index)
+    chunks = sum(len(entry.get("chunks") or [None]) for entry in indexer.manifest.entries.values())
+    metrics["semantic_index.build_s"] = round(seconds, 3)
+    metrics["semantic_index.build_notes_per_s"] = round(len(filenames) / seconds, 1)
+    metrics["semantic_index.build_chunks_per_s"] = round(chunks / seconds, 1)
+    metrics["semantic_index.noop_sync_ms"] = ms(median_seconds(indexer.update_index, repeat))
+    originals = change_notes(vault, filenames, 0.01)
+    try:
+        metrics["semantic_index.incremental_sync_ms"] = ms(timed(indexer.update_index)[0])
+    finally:
+        restore_notes(vault, originals)
+    indexer.update_index()
+
+    for name, query in make_queries(filenames, seed).items():
+        def uncached():
+            indexer.result_cache.clear()
+            indexer.query_cache.clear()
+            return indexer.search(query)
+
+        metrics[f"semantic.{name}.query_ms"] = ms(median_seconds(uncached, repeat))
+        metrics[f"semantic.{name}.cached_query_ms"] = ms(median_seconds(lambda: indexer.search(query), repeat))
+    return metrics
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Returns a line for every metric that is worse than in the baseline by more than tolerance."""
+    regressions = []
+    for size, metrics in results["metrics"].items():
+        base_metrics = baseline.get("metrics", {}).get(size, {})
+        for name, value in sorted(metrics.items()):
+            base = base_metrics.get(name)
+            if not base:
+                continue
+            if name.endswith("_per_s"):
+                worse = value < base / (1 + tolerance)
+            elif name.endswith("_ms") or name.endswith("_s"):
+                worse = value > base * (1 + tolerance)
+            else:
+                continue
+            if worse:
+                regressions.append(f"{size} notes: {name} {base} -> {value} ({(value / base - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark zkss on synthetic vaults.")
+    parser.add_argument("--notes", type=int, nargs="+", default=[1000, 10000], help="Vault sizes (default: 1000 10000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per warm measurement (the median is reported)")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "zkss-benchmarks"),
+                        help="Where vaults and indexes are kept (vaults are reused)")
+    parser.add_argument("--semantic", action="store_true", help="Also benchmark the semantic index (needs the model)")
+    parser.add_argument("--semantic-max-notes", type=int, default=10000, help="Skip semantic benchmarks above this size")
+    parser.add_argument("--vector-store", default="chroma", choices=["chroma", "numpy"])
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against the baseline (default: 0.2)")
+    args = parser.parse_args()
+
+    results = {
+        "version": FORMAT_VERSION,
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "vector_store": args.vector_store,
+        },
+        "metrics": {},
+    }
+    for notes in args.notes:
+        vault = os.path.join(args.work_dir, f"vault-{notes}-{args.seed}")
+        seconds, filenames = timed(generate_vault, vault, notes, args.seed)
+        print(f"{notes} notes: vault ready in {seconds:.1f} s", file=sys.stderr)
+
+        work_dir = os.path.join(args.work_dir, f"work-{notes}-{args.seed}")
+        os.makedirs(work_dir, exist_ok=True)
+        metrics = keyword_benchmarks(vault, filenames, work_dir, args.seed, args.repeat)
+        if args.semantic and notes <= args.semantic_max_notes:
+            metrics.update(semantic_benchmarks(vault, filenames, work_dir, args.seed, args.repeat, args.vector_store))
+        results["metrics"][str(notes)] = metrics
+
+        for name, value in metrics.items():
+            print(f"{notes:>7} {name:<55} {value:>12}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
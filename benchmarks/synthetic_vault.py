@@ -0,0 +1,149 @@
+"""
+Generates a deterministic synthetic Zettelkasten for benchmarks.
+
+Notes get Zettel-ID filenames ("202401011200 Some title.md") and a
+realistic, long-tailed size distribution (log-normal: most notes are a few
+hundred words, a few are long). Text is drawn from a Zipf-distributed
+vocabulary, with headings, [[links]] to other notes and #tags. The same
+number of notes and seed always give the same vault, including mtimes and
+access times (which order keyword results).
+
+    $ python benchmarks/synthetic_vault.py /tmp/vault --notes 10000
+"""
+import os
+import json
+import math
+import random
+import argparse
+from datetime import datetime, timedelta
+from typing import List
+
+# Median note size in bytes and the spread of the log-normal distribution
+MEDIAN_BYTES = 1200
+SIGMA = 0.9
+MAX_BYTES = 64 * 1024
+VOCABULARY_SIZE = 20000
+MARKER_FILE = ".synthetic_vault.json"
+
+_SYLLABLES = [
+    "ka", "to", "ri", "mu", "se", "lan", "dor", "vi", "pe", "quo", "ten", "sil", "mar", "no", "ga",
+    "bel", "cra", "fi", "hu", "jo", "lex", "ny", "or", "pha", "stu", "tri", "ul", "wen", "xa", "zed",
+]
+# Common words, so that queries like real ones have something to find
+_COMMON = [
+    "note", "idea", "memory", "learning", "method", "writing", "reading", "garden", "system",
+    "knowledge", "habit", "question", "project", "research", "thinking", "structure", "review",
+]
+
+
+def make_vocabulary(rng: random.Random, size: int = VOCABULARY_SIZE) -> List[str]:
+    words = list(_COMMON)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def note_size(rng: random.Random) -> int:
+    return min(MAX_BYTES, max(80, int(rng.lognormvariate(math.log(MEDIAN_BYTES), SIGMA))))
+
+
+def note_ids(notes: int) -> List[str]:
+    """Unique, ascending Zettel IDs (yyyymmddHHMM), a few hours apart."""
+    start = datetime(2015, 1, 1, 9, 0)
+    return [(start + timedelta(minutes=97 * i)).strftime("%Y%m%d%H%M") for i in range(notes)]
+
+
+class _Words:
+    """Zipf-distributed word sampling (rank r has weight 1/r)."""
+
+    def __init__(self, rng: random.Random, vocabulary: List[str]):
+        self.rng = rng
+        self.vocabulary = vocabulary
+        self.cumulative = []
+        total = 0.0
+        for rank in range(1, len(vocabulary) + 1):
+            total += 1.0 / rank
+            self.cumulative.append(total)
+
+    def sample(self, k: int) -> List[str]:
+        return self.rng.choices(self.vocabulary, cum_weights=self.cumulative, k=k)
+
+
+def note_text(rng: random.Random, words: _Words, title: str, ids: List[str], size: int) -> str:
+    parts = [f"# {title}", ""]
+    length = len(title) + 3
+    while length < size:
+        if rng.random() < 0.15:
+            line = "## " + " ".join(words.sample(rng.randint(1, 4))).capitalize()
+        else:
+            sentence_words = words.sample(rng.randint(8, 30))
+            if rng.random() < 0.3:
+                sentence_words.insert(rng.randrange(len(sentence_words)), f"[[{rng.choice(ids)}]]")
+            if rng.random() < 0.1:
+                sentence_words.append(f"#{words.sample(1)[0]}")
+            line = " ".join(sentence_words).capitalize() + "."
+        parts.append(line)
+        parts.append("")
+        length += len(line) + 2
+    return "\n".join(parts)
+
+
+def generate_vault(path: str, notes: int, seed: int = 0) -> List[str]:
+    """
+    Writes the vault to path (reusing it if it was generated with the same
+    parameters) and returns the filenames, oldest first.
+    """
+    marker = os.path.join(path, MARKER_FILE)
+    params = {"notes": notes, "seed": seed, "version": 1}
+    try:
+        with open(marker, encoding="utf-8") as f:
+            existing = json.load(f)
+        if existing["params"] == params:
+            return existing["filenames"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".md"):
+            os.remove(os.path.join(path, name))
+
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    words = _Words(rng, vocabulary)
+    ids = note_ids(notes)
+    filenames = []
+    base_time = datetime(2024, 1, 1).timestamp()
+    for i, zettel_id in enumerate(ids):
+        title = " ".join(words.sample(rng.randint(1, 5))).capitalize()
+        filename = f"{zettel_id} {title}.md"
+        with open(os.path.join(path, filename), "w", encoding="utf-8") as f:
+            f.write(note_text(rng, words, title, ids, note_size(rng)))
+        # Older notes were changed earlier; access times are random
+        mtime = base_time + i * 60
+        atime = base_time + rng.randrange(notes) * 60
+        os.utime(os.path.join(path, filename), (atime, mtime))
+        filenames.append(filename)
+
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump({"params": params, "filenames": filenames}, f)
+    return filenames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Zettelkasten.")
+    parser.add_argument("path", help="Directory to write the notes to")
+    parser.add_argument("--notes", type=int, default=1000, help="Number of notes (default: 1000)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    filenames = generate_vault(args.path, args.notes, args.seed)
+    total = sum(os.path.getsize(os.path.join(args.path, f)) for f in filenames)
+    print(f"{len(filenames)} notes, {total / 1024 / 1024:.1f} MB in {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import threading
+from typing import Optional
+
+
+class SearchCancelled(Exception):
+    """Raised in a worker thread when the request it serves has been cancelled."""
+
+
+def check_cancelled(cancel_event: Optional[threading.Event]):
+    """Raises SearchCancelled if cancel_event is set (no-op without an event)."""
+    if cancel_event is not None and cancel_event.is_set():
+        raise SearchCancelled()
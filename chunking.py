@@ -0,0 +1,83 @@
+import re
+from typing import List
+
+from settings import CHUNK_MAX_CHARS
+
+HEADING_PATTERN = re.compile(r"^#{1,6}\s", re.MULTILINE)
+PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n")
+
+
+def split_into_chunks(text: str, max_chars: int = CHUNK_MAX_CHARS) -> List[str]:
+    """
+    Splits a note into chunks of at most max_chars characters for embedding.
+
+    Notes are split at Markdown headings first, then at paragraphs, which are
+    packed together while they fit. Oversized paragraphs are split at sentence
+    and line ends (or hard, as a last resort). Continuation chunks of a section
+    start with its heading, so they keep their context.
+    """
+    chunks = []
+    for section in _split_sections(text):
+        heading = ""
+        body = section
+        if HEADING_PATTERN.match(section):
+            heading, _, body = section.partition("\n")
+            # Very long headings are left to the first chunk only
+            if len(heading) > max_chars // 2:
+                heading, body = "", section
+        prefix = f"{heading}\n\n" if heading else ""
+        budget = max_chars - len(prefix)
+
+        current = ""
+        for piece in _pieces(body, budget):
+            candidate = f"{current}\n\n{piece}" if current else piece
+            if len(candidate) <= budget:
+                current = candidate
+                continue
+            chunks.append(prefix + current)
+            current = piece
+        if current:
+            chunks.append(prefix + current)
+        elif heading:
+            chunks.append(heading)
+    return chunks
+
+
+def _split_sections(text: str) -> List[str]:
+    starts = [match.start() for match in HEADING_PATTERN.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    bounds = starts + [len(text)]
+    sections = (text[start:end].strip() for start, end in zip(bounds, bounds[1:]))
+    return [section for section in sections if section]
+
+
+def _pieces(section: str, max_chars: int) -> List[str]:
+    """Paragraphs of a section, with paragraphs longer than max_chars split up."""
+    pieces = []
+    for paragraph in PARAGRAPH_PATTERN.split(section):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        current = ""
+        for sentence in SENTENCE_PATTERN.split(paragraph):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            candidate = f"{current} {sentence}" if current else sentence
+            if len(candidate) <= max_chars:
+                current = candidate
+                continue
+            if current:
+                pieces.append(current)
+            while len(sentence) > max_chars:
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            current = sentence
+        if current:
+            pieces.append(current)
+    return pieces
@@ -0,0 +1,88 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+from settings import EMBEDDING_BATCH_SIZE, EMBEDDING_PROCESSES
+from embedding_backends import create_embedding_function
+
+# Embedding function of an encoding worker process (see _init_worker)
+_worker_fn = None
+
+
+def _init_worker(backend: str, model_name: str):
+    global _worker_fn
+    # One thread per process; the processes themselves use the cores
+    _worker_fn = create_embedding_function(backend, model_name, threads=1)
+
+
+def _encode_in_worker(texts: List[str]) -> List[List[float]]:
+    return [_as_list(vector) for vector in _worker_fn(texts)]
+
+
+def _as_list(vector) -> List[float]:
+    return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+
+class Embedder:
+    """
+    Embeds documents for the index in batches of similar length, which keeps
+    padding (and so wasted model work) low.
+
+    Batches are encoded by embedding_fn in this process, or, after
+    start_pool(), spread over worker processes that each load the model.
+    """
+
+    def __init__(
+        self,
+        embedding_fn: Callable[[List[str]], Sequence],
+        backend: str,
+        model_name: str,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        processes: int = EMBEDDING_PROCESSES,
+    ):
+        self.embedding_fn = embedding_fn
+        self.backend = backend
+        self.model_name = model_name
+        self.batch_size = batch_size
+        # 0 = one process per CPU core
+        self.processes = processes or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start_pool(self) -> bool:
+        """Starts the worker processes (if configured); returns True if they are used."""
+        if self._pool is None and self.processes > 1:
+            # Spawned, not forked: forking a process that already runs model
+            # and server threads can deadlock the children. Each worker loads
+            # the model itself (_init_worker).
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.backend, self.model_name),
+            )
+        return self._pool is not None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Returns one vector per text, in the order of texts."""
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [
+            [texts[i] for i in order[start:start + self.batch_size]]
+            for start in range(0, len(order), self.batch_size)
+        ]
+        if self._pool is not None:
+            results = self._pool.map(_encode_in_worker, batches)
+        else:
+            results = (self.embedding_fn(batch) for batch in batches)
+
+        vectors: List[List[float]] = [None] * len(texts)
+        positions = iter(order)
+        for batch_vectors in results:
+            for vector in batch_vectors:
+                vectors[next(positions)] = _as_list(vector)
+        return vectors
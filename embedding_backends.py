@@ -0,0 +1,153 @@
+import platform
+import threading
+from typing import List, Optional
+
+BACKENDS = ("sentence-transformers", "onnx", "onnx-int8")
+
+# Exports of the sentence-transformers models on the Hugging Face Hub
+HUB_ORGANIZATION = "sentence-transformers"
+ONNX_MODEL_FILE = "onnx/model.onnx"
+# Dynamically quantized weights, per CPU architecture
+ONNX_INT8_MODEL_FILES = {
+    "arm64": "onnx/model_qint8_arm64.onnx",
+    "aarch64": "onnx/model_qint8_arm64.onnx",
+}
+ONNX_INT8_DEFAULT_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+def embedding_model_id(backend: str, model_name: str) -> str:
+    """
+    Identifies the vectors a backend produces. The full-precision backends
+    compute the same vectors; int8 weights give slightly different ones,
+    which shouldn't be mixed with them in one index.
+    """
+    if backend == "onnx-int8":
+        return f"{model_name} (int8)"
+    return model_name
+
+
+def create_embedding_function(backend: str, model_name: str, threads: Optional[int] = None):
+    """
+    Returns a callable that embeds a list of texts with the given backend.
+    threads limits the CPU threads used for inference (None = library default).
+    """
+    if backend == "sentence-transformers":
+        return SentenceTransformerEmbeddingFunction(model_name, threads=threads)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEmbeddingFunction(model_name, quantized=backend == "onnx-int8", threads=threads)
+    raise ValueError(f"Unknown embedding backend: {backend!r} (choose from {', '.join(BACKENDS)})")
+
+
+class SentenceTransformerEmbeddingFunction:
+    """
+    Embeds texts with the sentence-transformers model (torch). The model is
+    loaded on first use, so creating the function imports neither torch nor
+    the vector store.
+    """
+
+    def __init__(self, model_name: str, threads: Optional[int] = None):
+        self.model_name = model_name
+        self.threads = threads
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is not None:
+                return
+            from sentence_transformers import SentenceTransformer
+
+            if self.threads:
+                import torch
+
+                torch.set_num_threads(self.threads)
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+
+    def __call__(self, input: List[str]) -> List:
+        import numpy as np
+
+        if self._model is None:
+            self._load()
+        if not input:
+            return []
+        vectors = self._model.encode(list(input), convert_to_numpy=True)
+        return list(np.asarray(vectors, dtype=np.float32))
+
+
+class OnnxEmbeddingFunction:
+    """
+    Embeds texts with ONNX Runtime on the CPU, without torch.
+
+    Reproduces the sentence-transformers pipeline of the MiniLM models
+    (truncation to max_length tokens, mean pooling, L2 normalization), using
+    the ONNX export published with the model. The model is loaded on first use.
+    """
+
+    def __init__(self, model_name: str, quantized: bool = False, threads: Optional[int] = None, max_length: int = 256):
+        self.model_name = model_name
+        self.quantized = quantized
+        self.threads = threads
+        self.max_length = max_length
+        self._session = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_file(self) -> str:
+        if not self.quantized:
+            return ONNX_MODEL_FILE
+        return ONNX_INT8_MODEL_FILES.get(platform.machine().lower(), ONNX_INT8_DEFAULT_FILE)
+
+    def _load(self):
+        with self._lock:
+            if self._session is not None:
+                return
+            import onnxruntime
+            from huggingface_hub import hf_hub_download
+            from tokenizers import Tokenizer
+
+            repo_id = f"{HUB_ORGANIZATION}/{self.model_name}"
+            try:
+                tokenizer_path = hf_hub_download(repo_id, "tokenizer.json")
+                model_path = hf_hub_download(repo_id, self.model_file)
+            except Exception as e:
+                raise RuntimeError(
+                    f"The ONNX model files of {repo_id} are not available ({e}). "
+                    "Run once with HF_HUB_OFFLINE=0 to download them."
+                ) from e
+            tokenizer = Tokenizer.from_file(tokenizer_path)
+            tokenizer.enable_truncation(max_length=self.max_length)
+            tokenizer.enable_padding()
+
+            options = onnxruntime.SessionOptions()
+            if self.threads:
+                options.intra_op_num_threads = self.threads
+            self._session = onnxruntime.InferenceSession(
+                model_path,
+                sess_options=options,
+                providers=["CPUExecutionProvider"],
+            )
+            self._tokenizer = tokenizer
+
+    def __call__(self, input: List[str]) -> List:
+        import numpy as np
+
+        if self._session is None:
+            self._load()
+        if not input:
+            return []
+
+        encodings = self._tokenizer.encode_batch(list(input))
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        wanted = {model_input.name for model_input in self._session.get_inputs()}
+        token_embeddings = self._session.run(None, {k: v for k, v in inputs.items() if k in wanted})[0]
+
+        # Mean pooling over the real (unpadded) tokens, then L2 normalization
+        mask = inputs["attention_mask"][..., None].astype(token_embeddings.dtype)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return list((pooled / norms).astype(np.float32))
@@ -0,0 +1,126 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from settings import ZK_BASE_DIR, ENDING, DEFAULT_RESULTS, HYBRID_CANDIDATES, HYBRID_RRF_K
+from keyword_index import KeywordIndex, split_words
+from cancellation import check_cancelled
+from profiling import Profiler
+
+
+class HybridResult(NamedTuple):
+    filenames: List[str]
+    # Stage name -> seconds
+    timings: Dict[str, float]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = HYBRID_RRF_K) -> List[Tuple[str, float]]:
+    """
+    Fuses rankings (best first) into one: each note scores 1 / (k + rank) in
+    every ranking it appears in. Returns (filename, score) pairs, best first.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, filename in enumerate(ranking, start=1):
+            scores[filename] = scores.get(filename, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+# Stages of a hybrid search, in reporting order (the two rankings run concurrently)
+STAGES = ("keyword_index", "bm25", "semantic_index", "vector", "fusion", "total")
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """E.g. "keyword_index 12.3 ms, bm25 0.4 ms, ..." for the stages that ran."""
+    return ", ".join(f"{stage} {timings[stage] * 1000:.1f} ms" for stage in STAGES if stage in timings)
+
+
+class HybridSearcher:
+    """
+    Combines keyword and semantic search: a BM25 ranking from the keyword
+    index and the vector search run concurrently, and their results are
+    fused with reciprocal rank fusion.
+    """
+
+    def __init__(
+        self,
+        indexer,
+        base_dir: str = ZK_BASE_DIR,
+        ending: str = ENDING,
+        keyword_index: Optional[KeywordIndex] = None,
+        profiler: Optional[Profiler] = None,
+    ):
+        self.indexer = indexer
+        self.base_dir = base_dir
+        self.ending = ending
+        # Loaded on first use and kept for later searches
+        self.keyword_index = keyword_index
+        # Receives the stage timings (as "hybrid.<stage>") and the keyword index sync
+        self.profiler = profiler or Profiler()
+
+    def search(
+        self,
+        query: str,
+        limit: int = DEFAULT_RESULTS,
+        update_index: bool = True,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> HybridResult:
+        """
+        Returns the best `limit` notes and how long each stage took. With
+        update_index, the semantic index is synced first (skip it if a
+        watcher keeps the index current).
+        """
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        candidates = max(limit, HYBRID_CANDIDATES)
+
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="zkss-hybrid") as executor:
+            keyword = executor.submit(self._keyword_ranking, query, candidates, cancel_event, timings)
+            semantic = executor.submit(self._semantic_ranking, query, candidates, update_index, cancel_event, timings)
+            rankings = [keyword.result(), semantic.result()]
+
+        fusion_started = time.perf_counter()
+        fused = reciprocal_rank_fusion(rankings)
+        timings["fusion"] = time.perf_counter() - fusion_started
+        timings["total"] = time.perf_counter() - started
+        for stage in STAGES:
+            if stage in timings:
+                self.profiler.add(f"hybrid.{stage}", timings[stage])
+        return HybridResult([filename for filename, _ in fused[:limit]], timings)
+
+    def _keyword_ranking(self, query: str, candidates: int, cancel_event, timings: Dict[str, float]) -> List[str]:
+        from zkss import ZKSearcher
+
+        started = time.perf_counter()
+        # BM25 needs the keyword index, even if keyword search doesn't use it
+        searcher = ZKSearcher(self.base_dir, self.ending, use_keyword_index=True)
+        searcher.cancel_event = cancel_event
+        searcher.keyword_index = self.keyword_index
+        searcher.profiler = self.profiler
+        searcher.get_sorted_filenames()
+        index = searcher.load_keyword_index()
+        self.keyword_index = searcher.keyword_index
+        timings["keyword_index"] = time.perf_counter() - started
+        check_cancelled(cancel_event)
+        if index is None:
+            return []
+
+        started = time.perf_counter()
+        ranking = index.bm25(split_words(query.lower()), limit=candidates)
+        timings["bm25"] = time.perf_counter() - started
+        return [filename for filename, _ in ranking]
+
+    def _semantic_ranking(
+        self, query: str, candidates: int, update_index: bool, cancel_event, timings: Dict[str, float]
+    ) -> List[str]:
+        if update_index:
+            started = time.perf_counter()
+            self.indexer.update_index(cancel_event=cancel_event)
+            timings["semantic_index"] = time.perf_counter() - started
+        check_cancelled(cancel_event)
+
+        started = time.perf_counter()
+        filenames = self.indexer.search(query, n_results=candidates)
+        timings["vector"] = time.perf_counter() - started
+        return filenames
@@ -1,150 +1,529 @@
 import os
 import time
-from typing import List, Dict, Optional
+import atexit
+import weakref
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Dict, NamedTuple, Optional, Tuple
 
 # Use the locally cached embedding model; skip Hugging Face Hub checks on every run.
 os.environ.setdefault("HF_HUB_OFFLINE", "1")
 os.environ.setdefault("HF_HUB_DISABLE_PROGRESS_BARS", "1")
 
-import chromadb
-from chromadb.utils import embedding_functions
 from rich.console import Console
 from rich.progress import track
 
-from settings import ZK_BASE_DIR, ENDING, DEFAULT_RESULTS
+from settings import (
+    ZK_BASE_DIR,
+    ENDING,
+    DEFAULT_RESULTS,
+    SEMANTIC_CHUNKS_PER_RESULT,
+    SEMANTIC_POOLING_TOP_K,
+    INDEX_READ_WORKERS,
+    INDEX_BATCH_BYTES,
+    EMBEDDING_PROCESS_MIN_NOTES,
+    EMBEDDING_BACKEND,
+    VECTOR_STORE,
+    RESULT_CACHE_SIZE,
+)
+from chunking import split_into_chunks
+from embedder import Embedder
+from embedding_backends import create_embedding_function, embedding_model_id
+from note_cache import note_cache
+from vault_snapshot import vault_snapshots
+from cancellation import check_cancelled
+from watcher import IndexWatcher
+from manifest import IndexManifest, content_hash
+from query_cache import LRUCache, QueryEmbeddingCache, normalize_query
+from vector_store import NumpyVectorStore
+from profiling import Profiler
+
+VECTOR_STORES = ("chroma", "numpy")
+
+# Query caches of the live IndexManagers, saved once at exit (without keeping
+# replaced managers alive)
+_query_caches: "weakref.WeakSet[QueryEmbeddingCache]" = weakref.WeakSet()
+
+
+@atexit.register
+def _save_query_caches():
+    for query_cache in list(_query_caches):
+        query_cache.save()
+
+
+class SemanticHit(NamedTuple):
+    """A note found by semantic search: its pooled similarity and the hash of its best chunk (None for whole-note documents)."""
+    filename: str
+    score: float
+    chunk_hash: Optional[str]
+
 
 class IndexManager:
     DB_DIR_NAME = ".zkss_index"
     COLLECTION_NAME = "zettelkasten"
     MODEL_NAME = "all-MiniLM-L6-v2"
 
-    def __init__(self, base_dir: str = ZK_BASE_DIR):
+    def __init__(self, base_dir: str = ZK_BASE_DIR, backend: str = EMBEDDING_BACKEND, vector_store: str = VECTOR_STORE):
+        if vector_store not in VECTOR_STORES:
+            raise ValueError(f"Unknown vector store: {vector_store!r} (choose from {', '.join(VECTOR_STORES)})")
         self.base_dir = base_dir
+        self.backend = backend
+        self.vector_store = vector_store
+        # What the stored vectors were made with (see embedding_model_id)
+        self.model_id = embedding_model_id(backend, self.MODEL_NAME)
         self.db_path = os.path.join(os.path.expanduser("~"), self.DB_DIR_NAME)
         # Status/progress output must never land on stdout: it is either
         # informational (CLI) or would corrupt the JSON-RPC stream (MCP).
         self.console = Console(stderr=True)
+        self.note_cache = note_cache
+        # Stages of index updates and searches (replaced by a searcher that reports them)
+        self.profiler = Profiler()
+        # Serializes index writes (query-time syncs, watcher, reconciliation)
+        self._write_lock = threading.RLock()
+        # The NumPy store lives in a subdirectory, with its own manifest
+        store_path = self.db_path
+        if vector_store == "numpy":
+            store_path = os.path.join(self.db_path, NumpyVectorStore.DIR_NAME)
+        # Local record of the indexed notes, next to the stored vectors
+        self.manifest = IndexManifest(os.path.join(store_path, IndexManifest.FILE_NAME), base_dir)
         
-        # Initialize ChromaDB
+        # Notes and queries are embedded by us (in batches, possibly in worker
+        # processes) and stored with their vectors, so the collection needs no
+        # embedding function (nor torch, with the ONNX backends).
+        self.embedding_fn = create_embedding_function(backend, self.MODEL_NAME)
+        self.embedder = Embedder(self.embedding_fn, backend, self.MODEL_NAME)
+
+        # Repeated queries skip the model (and, while the index is unchanged, Chroma)
+        self.query_cache = QueryEmbeddingCache(os.path.join(self.db_path, QueryEmbeddingCache.FILE_NAME), self.model_id)
+        self.query_cache.load()
+        _query_caches.add(self.query_cache)
+        self.result_cache = LRUCache(RESULT_CACHE_SIZE)
+
+        # Both stores offer the same (Chroma collection) interface
+        self.client = None
+        if vector_store == "numpy":
+            self.collection = NumpyVectorStore(store_path)
+        else:
+            self.collection = self._open_chroma()
+
+    def _open_chroma(self):
+        # Imported here, so that the NumPy store doesn't pay for it
+        import chromadb
+
         self.client = chromadb.PersistentClient(path=self.db_path)
-        
-        # Use Sentence Transformer for embeddings
-        self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name=self.MODEL_NAME
-        )
-        
-        self.collection = self.client.get_or_create_collection(
+        return self.client.get_or_create_collection(
             name=self.COLLECTION_NAME,
-            embedding_function=self.embedding_fn,
+            embedding_function=None,
             metadata={"hnsw:space": "cosine"}
         )
 
-    def _get_all_files(self) -> Dict[str, float]:
-        """Returns a dict of {filename: mtime} for all valid zettels."""
-        files = {}
+    def warm_up(self):
+        """Loads the embedding model by embedding a short text, so the first query doesn't wait for it."""
+        self.embedding_fn(["warm up"])
+
+    def watched_elsewhere(self) -> bool:
+        """True if another process (`zkss --watch`) keeps this index current."""
+        return IndexWatcher.running_elsewhere(self.db_path)
+
+    def _get_all_files(self) -> Dict[str, Tuple[float, int]]:
+        """Returns a dict of {filename: (mtime, size)} for all valid zettels (from the shared snapshot)."""
         try:
-            for f in os.listdir(self.base_dir):
-                full_path = os.path.join(self.base_dir, f)
-                if os.path.isfile(full_path) and f.endswith(ENDING):
-                    files[f] = os.path.getmtime(full_path)
+            notes = vault_snapshots.get(self.base_dir, ENDING)
         except FileNotFoundError:
             self.console.print(f"[red]Directory not found: {self.base_dir}[/red]")
-        return files
+            return {}
+        return {filename: (note.mtime, note.size) for filename, note in notes.items()}
 
-    def update_index(self, force_reindex: bool = False):
+    def _load_manifest(self):
+        """
+        Makes sure the manifest is loaded. Without one (first run after an
+        upgrade), it is built once from the metadata stored in Chroma.
+        """
+        if self.manifest.load():
+            return
+        existing_data = self.collection.get(include=['metadatas'])
+        self.manifest.entries = {}
+        # The model is fixed per release, so existing vectors were made with it
+        self.manifest.model = self.MODEL_NAME
+        for id_, meta in zip(existing_data['ids'], existing_data['metadatas']):
+            meta = meta or {}
+            parent = meta.get('parent')
+            if parent is None:
+                # Whole-note document from before chunking
+                self.manifest.set(id_, meta.get('mtime', 0), meta.get('size'), meta.get('hash'))
+                continue
+            if parent not in self.manifest.entries:
+                # Unknown mtime: the note is re-checked, its stored chunks are kept
+                self.manifest.set(parent, 0, None, None, [])
+            self.manifest.entries[parent]["chunks"].append(meta['hash'])
+        self.manifest.save()
+
+    def update_index(
+        self, force_reindex: bool = False, cancel_event: Optional[threading.Event] = None
+    ):
         """
         Synchronizes the vector index with the filesystem.
         Adds new/modified files, removes deleted ones.
+        If cancel_event gets set, raises SearchCancelled; batches upserted so far
+        are kept and the rest is picked up by the next update.
         """
-        current_files = self._get_all_files()
+        with self._write_lock, self.profiler.stage("index_update"):
+            self._sync(force_reindex, cancel_event)
+
+    def _sync(self, force_reindex: bool, cancel_event: Optional[threading.Event]):
+        with self.profiler.stage("index_scan"):
+            current_files = self._get_all_files()
         
         if not current_files:
             return
 
-        # Get existing IDs from DB
-        existing_data = self.collection.get(include=['metadatas'])
-        existing_ids = set(existing_data['ids'])
-        existing_metadata = {
-            id_: meta 
-            for id_, meta in zip(existing_data['ids'], existing_data['metadatas']) 
-            if meta
-        }
-
-        # Determine changes
-        to_add = []
-        to_update = []
-        to_delete = []
-
-        for filename, mtime in current_files.items():
-            if filename not in existing_ids:
-                to_add.append(filename)
-            else:
-                stored_mtime = existing_metadata.get(filename, {}).get('mtime', 0)
-                # Check for update with floating point tolerance (1ms)
-                # Only update if filesystem mtime is significantly NEWER than stored mtime
-                if not force_reindex and (mtime - stored_mtime) > 0.001:
-                    to_update.append(filename)
-                elif force_reindex:
-                    to_update.append(filename)
-        
-        for filename in existing_ids:
-            if filename not in current_files:
-                to_delete.append(filename)
-
-        # Execute changes
-        if to_delete:
-            self.console.print(f"[yellow]Removing {len(to_delete)} deleted files from index...[/yellow]")
-            self.collection.delete(ids=to_delete)
-
-        files_to_process = to_add + to_update
-        if files_to_process:
-            self.console.print(f"[green]Indexing {len(files_to_process)} files...[/green]")
-            
-            ids = []
-            documents = []
-            metadatas = []
-
-            for filename in track(files_to_process, description="Embedding...", console=self.console):
-                try:
-                    with open(os.path.join(self.base_dir, filename), "r", errors="ignore") as f:
-                        content = f.read()
-                    
-                    ids.append(filename)
-                    documents.append(content)
-                    metadatas.append({"mtime": current_files[filename]})
-                    
-                    # Batch processing to avoid memory issues with huge lists
-                    if len(ids) >= 100:
-                        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
-                        ids = []
-                        documents = []
-                        metadatas = []
-                except Exception as e:
-                    self.console.print(f"[red]Error reading {filename}: {e}[/red]")
-
-            # Process remaining batch
+        # Changes are found by comparing with the local manifest; Chroma is
+        # only touched for the notes that actually changed.
+        with self.profiler.stage("index_diff"):
+            self._load_manifest()
+            # Vectors from another model can't be reused or mixed with new ones
+            model_changed = self.manifest.model not in (None, self.model_id)
+            to_process = [
+                filename
+                for filename, (mtime, size) in current_files.items()
+                if force_reindex or model_changed or not self.manifest.is_current(filename, mtime, size)
+            ]
+            to_delete = [filename for filename in self.manifest.entries if filename not in current_files]
+
+        if model_changed:
+            self.console.print(
+                f"[yellow]Embedding model changed to {self.model_id}; re-embedding all notes...[/yellow]"
+            )
+
+        # Index before deleting, so that renamed notes can take over the
+        # vectors of their old name.
+        self._index_files(to_process, current_files, cancel_event, reuse_vectors=not model_changed)
+        self._delete_files(to_delete)
+
+        if self.manifest.model != self.model_id:
+            self.manifest.model = self.model_id
+            self.manifest.save()
+
+    @staticmethod
+    def _chunk_id(filename: str, chunk_hash: str) -> str:
+        return f"{filename}#{chunk_hash}"
+
+    def _chunk_ids(self, filename: str) -> List[str]:
+        """Ids of the documents stored in Chroma for an indexed note."""
+        entry = self.manifest.entries.get(filename)
+        if entry is None:
+            return []
+        if entry.get("chunks") is None:
+            # Indexed as a whole, before chunking
+            return [filename]
+        return [self._chunk_id(filename, chunk_hash) for chunk_hash in entry["chunks"]]
+
+    def _delete_files(self, filenames: List[str]):
+        if filenames:
+            self.console.print(f"[yellow]Removing {len(filenames)} deleted files from index...[/yellow]")
+            ids = [chunk_id for filename in filenames for chunk_id in self._chunk_ids(filename)]
             if ids:
-                self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
-            
-            self.console.print("[bold green]Index updated successfully![/bold green]")
-        else:
-            if not to_delete:
-                pass 
-                # self.console.print("Index is up to date.") 
+                self.collection.delete(ids=ids)
+            self.manifest.remove(filenames)
+            self.manifest.generation += 1
+            self.manifest.save()
+
+    def _copy(self, ids: List[str], documents: List[str], metadatas: List[dict], source_ids: List[str]):
+        """Stores chunks under ids with the vectors already indexed for source_ids (same content)."""
+        stored = self.collection.get(ids=sorted(set(source_ids)), include=['embeddings'])
+        vectors = dict(zip(stored['ids'], stored['embeddings']))
+        # Sources deleted in the meantime are embedded from scratch
+        missing = [i for i, source in enumerate(source_ids) if source not in vectors]
+        new_vectors = dict(zip(missing, self.embedder.embed([documents[i] for i in missing])))
+        self.collection.upsert(
+            ids=ids,
+            embeddings=[new_vectors[i] if i in new_vectors else vectors[source_ids[i]] for i in range(len(ids))],
+            documents=documents,
+            metadatas=metadatas,
+        )
+
+    def _write_batch(self, to_embed, to_copy, stale_ids: List[str], notes: List[tuple]):
+        """Stores a batch of chunks, then records the notes they belong to in the manifest."""
+        with self.profiler.stage("index_write"):
+            self._store_batch(to_embed, to_copy, stale_ids, notes)
+
+    def _store_batch(self, to_embed, to_copy, stale_ids: List[str], notes: List[tuple]):
+        if to_copy[0]:
+            self._copy(*to_copy)
+        if to_embed[0]:
+            ids, documents, metadatas, embeddings = to_embed
+            self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+        if stale_ids:
+            self.collection.delete(ids=stale_ids)
+        for filename, mtime, size, digest, chunk_hashes in notes:
+            self.manifest.set(filename, mtime, size, digest, chunk_hashes)
+        if to_copy[0] or to_embed[0] or stale_ids:
+            self.manifest.generation += 1
+        self.manifest.save()
+
+    def _submit_batch(self, writer: ThreadPoolExecutor, pending_write: Optional[Future], to_embed, to_copy, stale_ids, notes) -> Future:
+        """Embeds a batch and hands it to the writer thread once the previous batch is written."""
+        vectors = []
+        if to_embed[0]:
+            with self.profiler.stage("embed"):
+                vectors = self.embedder.embed(to_embed[1])
+        if pending_write is not None:
+            # Raises errors of the previous batch, and keeps at most one batch queued
+            pending_write.result()
+        return writer.submit(self._write_batch, to_embed + (vectors,), to_copy, stale_ids, notes)
+
+    def _read_note(self, filename: str) -> str:
+        return self.note_cache.text(os.path.join(self.base_dir, filename))
+
+    def _read_notes(self, filenames: List[str], readers: ThreadPoolExecutor) -> Iterator[Tuple[str, object]]:
+        """
+        Yields (filename, content) in order, reading ahead on the reader threads.
+        If a note can't be read, the exception is yielded instead of its content.
+        """
+        names = iter(filenames)
+        pending = deque(
+            (filename, readers.submit(self._read_note, filename))
+            for filename in islice(names, 4 * INDEX_READ_WORKERS)
+        )
+        while pending:
+            filename, future = pending.popleft()
+            next_name = next(names, None)
+            if next_name is not None:
+                pending.append((next_name, readers.submit(self._read_note, next_name)))
+            try:
+                content = future.result()
+            except Exception as e:
+                content = e
+            yield filename, content
+
+    def _index_files(
+        self,
+        files_to_process: List[str],
+        current_files: Dict[str, Tuple[float, int]],
+        cancel_event: Optional[threading.Event] = None,
+        reuse_vectors: bool = True,
+    ):
+        """
+        Splits the given notes into chunks and embeds the chunks that aren't
+        indexed yet. Each chunk is stored with the note it belongs to
+        ("parent") and its hash. With reuse_vectors, notes whose content hash
+        is unchanged aren't chunked again, and chunks that are already indexed
+        (in the same note or, e.g. after a rename, another one) keep their
+        stored vectors.
+
+        Reading notes, encoding and writing to Chroma overlap: notes are read
+        ahead on reader threads, and each batch is written by a background
+        thread while the next one is encoded.
+        """
+        if not files_to_process:
+            return
+
+        self.console.print(f"[green]Indexing {len(files_to_process)} files...[/green]")
+
+        indexed_chunks = self.manifest.chunks_by_hash() if reuse_vectors else {}
+        to_embed, to_copy, stale_ids, notes = ([], [], []), ([], [], [], []), [], []
+        batch_bytes = 0
+        embedded = reused = 0
+        pending_write = None
+
+        if len(files_to_process) >= EMBEDDING_PROCESS_MIN_NOTES and self.embedder.start_pool():
+            self.console.print(f"[green]Encoding in {self.embedder.processes} processes...[/green]")
+        try:
+            with ThreadPoolExecutor(max_workers=INDEX_READ_WORKERS) as readers, \
+                    ThreadPoolExecutor(max_workers=1) as writer:
+                notes_read = self._read_notes(files_to_process, readers)
+                for filename, content in track(
+                    notes_read, total=len(files_to_process), description="Embedding...", console=self.console
+                ):
+                    check_cancelled(cancel_event)
+                    if isinstance(content, Exception):
+                        self.console.print(f"[red]Error reading {filename}: {content}[/red]")
+                        continue
+                    mtime, size = current_files[filename]
+                    digest = content_hash(content)
+
+                    entry = self.manifest.entries.get(filename)
+                    if reuse_vectors and entry is not None and entry.get("hash") == digest and entry.get("chunks") is not None:
+                        # Only the mtime was bumped (sync clients, editors, forced reindex)
+                        notes.append((filename, mtime, size, digest, entry["chunks"]))
+                        reused += len(entry["chunks"])
+                        continue
+
+                    old_ids = set(self._chunk_ids(filename))
+                    chunk_hashes = []
+                    for text in split_into_chunks(content):
+                        chunk_hash = content_hash(text)
+                        if chunk_hash in chunk_hashes:
+                            continue
+                        chunk_hashes.append(chunk_hash)
+                        chunk_id = self._chunk_id(filename, chunk_hash)
+                        meta = {"parent": filename, "hash": chunk_hash}
+                        if reuse_vectors and chunk_id in old_ids:
+                            reused += 1
+                        elif chunk_hash in indexed_chunks:
+                            source_id = self._chunk_id(indexed_chunks[chunk_hash], chunk_hash)
+                            for values, value in zip(to_copy, (chunk_id, text, meta, source_id)):
+                                values.append(value)
+                            reused += 1
+                        else:
+                            for values, value in zip(to_embed, (chunk_id, text, meta)):
+                                values.append(value)
+                            batch_bytes += len(text.encode("utf-8", errors="surrogatepass"))
+                            embedded += 1
+                        old_ids.discard(chunk_id)
+                    stale_ids.extend(sorted(old_ids))
+                    notes.append((filename, mtime, size, digest, chunk_hashes))
+
+                    # Batches are sized by the amount of text to encode
+                    if batch_bytes >= INDEX_BATCH_BYTES or len(to_copy[0]) >= 1000:
+                        pending_write = self._submit_batch(writer, pending_write, to_embed, to_copy, stale_ids, notes)
+                        to_embed, to_copy, stale_ids, notes = ([], [], []), ([], [], [], []), [], []
+                        batch_bytes = 0
+
+                # Process remaining batch
+                if notes:
+                    pending_write = self._submit_batch(writer, pending_write, to_embed, to_copy, stale_ids, notes)
+            if pending_write is not None:
+                pending_write.result()
+        finally:
+            self.embedder.close()
+
+        if reused:
+            self.console.print(f"[green]Embedded {embedded} chunks; reused vectors for {reused} unchanged ones.[/green]")
+        self.console.print("[bold green]Index updated successfully![/bold green]")
+
+    def apply_changes(self, changed: List[str], deleted: List[str]):
+        """
+        Updates the index for individual notes, e.g. as reported by a
+        filesystem watcher, without scanning the whole directory.
+        """
+        current_files = {}
+        deleted = list(deleted)
+        for filename in changed:
+            try:
+                stat = os.stat(os.path.join(self.base_dir, filename))
+                current_files[filename] = (stat.st_mtime, stat.st_size)
+            except OSError:
+                # Gone again before we got to it
+                deleted.append(filename)
+
+        with self._write_lock:
+            self._load_manifest()
+            self._index_files(
+                [f for f, (mtime, size) in current_files.items()
+                 if not self.manifest.is_current(f, mtime, size)],
+                current_files,
+            )
+            self._delete_files([f for f in deleted if f in self.manifest.entries])
+
+    def index_generation(self) -> int:
+        """Counter that changes whenever the stored vectors change (in any process)."""
+        # Only re-reads the manifest if it was written since it was last loaded
+        self.manifest.load()
+        return self.manifest.generation
 
     def search(self, query_text: str, n_results: int = DEFAULT_RESULTS) -> List[str]:
         """
         Performs a semantic search and returns a list of filenames.
+        Matching chunks are pooled per note: a note ranks by the mean similarity
+        of its best SEMANTIC_POOLING_TOP_K chunks among the retrieved ones.
+        Results are cached until the index changes.
         """
-        # Ensure index is roughly up to date (lightweight check could go here, 
-        # but for now we rely on explicit update or call update_index() implicitly)
-        
-        results = self.collection.query(
-            query_texts=[query_text],
-            n_results=n_results
-        )
+        return [hit.filename for hit in self.search_hits(query_text, n_results)]
+
+    def search_hits(self, query_text: str, n_results: int = DEFAULT_RESULTS) -> List[SemanticHit]:
+        """Like search(), with each note's score and best-matching chunk."""
+        return self.search_hits_many([query_text], n_results)[0]
+
+    def embed_queries(self, query_texts: List[str]) -> List[List[float]]:
+        """Embeddings of several queries; those not cached are encoded in one batch."""
+        vectors = [self.query_cache.get(query_text) for query_text in query_texts]
+        missing = sorted({query_text for query_text, vector in zip(query_texts, vectors) if vector is None})
+        if missing:
+            with self.profiler.stage("query_embed"):
+                embedded = dict(zip(missing, self.embedder.embed(missing)))
+            for query_text, vector in embedded.items():
+                self.query_cache.put(query_text, vector)
+            vectors = [embedded[q] if vector is None else vector for q, vector in zip(query_texts, vectors)]
+        return vectors
+
+    def search_many(self, query_texts: List[str], n_results: int = DEFAULT_RESULTS) -> List[List[str]]:
+        """
+        Like search() for several queries at once: the queries that aren't
+        cached are embedded as one batch and sent to the collection in one
+        multi-query call. Returns one list of filenames per query.
+        """
+        return [[hit.filename for hit in hits] for hits in self.search_hits_many(query_texts, n_results)]
+
+    def search_hits_many(self, query_texts: List[str], n_results: int = DEFAULT_RESULTS) -> List[List[SemanticHit]]:
+        """Like search_many(), with each note's score and best-matching chunk."""
+        with self.profiler.stage("semantic_search"):
+            generation = self.index_generation()
+            results: List[Optional[List[SemanticHit]]] = []
+            for query_text in query_texts:
+                cached = self.result_cache.get((normalize_query(query_text), n_results, generation))
+                results.append(None if cached is None else list(cached))
+
+            pending = [i for i, result in enumerate(results) if result is None]
+            if pending:
+                found = self._query_many([query_texts[i] for i in pending], n_results)
+                for i, hits in zip(pending, found):
+                    results[i] = hits
+                    self.result_cache.put((normalize_query(query_texts[i]), n_results, generation), tuple(hits))
+            return results
+
+    def _query_many(self, query_texts: List[str], n_results: int) -> List[List[SemanticHit]]:
+        query_embeddings = self.embed_queries(query_texts)
+        with self.profiler.stage("vector_query"):
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results * SEMANTIC_CHUNKS_PER_RESULT,
+                include=["metadatas", "distances"],
+            )
         
         # Chroma returns lists of lists (one list per query string)
-        if results['ids']:
-            return results['ids'][0]
-        return []
+        if not results['ids']:
+            return [[] for _ in query_texts]
+        return [
+            self._pool(ids, metadatas, distances, n_results)
+            for ids, metadatas, distances in zip(results['ids'], results['metadatas'], results['distances'])
+        ]
+
+    @staticmethod
+    def _pool(ids: List[str], metadatas: List[dict], distances: List[float], n_results: int) -> List[SemanticHit]:
+        """Ranks notes by their best SEMANTIC_POOLING_TOP_K chunks among the hits of one query."""
+        # Hits come sorted by distance, so each note's list is best-first
+        similarities: Dict[str, List[float]] = {}
+        best_chunk: Dict[str, Optional[str]] = {}
+        for id_, meta, distance in zip(ids, metadatas, distances):
+            meta = meta or {}
+            # Whole-note documents from before chunking have no parent
+            parent = meta.get("parent", id_)
+            similarities.setdefault(parent, []).append(1 - distance)
+            if parent not in best_chunk:
+                best_chunk[parent] = meta.get("hash") if "parent" in meta else None
+
+        scores = {}
+        for filename, values in similarities.items():
+            best = values[:SEMANTIC_POOLING_TOP_K]
+            scores[filename] = sum(best) / len(best)
+        ranking = sorted(scores, key=scores.get, reverse=True)[:n_results]
+        return [SemanticHit(filename, scores[filename], best_chunk[filename]) for filename in ranking]
+
+    def chunk_text(self, filename: str, chunk_hash: Optional[str]) -> str:
+        """
+        The text of a note's chunk (the whole note for chunk_hash None, or if
+        the note changed since it was indexed). "" if the note can't be read.
+        """
+        try:
+            text = self._read_note(filename)
+        except OSError:
+            return ""
+        if chunk_hash is not None:
+            # The stores keep vectors, not necessarily the chunk texts
+            for chunk in split_into_chunks(text):
+                if content_hash(chunk) == chunk_hash:
+                    return chunk
+        return text
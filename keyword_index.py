@@ -0,0 +1,348 @@
+import os
+import re
+import math
+import pickle
+import threading
+from collections import Counter
+from typing import Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+from rich.console import Console
+
+from atomic_write import atomic_write
+from vault_snapshot import note_name
+
+# Characters that separate "words" in filenames and note contents. Shared by
+# the tier predicates in zkss.py and the inverted index so both agree on what
+# an exact word match is.
+SPLIT_CHARACTERS = r"[ \.,\[\]\(\)\n]"
+_SPLIT_RE = re.compile(SPLIT_CHARACTERS)
+
+
+def split_words(text_lower: str) -> FrozenSet[str]:
+    """Returns the set of words of an already lowercased text."""
+    return frozenset(_SPLIT_RE.split(text_lower))
+
+
+def count_words(text_lower: str) -> Dict[str, int]:
+    """Returns how often each word occurs in an already lowercased text."""
+    return Counter(_SPLIT_RE.split(text_lower))
+
+
+def has_split_character(term: str) -> bool:
+    """True if the term spans more than one word (contains a separator)."""
+    return _SPLIT_RE.search(term) is not None
+
+
+class KeywordIndex:
+    """
+    On-disk inverted index for keyword search.
+
+    Maps every lowercased word to the set of notes containing it, both for
+    note contents and for filenames. The index is kept current incrementally:
+    only notes whose (mtime, size) changed since the last run are re-read.
+    Word counts per note are kept as well, for BM25 ranking.
+
+    An index handed to searches is never changed: sync() applies changes to a
+    copy, so resident indexes can be searched by several threads while one
+    of them syncs.
+    """
+
+    FILE_NAME = ".zkss_keyword_index"
+    FORMAT_VERSION = 2
+
+    # BM25 parameters (the usual defaults)
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    def __init__(self, base_dir: str, path: Optional[str] = None):
+        self.base_dir = base_dir
+        self.path = path or os.path.join(os.path.expanduser("~"), self.FILE_NAME)
+        self.console = Console(stderr=True)
+
+        # filename -> (mtime, size, word counts) for every indexed note
+        self.docs: Dict[str, Tuple[float, int, Mapping[str, int]]] = {}
+        # filename -> number of words, and their total (for BM25); not stored
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+        # word -> filenames whose content contains the word
+        self.postings: Dict[str, Set[str]] = {}
+        # word -> filenames whose name contains the word
+        self.filename_postings: Dict[str, Set[str]] = {}
+        # Identifies the file last loaded or saved, so that a resident index
+        # (e.g. in the daemon) is only re-read after another process wrote it
+        self._file_version: Optional[tuple] = None
+        # In a copy, the words whose posting sets are its own; the others are
+        # shared with the index it was copied from (None: all are its own)
+        self._owned_postings: Optional[Set[str]] = None
+        self._owned_filename_postings: Optional[Set[str]] = None
+        # The copy a sync of this index produced, and the lock the copies of
+        # one index share so that their syncs take turns
+        self._successor: Optional["KeywordIndex"] = None
+        self._sync_lock = threading.Lock()
+
+    # --- Persistence ---
+
+    def _stat_file(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> bool:
+        """Loads the index from disk. Returns False if there is none (or it is unusable)."""
+        file_version = self._stat_file()
+        if file_version is not None and file_version == self._file_version:
+            # Unchanged since this instance loaded or saved it
+            return True
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            self.console.print(f"[yellow]Ignoring unreadable keyword index {self.path}: {e}[/yellow]")
+            return False
+
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != self.FORMAT_VERSION
+            or data.get("base_dir") != self.base_dir
+        ):
+            return False
+
+        self.docs = data["docs"]
+        self.postings = data["postings"]
+        self.filename_postings = data["filename_postings"]
+        self._owned_postings = self._owned_filename_postings = None
+        self.lengths = {filename: _note_length(counts) for filename, (_, _, counts) in self.docs.items()}
+        self.total_length = sum(self.lengths.values())
+        self._file_version = file_version
+        return True
+
+    def save(self):
+        """Writes the index atomically (temp file + rename) so readers never see a partial file."""
+        data = {
+            "version": self.FORMAT_VERSION,
+            "base_dir": self.base_dir,
+            "docs": self.docs,
+            "postings": self.postings,
+            "filename_postings": self.filename_postings,
+        }
+        with atomic_write(self.path) as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file_version = self._stat_file()
+
+    # --- Maintenance ---
+
+    def copy(self) -> "KeywordIndex":
+        """A copy to update; posting sets are shared until the copy changes them."""
+        index = KeywordIndex(self.base_dir, self.path)
+        index.console = self.console
+        index.docs = dict(self.docs)
+        index.lengths = dict(self.lengths)
+        index.total_length = self.total_length
+        index.postings = dict(self.postings)
+        index.filename_postings = dict(self.filename_postings)
+        index._file_version = self._file_version
+        index._owned_postings = set()
+        index._owned_filename_postings = set()
+        index._sync_lock = self._sync_lock
+        return index
+
+    @staticmethod
+    def _writable(postings: Dict[str, Set[str]], owned: Optional[Set[str]], word: str) -> Set[str]:
+        """The posting set of word, copied first if it is shared with another index."""
+        entry = postings[word]
+        if owned is not None and word not in owned:
+            entry = postings[word] = set(entry)
+            owned.add(word)
+        return entry
+
+    def _add_postings(
+        self, postings: Dict[str, Set[str]], owned: Optional[Set[str]], filename: str, words: Iterable[str]
+    ):
+        for word in words:
+            if word not in postings:
+                postings[word] = {filename}
+                if owned is not None:
+                    owned.add(word)
+            else:
+                self._writable(postings, owned, word).add(filename)
+
+    def _remove_postings(
+        self, postings: Dict[str, Set[str]], owned: Optional[Set[str]], filename: str, words: Iterable[str]
+    ):
+        for word in words:
+            entry = postings.get(word)
+            if entry is None or filename not in entry:
+                continue
+            if len(entry) == 1:
+                del postings[word]
+            else:
+                self._writable(postings, owned, word).discard(filename)
+
+    def _remove(self, filename: str):
+        _, _, words = self.docs.pop(filename)
+        self.total_length -= self.lengths.pop(filename)
+        self._remove_postings(self.postings, self._owned_postings, filename, words)
+        self._remove_postings(
+            self.filename_postings, self._owned_filename_postings, filename, split_words(note_name(filename).lower())
+        )
+
+    def _outdated(self, current_files: Dict[str, Tuple[float, int]]) -> bool:
+        """True if update() would change anything."""
+        if len(current_files) != len(self.docs):
+            return True
+        for filename, (mtime, size) in current_files.items():
+            entry = self.docs.get(filename)
+            if entry is None or entry[0] != mtime or entry[1] != size:
+                return True
+        return False
+
+    def update(
+        self,
+        current_files: Dict[str, Tuple[float, int]],
+        read_word_counts: Callable[[str], Mapping[str, int]],
+    ) -> bool:
+        """
+        Synchronizes the index with the filesystem, in place (see sync() for
+        an index that searches may be using).
+
+        current_files maps filename -> (mtime, size); read_word_counts returns
+        the word counts of a note's lowercased content (see count_words).
+        Returns True if anything changed.
+        """
+        changed = False
+
+        for filename in [f for f in self.docs if f not in current_files]:
+            self._remove(filename)
+            changed = True
+
+        for filename, (mtime, size) in current_files.items():
+            entry = self.docs.get(filename)
+            if entry is not None and entry[0] == mtime and entry[1] == size:
+                continue
+            if entry is not None:
+                self._remove(filename)
+
+            words = read_word_counts(filename)
+            self.docs[filename] = (mtime, size, words)
+            self.lengths[filename] = _note_length(words)
+            self.total_length += self.lengths[filename]
+            self._add_postings(self.postings, self._owned_postings, filename, words)
+            self._add_postings(
+                self.filename_postings, self._owned_filename_postings, filename, split_words(note_name(filename).lower())
+            )
+            changed = True
+
+        return changed
+
+    def sync(
+        self,
+        current_files: Dict[str, Tuple[float, int]],
+        read_word_counts: Callable[[str], Mapping[str, int]],
+    ) -> "KeywordIndex":
+        """
+        Loads, updates and (if needed) saves the index in one go, and returns
+        the synced index: this one if nothing changed, otherwise an updated
+        copy. This index stays as it is for the searches using it; later
+        syncs of it continue from the copy.
+        """
+        with self._sync_lock:
+            index = self.latest()
+            if index._stat_file() == index._file_version and not index._outdated(current_files):
+                return index
+
+            synced = index.copy()
+            synced.load()
+            if synced.update(current_files, read_word_counts):
+                try:
+                    synced.save()
+                except OSError as e:
+                    self.console.print(f"[yellow]Could not save keyword index: {e}[/yellow]")
+            index._successor = synced
+            return synced
+
+    def latest(self) -> "KeywordIndex":
+        """The most recent index synced from this one (itself if none)."""
+        index = self
+        while index._successor is not None:
+            index = index._successor
+        return index
+
+    # --- Queries ---
+
+    def filename_exact(self, word: str) -> Set[str]:
+        """Notes whose filename contains the word as an exact word."""
+        return self.filename_postings.get(word, set())
+
+    def content_exact(self, word: str) -> Set[str]:
+        """Notes whose content contains the word as an exact word."""
+        return self.postings.get(word, set())
+
+    def content_exact_all(self, words: Iterable[str]) -> Set[str]:
+        """Notes whose content contains all words as exact words."""
+        result: Optional[Set[str]] = None
+        for word in words:
+            matches = self.content_exact(word)
+            result = set(matches) if result is None else result & matches
+            if not result:
+                return set()
+        return result or set()
+
+    def content_substring(self, term: str) -> Optional[Set[str]]:
+        """
+        Notes whose content contains the term as a substring.
+
+        A term without separator characters can only occur inside a single
+        word, so the answer follows from scanning the vocabulary. Returns None
+        if the term spans words; the caller then has to read the contents.
+        """
+        if has_split_character(term):
+            return None
+        result: Set[str] = set()
+        for word, filenames in self.postings.items():
+            if term in word:
+                result |= filenames
+        return result
+
+    def bm25(self, words: Iterable[str], limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Ranks notes by their BM25 score for the given (lowercased) words.
+        Returns (filename, score) pairs, best first; notes without any of
+        the words are left out.
+        """
+        # Ties are broken by filename, so rankings are reproducible
+        ranking = sorted(self.bm25_scores(words).items(), key=lambda item: (-item[1], item[0]))
+        return ranking if limit is None else ranking[:limit]
+
+    def bm25_scores(self, words: Iterable[str], filenames: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        BM25 scores of the notes containing any of the (lowercased) words.
+        With filenames, only these notes are scored (e.g. the hits of a search).
+        """
+        note_count = len(self.docs)
+        if not note_count:
+            return {}
+        average_length = max(self.total_length / note_count, 1.0)
+        if filenames is not None:
+            filenames = list(filenames)
+
+        scores: Dict[str, float] = {}
+        for word in set(words):
+            postings = self.postings.get(word) if word else None
+            if not postings:
+                continue
+            idf = math.log(1 + (note_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            scored = postings if filenames is None else [f for f in filenames if f in postings]
+            for filename in scored:
+                frequency = self.docs[filename][2][word]
+                norm = self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * self.lengths[filename] / average_length)
+                scores[filename] = scores.get(filename, 0.0) + idf * frequency * (self.BM25_K1 + 1) / (frequency + norm)
+        return scores
+
+
+def _note_length(counts: Mapping[str, int]) -> int:
+    """Number of words in a note (empty strings between separators don't count)."""
+    return sum(counts.values()) - counts.get("", 0)
@@ -0,0 +1,125 @@
+import os
+import json
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+from atomic_write import atomic_write
+
+
+def content_hash(text: str) -> str:
+    """Returns a short, stable hash of a note's content."""
+    return hashlib.blake2b(text.encode("utf-8", errors="surrogatepass"), digest_size=16).hexdigest()
+
+
+class IndexManifest:
+    """
+    Local record of what the vector index contains.
+
+    Maps every indexed filename to the mtime, size and content hash it was
+    indexed with, and the hashes of its chunks, so that finding changed notes is a local diff instead of
+    fetching all metadata from Chroma. It also records the embedding model,
+    since stored vectors can only be reused with the model that made them. The manifest is written after every
+    change to the index; if it ever lags behind (e.g. after a crash), the
+    next sync simply repeats the idempotent upserts and deletes.
+    """
+
+    FILE_NAME = "manifest.json"
+    FORMAT_VERSION = 1
+
+    def __init__(self, path: str, base_dir: str):
+        self.path = path
+        self.base_dir = base_dir
+        self.entries: Dict[str, dict] = {}
+        # None for indexes created before the model was recorded
+        self.model: Optional[str] = None
+        # Bumped with every change to the stored vectors; caches of search
+        # results are keyed by it (also across processes)
+        self.generation = 0
+        self.loaded = False
+        self._loaded_mtime: Optional[float] = None
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def load(self) -> bool:
+        """
+        (Re)loads the manifest if it changed on disk since it was last loaded.
+        Returns False if there is no usable manifest.
+        """
+        file_mtime = self._file_mtime()
+        if file_mtime is None:
+            self.loaded = False
+            return False
+        if self.loaded and file_mtime == self._loaded_mtime:
+            return True
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self.loaded = False
+            return False
+        if data.get("version") != self.FORMAT_VERSION or data.get("base_dir") != self.base_dir:
+            self.loaded = False
+            return False
+
+        self.entries = data["files"]
+        self.model = data.get("model")
+        self.generation = data.get("generation", 0)
+        self.loaded = True
+        self._loaded_mtime = file_mtime
+        return True
+
+    def save(self):
+        """Writes the manifest atomically (temp file + rename)."""
+        data = {
+            "version": self.FORMAT_VERSION,
+            "base_dir": self.base_dir,
+            "model": self.model,
+            "generation": self.generation,
+            "files": self.entries,
+        }
+        with atomic_write(self.path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        self.loaded = True
+        self._loaded_mtime = self._file_mtime()
+
+    def set(
+        self,
+        filename: str,
+        mtime: float,
+        size: Optional[int],
+        content_hash: Optional[str],
+        chunks: Optional[List[str]] = None,
+    ):
+        self.entries[filename] = {"mtime": mtime, "size": size, "hash": content_hash, "chunks": chunks}
+
+    def remove(self, filenames: Iterable[str]):
+        for filename in filenames:
+            self.entries.pop(filename, None)
+
+    def chunks_by_hash(self) -> Dict[str, str]:
+        """Maps chunk hashes to the filename of one indexed note containing that chunk."""
+        return {
+            chunk: filename
+            for filename, entry in self.entries.items()
+            for chunk in entry.get("chunks") or ()
+        }
+
+    def is_current(self, filename: str, mtime: float, size: int) -> bool:
+        """True if the note is indexed and hasn't changed since."""
+        entry = self.entries.get(filename)
+        if entry is None:
+            return False
+        # Notes indexed as a whole (before chunking) need to be re-embedded
+        if entry.get("chunks") is None:
+            return False
+        # Only treat files as changed if the filesystem mtime is significantly
+        # NEWER than the indexed one (floating point tolerance of 1ms)
+        if mtime - entry["mtime"] > 0.001:
+            return False
+        # Entries taken over from older indexes have no size
+        return entry.get("size") is None or entry["size"] == size
@@ -4,10 +4,16 @@ MCP Server for zk-smart-search.
 Exposes Zettelkasten search functionality to AI assistants.
 """
 import asyncio
+import importlib
+import json
 import sys
 import os
-from unittest.mock import MagicMock, patch
-from typing import Any, List, Dict
+import time
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from typing import Any, List, Dict, Optional
 
 # Quiet noisy ML/HF tooling before those libraries are imported. This only
 # reduces log noise; the stdout guard below is what actually protects the
@@ -27,56 +33,192 @@ from mcp.types import Tool, TextContent
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from zkss import ZKSearcher
+from keyword_index import KeywordIndex
 from indexer import IndexManager
-from zkss_markdown import convert_rich_to_markdown
-from settings import ENDING
+from hybrid import HybridSearcher, format_timings
+from cancellation import check_cancelled
+from watcher import IndexWatcher
+from note_cache import note_cache
+from vault_snapshot import vault_snapshots
+from profiling import stats_recorder
+from snippets import make_snippet
+import settings
+from settings import MCP_IO_WORKERS, MCP_EMBEDDING_WORKERS, SNIPPET_MAX_BYTES
 
 # Initialize Server
 server = Server("zk-smart-search")
 
+# One IndexManager (Chroma client + embedding model) is kept resident for the
+# lifetime of the server; opening the DB and loading the model per call costs
+# seconds.
+_index_manager: Optional[IndexManager] = None
+_index_manager_lock = threading.Lock()
+# Embeds notes as they change, so searches can skip the full index sync
+_index_watcher: Optional[IndexWatcher] = None
+_index_watcher_thread: Optional[threading.Thread] = None
+_index_watcher_lock = threading.Lock()
 
-def format_note_hit(filename: str, title: str | None = None) -> str:
-    """Format a search hit with a copy-paste-ready filename for read_note."""
-    if title is None:
-        title = ZKSearcher().strip_ending(filename)
-    return f"- **{title}** — `{filename}`"
+# The keyword index of each vault is kept resident as well (as in the daemon):
+# loading the pickled index takes longer than a search with it. Syncing never
+# changes an index in use (changes go to a copy, see KeywordIndex.sync), so
+# searches don't wait for each other; only the syncs take turns.
+_keyword_indexes: Dict[str, KeywordIndex] = {}
+_keyword_indexes_lock = threading.Lock()
 
+# settings.py is re-read when it changes (see reload_settings); its mtime as
+# of the last read
+_settings_mtime: Optional[int] = os.stat(settings.__file__).st_mtime_ns
+_settings_lock = threading.Lock()
+
+# Searches do blocking disk I/O and model inference, so they run in worker
+# threads: a pool for file access and a separate one for embedding, so a slow
+# reindex never holds up keyword searches or reading notes. Their sizes are
+# read once, at startup.
+_io_executor = ThreadPoolExecutor(max_workers=MCP_IO_WORKERS, thread_name_prefix="zkss-io")
+_embedding_executor = ThreadPoolExecutor(
+    max_workers=MCP_EMBEDDING_WORKERS, thread_name_prefix="zkss-embedding"
+)
+
+
+def get_index_manager() -> IndexManager:
+    """Returns the shared IndexManager, creating it on first use (with the current settings)."""
+    global _index_manager
+    with _index_manager_lock:
+        if _index_manager is None:
+            indexer = IndexManager(
+                base_dir=settings.ZK_BASE_DIR,
+                backend=settings.EMBEDDING_BACKEND,
+                vector_store=settings.VECTOR_STORE,
+            )
+            # Suppress console output from IndexManager
+            indexer.console = MagicMock()
+            _index_manager = indexer
+        return _index_manager
+
+
+def close_index_manager():
+    """Stops the watcher and drops the shared IndexManager; the next search creates a new one."""
+    global _index_manager
+    stop_index_watcher()
+    with _index_manager_lock:
+        _index_manager = None
+
+
+def _warm_up_index_manager():
+    try:
+        get_index_manager().warm_up()
+    except Exception as e:
+        print(f"Preloading the semantic index failed: {e}", file=sys.stderr)
+
+
+def preload_index_manager() -> threading.Thread:
+    """Creates the IndexManager and loads the model in the background."""
+    thread = threading.Thread(target=_warm_up_index_manager, name="zkss-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def _watch_index():
+    global _index_watcher
+    try:
+        watcher = IndexWatcher(get_index_manager(), reconcile_seconds=settings.WATCH_RECONCILE_SECONDS)
+    except Exception as e:
+        print(f"Watching the notes failed: {e}", file=sys.stderr)
+        return
+    with _index_watcher_lock:
+        if _index_watcher_thread is not threading.current_thread():
+            # Stopped before it got going
+            return
+        _index_watcher = watcher
+    watcher.run()
+
+
+def start_index_watcher() -> threading.Thread:
+    """Starts keeping the semantic index current in the background."""
+    global _index_watcher_thread
+    thread = threading.Thread(target=_watch_index, name="zkss-watcher", daemon=True)
+    with _index_watcher_lock:
+        _index_watcher_thread = thread
+    thread.start()
+    return thread
+
+
+def stop_index_watcher():
+    """Stops the watcher and waits until it has removed its pid file."""
+    global _index_watcher, _index_watcher_thread
+    with _index_watcher_lock:
+        watcher, _index_watcher = _index_watcher, None
+        thread, _index_watcher_thread = _index_watcher_thread, None
+    if watcher is not None:
+        watcher.stop()
+    if thread is not None and thread is not threading.current_thread():
+        thread.join()
+
+
+def _get_settings_mtime() -> Optional[int]:
+    try:
+        return os.stat(settings.__file__).st_mtime_ns
+    except OSError:
+        return None
+
+
+def reload_settings():
+    """
+    Re-reads settings.py and restarts what was set up with the old values:
+    the IndexManager and watcher are closed, the resident keyword indexes and
+    cached folder listings dropped, and the manager is preloaded (and the
+    watcher started) again. Searches create their searchers from the current
+    settings. The worker pool sizes and settings that other modules read at
+    import (cache sizes, chunking and batching) still need a restart.
+    """
+    global _settings_mtime
+    close_index_manager()
+    _settings_mtime = _get_settings_mtime()
+    importlib.reload(settings)
+    with _keyword_indexes_lock:
+        _keyword_indexes.clear()
+    vault_snapshots.configure(
+        max_age=settings.SNAPSHOT_MAX_AGE_SECONDS,
+        recursive=settings.VAULT_RECURSIVE,
+        include=settings.VAULT_INCLUDE,
+        exclude=settings.VAULT_EXCLUDE,
+        workers=settings.VAULT_WALK_WORKERS,
+    )
+    preload_index_manager()
+    if settings.MCP_WATCH_INDEX:
+        start_index_watcher()
+
+
+def reload_settings_if_changed() -> bool:
+    """Reloads the settings if settings.py changed since they were read. Returns True if it did."""
+    with _settings_lock:
+        if _get_settings_mtime() == _settings_mtime:
+            return False
+        reload_settings()
+        return True
+
+
+def _index_is_watched(indexer: IndexManager) -> bool:
+    watcher = _index_watcher
+    return watcher is not None and watcher.active and watcher.indexer is indexer
+
+
+def format_note_hit(filename: str, title: str | None = None, snippet: str = "") -> str:
+    """Format a search hit with a copy-paste-ready filename for read_note (and an excerpt below it)."""
+    if title is None:
+        title = ZKSearcher().note_title(filename)
+    line = f"- **{title}** — `{filename}`"
+    if snippet:
+        line += f"\n  > {snippet}"
+    return line
 
-def _append_filenames_to_keyword_results(text: str) -> str:
-    """Turn bare note titles into read_note-ready filenames in keyword output."""
-    lines = []
-    for line in text.splitlines():
-        if line.startswith("    ") and line.strip():
-            title = line.strip()
-            if title.endswith(ENDING):
-                filename = title
-            else:
-                filename = f"{title}{ENDING}"
-            lines.append(f"    {format_note_hit(filename, title)}")
-        else:
-            lines.append(line)
-    return "\n".join(lines)
-
-class CapturingConsole:
-    """Mock console to capture output from ZKSearcher."""
-    def __init__(self):
-        self.output = []
-
-    def print(self, msg, *args, **kwargs):
-        # Strip rich formatting tags if possible, or just keep them
-        # For simplicity, we just store the message
-        self.output.append(str(msg))
-    
-    def pager(self, styles=True):
-        # Return a context manager that does nothing
-        return MagicMock()
 
 @server.list_tools()
 async def list_tools() -> list[Tool]:
     return [
         Tool(
             name="search_notes",
-            description="Search for notes in the Zettelkasten. Supports both exact keyword matching (default) and semantic/meaning-based search. Results include the note filename (with .md suffix) for use with read_note.",
+            description="Search for notes in the Zettelkasten. Supports exact keyword matching (default), semantic/meaning-based search, and a hybrid of both. Results include the note filename (with .md suffix) for use with read_note and an excerpt around the match, which often makes reading the note unnecessary.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -84,20 +226,61 @@ async def list_tools() -> list[Tool]:
                         "type": "string",
                         "description": "The search query (keywords or concept)"
                     },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["keyword", "semantic", "hybrid"],
+                        "description": "keyword: exact keyword matching, grouped by where terms match. semantic: embedding-based search by meaning. hybrid: one ranked list combining keyword relevance (BM25) and meaning. Defaults to keyword (or semantic if `semantic` is true)."
+                    },
                     "semantic": {
                         "type": "boolean",
-                        "description": "If true, uses semantic search (embedding-based). If false/omitted, uses keyword search.",
+                        "description": "If true, uses semantic search (embedding-based). If false/omitted, uses keyword search. Superseded by `mode`.",
                         "default": False
                     },
                     "limit": {
                         "type": "integer",
                         "description": "Max number of results to return (default: 15)",
                         "default": 15
+                    },
+                    "snippet_bytes": {
+                        "type": "integer",
+                        "description": f"Max size of the excerpt shown below each result, in bytes (default: {settings.SNIPPET_MAX_BYTES}; 0 for titles only)",
+                        "default": settings.SNIPPET_MAX_BYTES
                     }
                 },
                 "required": ["query"]
             }
         ),
+        Tool(
+            name="search_notes_batch",
+            description="Run several searches at once (e.g. related keywords or phrasings). Faster than separate search_notes calls: the notes are listed and read once for all keyword queries, and semantic queries are embedded and looked up together. Returns the results of each query in order.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "queries": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "The search queries"
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["keyword", "semantic"],
+                        "description": "keyword: exact keyword matching, grouped by where terms match. semantic: embedding-based search by meaning.",
+                        "default": "keyword"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Max number of results per query (default: 15)",
+                        "default": 15
+                    },
+                    "snippet_bytes": {
+                        "type": "integer",
+                        "description": f"Max size of the excerpt shown below each result, in bytes (default: {settings.SNIPPET_MAX_BYTES}; 0 for titles only)",
+                        "default": settings.SNIPPET_MAX_BYTES
+                    }
+                },
+                "required": ["queries"]
+            }
+        ),
         Tool(
             name="read_note",
             description="Read the full content of a note. Use the filename from search_notes results (including the .md suffix).",
@@ -111,88 +294,290 @@ async def list_tools() -> list[Tool]:
                 },
                 "required": ["filename"]
             }
+        ),
+        Tool(
+            name="server_stats",
+            description="Performance statistics of this server: latency percentiles and histograms of recent tool calls and search stages (listing notes, keyword index, tiers, index updates, embedding, vector queries), notes and bytes read, and cache hit rates.",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
         )
     ]
 
 @server.call_tool()
 async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
+    if _get_settings_mtime() != _settings_mtime:
+        # Stopping the watcher can take a second; don't block the event loop
+        await asyncio.get_running_loop().run_in_executor(_io_executor, reload_settings_if_changed)
+
     if name == "search_notes":
         query = arguments.get("query")
         semantic = arguments.get("semantic", False)
+        mode = arguments.get("mode") or ("semantic" if semantic else "keyword")
         limit = arguments.get("limit", 15)
+        snippet_bytes = arguments.get("snippet_bytes", settings.SNIPPET_MAX_BYTES)
         
-        if semantic:
-            return await perform_semantic_search(query, limit)
-        else:
-            return await perform_keyword_search(query)
+        started = time.perf_counter()
+        try:
+            if mode == "hybrid":
+                return await perform_hybrid_search(query, limit, snippet_bytes)
+            elif mode == "semantic":
+                return await perform_semantic_search(query, limit, snippet_bytes)
+            else:
+                return await perform_keyword_search(query, limit, snippet_bytes)
+        finally:
+            stats_recorder.record(f"tool.search_notes.{mode}", time.perf_counter() - started)
             
+    elif name == "search_notes_batch":
+        queries = arguments.get("queries") or []
+        mode = arguments.get("mode") or "keyword"
+        limit = arguments.get("limit", 15)
+        snippet_bytes = arguments.get("snippet_bytes", settings.SNIPPET_MAX_BYTES)
+
+        started = time.perf_counter()
+        try:
+            return await perform_batch_search(queries, mode, limit, snippet_bytes)
+        finally:
+            stats_recorder.record(f"tool.search_notes_batch.{mode}", time.perf_counter() - started)
+
     elif name == "read_note":
         filename = arguments.get("filename")
-        return await read_note_content(filename)
+        started = time.perf_counter()
+        try:
+            return await read_note_content(filename)
+        finally:
+            stats_recorder.record("tool.read_note", time.perf_counter() - started)
+
+    elif name == "server_stats":
+        return [TextContent(type="text", text=json.dumps(server_stats(), indent=2))]
     
     raise ValueError(f"Unknown tool: {name}")
 
-async def perform_semantic_search(query: str, limit: int) -> list[TextContent]:
+
+def server_stats() -> dict:
+    """
+    Latencies of tool calls ("tool.<name>") and search stages since the start,
+    with percentiles and a histogram over the last STATS_WINDOW runs, plus
+    the state of the caches.
+    """
+    stats = {
+        "uptime_s": round(time.time() - stats_recorder.started, 1),
+        "stages": stats_recorder.snapshot(),
+        "note_cache": note_cache.stats(),
+        "vault_snapshots": vault_snapshots.stats(),
+    }
+    # Only reported once it exists; asking for stats shouldn't load the model
+    indexer = _index_manager
+    if indexer is not None:
+        stats["semantic"] = {
+            "vector_store": indexer.vector_store,
+            "index_generation": indexer.manifest.generation,
+            "query_cache": {"entries": len(indexer.query_cache), "hits": indexer.query_cache.hits, "misses": indexer.query_cache.misses},
+            "result_cache": {"entries": len(indexer.result_cache), "hits": indexer.result_cache.hits, "misses": indexer.result_cache.misses},
+            "watched": _index_is_watched(indexer),
+        }
+    return stats
+
+async def run_blocking(executor: ThreadPoolExecutor, func, *args):
+    """
+    Runs func(*args, cancel_event=...) in executor without blocking the event loop.
+    If the request is cancelled while waiting, cancel_event is set so the
+    worker stops at its next checkpoint instead of finishing abandoned work.
+    """
+    cancel_event = threading.Event()
+    loop = asyncio.get_running_loop()
     try:
-        # We need to suppress console output from IndexManager too
-        indexer = IndexManager()
-        indexer.console = MagicMock() 
-        
-        # Ensure index is up to date (this might take a moment if many changes)
-        # For an interactive tool, maybe we skip update or do it?
-        # Let's do a lightweight update check
-        indexer.update_index()
-        
-        results = indexer.search(query, n_results=limit)
-        
-        formatted_results = [format_note_hit(fname) for fname in results]
+        return await loop.run_in_executor(
+            executor, functools.partial(func, *args, cancel_event=cancel_event)
+        )
+    except asyncio.CancelledError:
+        cancel_event.set()
+        raise
+
+
+def _semantic_search(query: str, limit: int, snippet_bytes: int, cancel_event: threading.Event) -> str:
+    indexer = get_index_manager()
+
+    # Ensure index is up to date (this might take a moment if many changes),
+    # unless the watcher already keeps it current
+    if not _index_is_watched(indexer):
+        indexer.update_index(cancel_event=cancel_event)
+    check_cancelled(cancel_event)
+
+    hits = indexer.search_hits(query, n_results=limit)
+    return _format_semantic_results(indexer, query, hits, snippet_bytes)
+
+
+def _format_semantic_results(indexer: IndexManager, query: str, hits, snippet_bytes: int) -> str:
+    """One line per hit, each with an excerpt of the note's best-matching chunk."""
+    lines = []
+    for hit in hits:
+        snippet = make_snippet(indexer.chunk_text(hit.filename, hit.chunk_hash), query, snippet_bytes) if snippet_bytes > 0 else ""
+        lines.append(format_note_hit(hit.filename, snippet=snippet))
+    return f"Found {len(hits)} relevant notes (Semantic):\n" + "\n".join(lines)
+
+
+async def perform_semantic_search(query: str, limit: int, snippet_bytes: int = SNIPPET_MAX_BYTES) -> list[TextContent]:
+    try:
+        text = await run_blocking(_embedding_executor, _semantic_search, query, limit, snippet_bytes)
             
         return [TextContent(
             type="text",
-            text=f"Found {len(results)} relevant notes (Semantic):\n" + "\n".join(formatted_results)
+            text=text
         )]
     except Exception as e:
         return [TextContent(type="text", text=f"Error performing semantic search: {str(e)}")]
 
-async def perform_keyword_search(query: str) -> list[TextContent]:
+
+def _hybrid_search(query: str, limit: int, snippet_bytes: int, cancel_event: threading.Event):
+    indexer = get_index_manager()
+    searcher = HybridSearcher(indexer, base_dir=settings.ZK_BASE_DIR, ending=settings.ENDING)
+    searcher.keyword_index = _resident_keyword_index(searcher.base_dir)
+    result = searcher.search(query, limit, update_index=not _index_is_watched(indexer), cancel_event=cancel_event)
+    # Excerpts around the first keyword match (or the start of the note)
+    snippets = [
+        make_snippet(indexer.chunk_text(fname, None), query, snippet_bytes) if snippet_bytes > 0 else ""
+        for fname in result.filenames
+    ]
+    return result, snippets
+
+
+async def perform_hybrid_search(query: str, limit: int, snippet_bytes: int = SNIPPET_MAX_BYTES) -> list[TextContent]:
     try:
-        # Initialize Searcher
-        searcher = ZKSearcher()
-        
-        # Inject capturing console
-        capture = CapturingConsole()
-        searcher.console = capture
-        
-        # Mock sys.argv to pass the query
-        # ZKSearcher uses argparse on sys.argv
-        with patch.object(sys, 'argv', ['zkss.py', *query.split()]):
-            try:
-                searcher.run()
-            except SystemExit:
-                # argparse or sys.exit() might trigger this
-                pass
-        
-        # Process output
-        # The output contains Rich markup like [yellow]...[/yellow]
-        # Convert it to Markdown for better AI assistant readability
-        formatted_lines = [convert_rich_to_markdown(line) for line in capture.output]
-        output_text = _append_filenames_to_keyword_results("\n".join(formatted_lines))
-        
+        result, snippets = await run_blocking(_embedding_executor, _hybrid_search, query, limit, snippet_bytes)
+
+        formatted_results = [format_note_hit(fname, snippet=snippet) for fname, snippet in zip(result.filenames, snippets)]
+
         return [TextContent(
             type="text",
-            text=f"Search Results for '{query}':\n{output_text}"
+            text=f"Found {len(result.filenames)} relevant notes (Hybrid):\n" + "\n".join(formatted_results)
+            + f"\n\nTimings: {format_timings(result.timings)}"
+        )]
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error performing hybrid search: {str(e)}")]
+
+
+def _keyword_search(query: str, limit: int, snippet_bytes: int, cancel_event: threading.Event) -> List[str]:
+    search_string = " ".join(query.split())
+    if not search_string:
+        return ["No search string given."]
+
+    # Hits come in ranked order; notes are only read until `limit` are found
+    searcher = _markdown_searcher(cancel_event)
+    return _format_keyword_hits(searcher, search_string, searcher.iter_hits(search_string, limit=limit), snippet_bytes)
+
+
+def _resident_keyword_index(base_dir: str) -> KeywordIndex:
+    """The resident keyword index of a vault, as of its latest sync (loaded by the first search's sync)."""
+    with _keyword_indexes_lock:
+        index = _keyword_indexes.get(base_dir)
+        # Older versions are only kept alive by the searches still using them
+        index = _keyword_indexes[base_dir] = index.latest() if index is not None else KeywordIndex(base_dir)
+        return index
+
+
+def _searcher() -> ZKSearcher:
+    """A keyword searcher set up with the current settings."""
+    return ZKSearcher(
+        settings.ZK_BASE_DIR,
+        settings.ENDING,
+        settings.USE_KEYWORD_INDEX,
+        settings.SEARCH_JOBS,
+        settings.SEARCH_USE_PROCESSES,
+    )
+
+
+def _markdown_searcher(cancel_event: threading.Event) -> ZKSearcher:
+    searcher = _searcher()
+    searcher.keyword_index = _resident_keyword_index(searcher.base_dir)
+    searcher.cancel_event = cancel_event
+    # Tier headers in Markdown instead of Rich markup
+    searcher.field_format = "**{}:**"
+    return searcher
+
+
+def _format_keyword_hits(searcher: ZKSearcher, search_string: str, hits, snippet_bytes: int) -> List[str]:
+    """
+    One line per hit, with the header of each tier above its first hit and
+    an excerpt around the match below it (read from the note cache, so only
+    for the hits returned).
+    """
+    lines = []
+    tier = None
+    for hit in hits:
+        if hit.tier != tier:
+            lines.append(hit.header)
+            tier = hit.tier
+        snippet = make_snippet(searcher.get_file_text(hit.filename), search_string, snippet_bytes) if snippet_bytes > 0 else ""
+        lines.extend(f"    {line}" for line in format_note_hit(hit.filename, hit.title, snippet).split("\n"))
+    return lines
+
+
+async def perform_keyword_search(query: str, limit: int = 15, snippet_bytes: int = SNIPPET_MAX_BYTES) -> list[TextContent]:
+    try:
+        lines = await run_blocking(_io_executor, _keyword_search, query, limit, snippet_bytes)
+
+        return [TextContent(
+            type="text",
+            text=f"Search Results for '{query}':\n" + "\n".join(lines)
         )]
         
     except Exception as e:
         return [TextContent(type="text", text=f"Error performing keyword search: {str(e)}")]
 
+
+def _keyword_search_batch(queries: List[str], limit: int, snippet_bytes: int, cancel_event: threading.Event) -> List[str]:
+    search_strings = [" ".join(query.split()) for query in queries]
+    searcher = _markdown_searcher(cancel_event)
+    # One listing, index sync and pass over the notes for all queries
+    hits = iter(searcher.search_many([s for s in search_strings if s], limit=limit))
+    sections = []
+    for query, search_string in zip(queries, search_strings):
+        lines = _format_keyword_hits(searcher, search_string, next(hits), snippet_bytes) if search_string else ["No search string given."]
+        sections.append(f"Search Results for '{query}':\n" + "\n".join(lines))
+    return sections
+
+
+def _semantic_search_batch(queries: List[str], limit: int, snippet_bytes: int, cancel_event: threading.Event) -> List[str]:
+    indexer = get_index_manager()
+    if not _index_is_watched(indexer):
+        indexer.update_index(cancel_event=cancel_event)
+    check_cancelled(cancel_event)
+
+    # Embedded as one batch and looked up with one multi-query call
+    results = indexer.search_hits_many(queries, n_results=limit)
+    return [
+        f"Results for '{query}':\n" + _format_semantic_results(indexer, query, hits, snippet_bytes)
+        for query, hits in zip(queries, results)
+    ]
+
+
+async def perform_batch_search(queries: List[str], mode: str = "keyword", limit: int = 15, snippet_bytes: int = SNIPPET_MAX_BYTES) -> list[TextContent]:
+    if not queries:
+        return [TextContent(type="text", text="No queries given.")]
+    try:
+        if mode == "semantic":
+            sections = await run_blocking(_embedding_executor, _semantic_search_batch, queries, limit, snippet_bytes)
+        else:
+            sections = await run_blocking(_io_executor, _keyword_search_batch, queries, limit, snippet_bytes)
+        return [TextContent(type="text", text="\n\n".join(sections))]
+    except Exception as e:
+        return [TextContent(type="text", text=f"Error performing batch search: {str(e)}")]
+
+
+def _read_note(filename: str, cancel_event: threading.Event):
+    searcher = _searcher()
+    content = searcher.get_file_text(filename)
+    if not content and filename and not filename.endswith(settings.ENDING):
+        filename = f"{filename}{settings.ENDING}"
+        content = searcher.get_file_text(filename)
+    return filename, content
+
+
 async def read_note_content(filename: str) -> list[TextContent]:
     try:
-        searcher = ZKSearcher()
-        content = searcher.get_file_content(filename)
-        if not content and filename and not filename.endswith(ENDING):
-            filename = f"{filename}{ENDING}"
-            content = searcher.get_file_content(filename)
+        filename, content = await run_blocking(_io_executor, _read_note, filename)
         if not content:
              return [TextContent(type="text", text=f"Note '{filename}' not found or empty.")]
         
@@ -223,12 +608,18 @@ def _install_stdout_guard():
 
 async def main():
     private_stdout = _install_stdout_guard()
-    async with stdio_server(stdout=anyio.wrap_file(private_stdout)) as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            server.create_initialization_options()
-        )
+    preload_index_manager()
+    if settings.MCP_WATCH_INDEX:
+        start_index_watcher()
+    try:
+        async with stdio_server(stdout=anyio.wrap_file(private_stdout)) as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                server.create_initialization_options()
+            )
+    finally:
+        close_index_manager()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,220 @@
+import os
+import re
+import sys
+import mmap
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Optional, Tuple
+
+from settings import CONTENT_CACHE_MAX_BYTES
+from keyword_index import split_words
+
+
+@lru_cache(maxsize=256)
+def _ascii_pattern(term: str) -> "re.Pattern[bytes]":
+    # For bytes patterns, IGNORECASE only folds ASCII letters
+    return re.compile(re.escape(term.encode("ascii")), re.IGNORECASE)
+
+
+# The only non-ASCII characters whose lowercase contains an ASCII letter, by
+# that letter: the Kelvin sign (lowercase "k") and the capital I with dot
+# above (lowercase "i" plus a combining dot)
+_LOWERCASE_TO_ASCII = {"k": "\u212a".encode("utf-8"), "i": "\u0130".encode("utf-8")}
+
+
+def contains_all_ascii(path: str, terms: Iterable[str]) -> Optional[bool]:
+    """
+    Checks case-insensitively whether the file contains all (ASCII) terms.
+
+    Searches the memory-mapped raw bytes, so the note is neither decoded nor
+    copied. In UTF-8, ASCII bytes only ever encode ASCII characters, so this
+    agrees with searching the decoded, lowercased text, except where a term's
+    letter could come from one of the characters in _LOWERCASE_TO_ASCII.
+    Returns None if a term is missing and the note contains such a
+    character: then only the text can tell.
+    """
+    terms = [term.lower() for term in terms]
+    with open(path, "rb") as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped (and contain nothing)
+            return False
+        with buffer:
+            if all(_ascii_pattern(term).search(buffer) is not None for term in terms):
+                return True
+            for letter, encoded in _LOWERCASE_TO_ASCII.items():
+                if any(letter in term for term in terms) and buffer.find(encoded) >= 0:
+                    return None
+            return False
+
+
+class CachedNote:
+    """Contents of one note as read from disk, plus lazily derived forms."""
+
+    def __init__(self, path: str, text: str):
+        self.path = path
+        self.text = text
+        self.lower: Optional[str] = None
+        self.words: Optional[FrozenSet[str]] = None
+        self.size = sys.getsizeof(text)
+
+
+class NoteCache:
+    """
+    Process-wide LRU cache of note contents.
+
+    Entries are validated by the file's (mtime, size), so a changed note is
+    re-read while unchanged notes are served from memory. Besides the raw text
+    (used for embedding) it keeps the lowercased text and the word set (used
+    by keyword search). The least recently used notes are evicted once the
+    estimated memory use exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = CONTENT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Notes read from disk (including raw byte scans) and their size
+        self.files_read = 0
+        self.bytes_read = 0
+        # path -> (mtime_ns, size, CachedNote)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, (_, _, note) = self._entries.popitem(last=False)
+            self.total_bytes -= note.size
+
+    def _attach(self, note: CachedNote, attribute: str, value, added: int):
+        """Stores a derived form on a note (which may not be cached) and accounts for it."""
+        with self._lock:
+            if getattr(note, attribute) is not None:
+                # Another thread got there first
+                return getattr(note, attribute)
+            setattr(note, attribute, value)
+            note.size += added
+            entry = self._entries.get(note.path)
+            if entry is not None and entry[2] is note:
+                self.total_bytes += added
+                self._evict()
+            return value
+
+    def _lookup(self, path: str) -> Tuple[Optional[os.stat_result], Optional[CachedNote]]:
+        """
+        Returns the file's stat result (None if it cannot be stat'ed) and the
+        cached note if it is still current, without reading the file.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None, None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return stat, entry[2]
+            self.misses += 1
+        return stat, None
+
+    def get(self, path: str) -> CachedNote:
+        """
+        Returns the note at path, read from disk only if it is not cached or
+        changed since it was cached. Raises OSError if the note cannot be read.
+        """
+        stat, note = self._lookup(path)
+        if note is not None:
+            return note
+
+        with open(path, "r", errors="ignore") as f:
+            note = CachedNote(path, f.read())
+        self._count_read(stat.st_size if stat is not None else len(note.text))
+
+        # Notes we cannot stat cannot be validated later, so they are not cached.
+        if stat is not None and note.size <= self.max_bytes:
+            with self._lock:
+                previous = self._entries.pop(path, None)
+                if previous is not None:
+                    self.total_bytes -= previous[2].size
+                self._entries[path] = (stat.st_mtime_ns, stat.st_size, note)
+                self.total_bytes += note.size
+                self._evict()
+        return note
+
+    def contains_all(self, path: str, terms_lower: Iterable[str]) -> bool:
+        """
+        Checks whether the note's lowercased content contains all terms.
+
+        Uses the cached text if there is one. Otherwise ASCII terms are
+        searched in the raw file (see contains_all_ascii) without caching it,
+        and only non-ASCII terms (or notes the raw bytes can't answer for)
+        need the note decoded and lowercased.
+        """
+        terms_lower = list(terms_lower)
+        stat, note = self._lookup(path)
+        if note is None and all(term.isascii() for term in terms_lower):
+            if stat is not None:
+                self._count_read(stat.st_size)
+            found = contains_all_ascii(path, terms_lower)
+            if found is not None:
+                return found
+        content = self._lower_of(note if note is not None else self.get(path))
+        return all(term in content for term in terms_lower)
+
+    def _count_read(self, size: int):
+        with self._lock:
+            self.files_read += 1
+            self.bytes_read += size
+
+    def counters(self) -> Tuple[int, int, int]:
+        """(files read, bytes read, cache hits) so far; see profiling.Profiler."""
+        return self.files_read, self.bytes_read, self.hits
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "files_read": self.files_read,
+                "bytes_read": self.bytes_read,
+            }
+
+    def text(self, path: str) -> str:
+        """Returns the note's content as stored."""
+        return self.get(path).text
+
+    def _lower_of(self, note: CachedNote) -> str:
+        if note.lower is None:
+            lower = note.text.lower()
+            return self._attach(note, "lower", lower, sys.getsizeof(lower))
+        return note.lower
+
+    def lower(self, path: str) -> str:
+        """Returns the note's lowercased content."""
+        return self._lower_of(self.get(path))
+
+    def words(self, path: str) -> FrozenSet[str]:
+        """Returns the set of words in the note's lowercased content."""
+        note = self.get(path)
+        if note.words is None:
+            words = split_words(self._lower_of(note))
+            added = sys.getsizeof(words) + sum(sys.getsizeof(w) for w in words)
+            return self._attach(note, "words", words, added)
+        return note.words
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+# Shared by all searchers and index managers in this process, so that
+# repeated searches (e.g. from one MCP session) only re-read changed notes.
+note_cache = NoteCache()
@@ -0,0 +1,181 @@
+"""
+Lightweight instrumentation of searches and index updates.
+
+A Profiler records, per stage of one search (listing the notes, syncing the
+keyword index, evaluating a tier, embedding, the vector query, ...), the
+wall time, the notes read from disk, the bytes read and the note cache hits.
+`zkss --stats` prints them. Every stage is also added to a process-wide
+StatsRecorder, which keeps rolling latency histograms for the MCP
+`server_stats` tool.
+"""
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from settings import STATS_WINDOW
+from note_cache import note_cache, NoteCache
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class StageStats:
+    """What one stage cost, summed over the times it ran."""
+
+    __slots__ = ("calls", "seconds", "files_read", "bytes_read", "cache_hits")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.files_read = 0
+        self.bytes_read = 0
+        self.cache_hits = 0
+
+    def add(self, seconds: float, files_read: int = 0, bytes_read: int = 0, cache_hits: int = 0):
+        self.calls += 1
+        self.seconds += seconds
+        self.files_read += files_read
+        self.bytes_read += bytes_read
+        self.cache_hits += cache_hits
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "total_ms": round(self.seconds * 1000, 3),
+            "files_read": self.files_read,
+            "bytes_read": self.bytes_read,
+            "cache_hits": self.cache_hits,
+        }
+
+
+class LatencyHistogram:
+    """The latencies of the last `window` runs of a stage, as percentiles and a histogram."""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self.samples: "deque[float]" = deque(maxlen=max(1, window))
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def snapshot(self) -> dict:
+        samples_ms = sorted(seconds * 1000 for seconds in self.samples)
+        if not samples_ms:
+            return {"window": 0}
+
+        def percentile(p: float) -> float:
+            # Nearest rank
+            return round(samples_ms[max(0, math.ceil(p / 100 * len(samples_ms)) - 1)], 3)
+
+        buckets = {f"<={bound}ms": 0 for bound in BUCKETS_MS}
+        buckets[f">{BUCKETS_MS[-1]}ms"] = 0
+        for value in samples_ms:
+            bound = next((bound for bound in BUCKETS_MS if value <= bound), None)
+            buckets[f"<={bound}ms" if bound is not None else f">{BUCKETS_MS[-1]}ms"] += 1
+        return {
+            "window": len(samples_ms),
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99),
+            "max_ms": round(samples_ms[-1], 3),
+            "histogram": buckets,
+        }
+
+
+class StatsRecorder:
+    """Process-wide totals and rolling latencies of every stage (and MCP tool), by name."""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self.window = window
+        self.started = time.time()
+        self._totals: Dict[str, StageStats] = {}
+        self._latencies: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, files_read: int = 0, bytes_read: int = 0, cache_hits: int = 0):
+        with self._lock:
+            if name not in self._totals:
+                self._totals[name] = StageStats()
+                self._latencies[name] = LatencyHistogram(self.window)
+            self._totals[name].add(seconds, files_read, bytes_read, cache_hits)
+            self._latencies[name].add(seconds)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """name -> totals since the start plus percentiles and histogram of the recent runs."""
+        with self._lock:
+            return {
+                name: {**self._totals[name].as_dict(), **self._latencies[name].snapshot()}
+                for name in sorted(self._totals)
+            }
+
+    def clear(self):
+        with self._lock:
+            self._totals.clear()
+            self._latencies.clear()
+            self.started = time.time()
+
+
+# Fed by all profilers in this process
+stats_recorder = StatsRecorder()
+
+
+class Profiler:
+    """
+    Records the stages of one search (or of everything an IndexManager does).
+
+    Files read, bytes read and cache hits are the changes of the shared note
+    cache's counters while a stage ran, so they include reads by concurrent
+    searches (e.g. other MCP requests). Stages may nest; the outer stage then
+    includes the inner one.
+    """
+
+    def __init__(self, cache: NoteCache = note_cache, recorder: Optional[StatsRecorder] = stats_recorder):
+        self.note_cache = cache
+        self.recorder = recorder
+        # In the order the stages first started
+        self.stages: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measures the enclosed code as (one run of) the stage `name`."""
+        with self._lock:
+            self.stages.setdefault(name, StageStats())
+        before = self.note_cache.counters()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            after = self.note_cache.counters()
+            self.add(name, seconds, *(now - then for now, then in zip(after, before)))
+
+    def add(self, name: str, seconds: float, files_read: int = 0, bytes_read: int = 0, cache_hits: int = 0):
+        """Records a run of a stage that was measured elsewhere."""
+        with self._lock:
+            self.stages.setdefault(name, StageStats()).add(seconds, files_read, bytes_read, cache_hits)
+        if self.recorder is not None:
+            self.recorder.record(name, seconds, files_read, bytes_read, cache_hits)
+
+    def rows(self) -> List[List[str]]:
+        """One row per stage: name, calls, ms, files read, bytes read, cache hits."""
+        with self._lock:
+            return [
+                [name, str(stats.calls), f"{stats.seconds * 1000:.1f}",
+                 str(stats.files_read), f"{stats.bytes_read:,}", str(stats.cache_hits)]
+                for name, stats in self.stages.items()
+                if stats.calls
+            ]
+
+    def table(self):
+        """The stages as a rich Table."""
+        from rich.table import Table
+
+        table = Table(title="Stages", title_justify="left")
+        for column in ("stage", "calls", "ms", "notes read", "bytes read", "cache hits"):
+            table.add_column(column, justify="left" if column == "stage" else "right")
+        for row in self.rows():
+            table.add_row(*row)
+        return table
@@ -0,0 +1,112 @@
+import time
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+from settings import QUERY_CACHE_SIZE
+from atomic_write import atomic_write
+
+
+def normalize_query(query: str) -> str:
+    """Queries that only differ in surrounding or repeated whitespace share cache entries."""
+    return " ".join(query.split())
+
+
+class LRUCache:
+    """A small thread-safe least-recently-used mapping."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class QueryEmbeddingCache(LRUCache):
+    """
+    LRU cache of query embeddings, persisted across restarts.
+
+    Entries are only valid for the model that computed them, so the file
+    records the model id and is ignored if it doesn't match. New entries are
+    written out at most every save_interval seconds (and by save()).
+    """
+
+    FILE_NAME = "query_cache.pkl"
+    FORMAT_VERSION = 1
+
+    def __init__(self, path: str, model_id: str, max_entries: int = QUERY_CACHE_SIZE, save_interval: float = 30.0):
+        super().__init__(max_entries)
+        self.path = path
+        self.model_id = model_id
+        self.save_interval = save_interval
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def load(self) -> bool:
+        """Loads the cache from disk. Returns False if there is none (or it is unusable)."""
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+        except Exception:
+            return False
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != self.FORMAT_VERSION
+            or data.get("model") != self.model_id
+        ):
+            return False
+        with self._lock:
+            self._entries = OrderedDict(list(data["entries"])[-self.max_entries:])
+        return True
+
+    def get(self, query: str) -> Optional[List[float]]:
+        return super().get(normalize_query(query))
+
+    def put(self, query: str, vector: List[float]):
+        super().put(normalize_query(query), vector)
+        self._dirty = True
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        """Writes the cache atomically (temp file + rename), if it has new entries."""
+        if not self._dirty or self.max_entries <= 0:
+            return
+        with self._lock:
+            data = {"version": self.FORMAT_VERSION, "model": self.model_id, "entries": list(self._entries.items())}
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            with atomic_write(self.path) as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            # Only a cache; the next save tries again
+            self._dirty = True
@@ -2,4 +2,112 @@ ZK_BASE_DIR = (
     "/Users/ralf/Library/Mobile Documents/9CR7T2DMDG~com~ngocluu~onewriter/Documents"
 )
 ENDING = ".md"
-DEFAULT_RESULTS = 10
\ No newline at end of file
+DEFAULT_RESULTS = 10
+
+# Keep an on-disk inverted index (~/.zkss_keyword_index) for keyword search
+# so that queries don't have to re-read every note.
+USE_KEYWORD_INDEX = True
+
+# Number of notes keyword search evaluates in parallel (1 = one by one; can
+# be overridden with `zkss --jobs N`). With SEARCH_USE_PROCESSES, contents are
+# scanned in worker processes instead of threads (only without keyword index).
+SEARCH_JOBS = 1
+SEARCH_USE_PROCESSES = False
+
+# Memory budget for the in-process cache of note contents shared by keyword
+# and semantic search (least recently used notes are evicted first).
+CONTENT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Worker threads of the MCP server: for keyword search and reading notes, and
+# for semantic search (index updates and model inference).
+MCP_IO_WORKERS = 4
+MCP_EMBEDDING_WORKERS = 1
+
+# Watch mode (`zkss --watch`, and built into the MCP server if MCP_WATCH_INDEX
+# is True) embeds notes as they change; a full sync runs every
+# WATCH_RECONCILE_SECONDS in case a change notification was missed.
+MCP_WATCH_INDEX = True
+WATCH_RECONCILE_SECONDS = 600
+
+# `zkss --daemon` keeps the keyword index, note contents and the embedding
+# model in memory and listens on DAEMON_SOCKET; while it runs, `zkss`
+# forwards searches to it (unless USE_DAEMON is False or `--no-daemon` is
+# given) instead of loading everything itself.
+USE_DAEMON = True
+DAEMON_SOCKET = "~/.zkss_daemon.sock"
+
+# Semantic search embeds notes in chunks of up to CHUNK_MAX_CHARS characters,
+# split at headings and paragraphs (the embedding model only sees the first
+# ~256 tokens of its input). A note's score is the mean of its best
+# SEMANTIC_POOLING_TOP_K chunk similarities (1 = the best chunk only);
+# SEMANTIC_CHUNKS_PER_RESULT chunks are retrieved per requested result.
+CHUNK_MAX_CHARS = 1000
+SEMANTIC_POOLING_TOP_K = 1
+SEMANTIC_CHUNKS_PER_RESULT = 5
+
+# Index builds: notes are read by INDEX_READ_WORKERS threads, chunks are
+# written to Chroma in the background in batches of about INDEX_BATCH_BYTES,
+# and the model encodes EMBEDDING_BATCH_SIZE chunks of similar length at a
+# time. When at least EMBEDDING_PROCESS_MIN_NOTES notes need indexing (e.g. a
+# cold build), encoding is spread over EMBEDDING_PROCESSES worker processes
+# (0 = one per CPU core, 1 = encode in the main process only).
+INDEX_READ_WORKERS = 4
+INDEX_BATCH_BYTES = 512 * 1024
+EMBEDDING_BATCH_SIZE = 64
+EMBEDDING_PROCESSES = 0
+EMBEDDING_PROCESS_MIN_NOTES = 500
+
+# Model runtime for semantic search: "sentence-transformers" (PyTorch),
+# "onnx" (ONNX Runtime, no torch; same vectors) or "onnx-int8" (ONNX Runtime
+# with int8-quantized weights; fastest, vectors differ slightly, so switching
+# to or from it re-embeds all notes).
+EMBEDDING_BACKEND = "sentence-transformers"
+
+# Where chunk vectors are stored: "chroma" (ChromaDB with an HNSW index) or
+# "numpy" (a memory-mapped matrix searched exactly; starts faster and is
+# quicker for vaults of up to ~100k notes). Each store keeps its own index,
+# so switching embeds the notes once. NUMPY_VECTOR_DTYPE is "float32" or
+# "float16" (half the size, slightly less precise scores).
+VECTOR_STORE = "chroma"
+NUMPY_VECTOR_DTYPE = "float32"
+
+# Semantic search caches: embeddings of the last QUERY_CACHE_SIZE queries
+# (kept across restarts in ~/.zkss_index) and the results of the last
+# RESULT_CACHE_SIZE searches (until the index changes). 0 disables a cache.
+QUERY_CACHE_SIZE = 1000
+RESULT_CACHE_SIZE = 256
+
+# Hybrid search (`zkss --hybrid`) fuses the best HYBRID_CANDIDATES notes of a
+# BM25 keyword ranking and of semantic search with reciprocal rank fusion
+# (a note scores 1 / (HYBRID_RRF_K + rank) in each ranking).
+HYBRID_CANDIDATES = 50
+HYBRID_RRF_K = 60
+
+# The MCP `server_stats` tool reports latency percentiles and histograms over
+# the last STATS_WINDOW runs of each search stage and tool.
+STATS_WINDOW = 1000
+
+# Keyword search and the semantic indexer share one listing of the notes
+# (names, sizes, mtimes and access times from a single scandir pass). It is
+# reused while no note is added, removed or renamed, for at most
+# SNAPSHOT_MAX_AGE_SECONDS (notes edited in place and access times, which
+# order keyword results, are noticed after that; also with a watcher).
+SNAPSHOT_MAX_AGE_SECONDS = 2.0
+
+# With VAULT_RECURSIVE, notes in subfolders of ZK_BASE_DIR are searched and
+# indexed too, identified by their relative path ("folder/note.md").
+# VAULT_INCLUDE (if not empty) and VAULT_EXCLUDE are fnmatch-style globs on
+# that path; patterns without "/" match a file or folder name at any depth,
+# and patterns ending with "/" only match folders (excluded folders aren't
+# entered; an included folder selects all notes below it). The default skips hidden folders such as .obsidian, but not notes
+# whose name starts with a dot. Folders are listed by VAULT_WALK_WORKERS
+# threads in parallel.
+VAULT_RECURSIVE = False
+VAULT_INCLUDE = []
+VAULT_EXCLUDE = [".*/"]
+VAULT_WALK_WORKERS = 8
+
+# Results of the MCP search tools include an excerpt of each note of at most
+# SNIPPET_MAX_BYTES (UTF-8): around the first match for keyword searches, from
+# the best-matching chunk for semantic search. 0 lists titles only.
+SNIPPET_MAX_BYTES = 300
@@ -0,0 +1,71 @@
+"""
+Short excerpts of notes shown with search results, so that an assistant can
+often answer without reading the whole note.
+"""
+import re
+from typing import Iterable, Optional
+
+from settings import SNIPPET_MAX_BYTES
+
+ELLIPSIS = "…"
+_ELLIPSIS_BYTES = len(ELLIPSIS.encode("utf-8"))
+_WHITESPACE = re.compile(r"\s+")
+
+
+def truncate_bytes(text: str, max_bytes: int) -> str:
+    """Cuts text to at most max_bytes of UTF-8, at a character boundary."""
+    if max_bytes <= 0:
+        return ""
+    encoded = text.encode("utf-8", errors="surrogatepass")
+    if len(encoded) <= max_bytes:
+        return text
+    return encoded[:max_bytes].decode("utf-8", errors="ignore")
+
+
+def find_match(text_lower: str, phrase_lower: str, terms_lower: Iterable[str] = ()) -> Optional[int]:
+    """Offset of the phrase in the text, else of the earliest term (None if none occurs)."""
+    if phrase_lower:
+        position = text_lower.find(phrase_lower)
+        if position >= 0:
+            return position
+    positions = [text_lower.find(term) for term in terms_lower if term]
+    positions = [position for position in positions if position >= 0]
+    return min(positions) if positions else None
+
+
+def make_snippet(text: str, search_string: str = "", max_bytes: int = SNIPPET_MAX_BYTES) -> str:
+    """
+    An excerpt of at most max_bytes (UTF-8) of text on one line: around the
+    first occurrence of the search string (or of one of its words), or from
+    the start if they don't occur. Cut at word boundaries, with an ellipsis
+    where text was left out (just the ellipsis if no text fits besides it,
+    "" if not even that fits).
+    """
+    if max_bytes <= 0 or not text:
+        return ""
+    search_lower = " ".join(search_string.lower().split())
+    text = _WHITESPACE.sub(" ", text).strip()
+    text_lower = text.lower()
+    # Offsets into the lowercased text only fit if lowercasing kept the length
+    position = find_match(text_lower, search_lower, search_lower.split()) if len(text_lower) == len(text) else None
+
+    start = 0
+    if position is not None:
+        # Some context before the match; the rest of the budget after it
+        start = max(0, position - max_bytes // 4)
+        if start > 0:
+            space = text.find(" ", start, position)
+            start = space + 1 if space >= 0 else start
+    excerpt = text[start:]
+    budget = max_bytes - (_ELLIPSIS_BYTES if start > 0 else 0)
+    cut = truncate_bytes(excerpt, budget)
+    if len(cut) < len(excerpt):
+        budget -= _ELLIPSIS_BYTES
+        if budget <= 0:
+            return ELLIPSIS if max_bytes >= _ELLIPSIS_BYTES else ""
+        cut = truncate_bytes(excerpt, budget)
+        space = cut.rfind(" ")
+        if space > len(cut) // 2:
+            cut = cut[:space]
+        cut = cut.rstrip() + ELLIPSIS
+    return (ELLIPSIS if start > 0 else "") + cut
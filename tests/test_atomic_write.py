@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from atomic_write import atomic_write
+
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sub", "data.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_replaces_file_and_creates_directory(self):
+        with atomic_write(self.path, "w") as f:
+            f.write("first")
+        with atomic_write(self.path) as f:
+            f.write("second".encode("utf-8"))
+
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "second")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["data.json"])
+
+    def test_failed_write_keeps_old_file(self):
+        with atomic_write(self.path, "w") as f:
+            f.write("old")
+        with self.assertRaises(RuntimeError):
+            with atomic_write(self.path, "w") as f:
+                f.write("partial")
+                raise RuntimeError("interrupted")
+
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["data.json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
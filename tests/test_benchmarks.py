@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "benchmarks"))
+
+from synthetic_vault import generate_vault
+from suite import compare
+
+
+class TestSyntheticVault(unittest.TestCase):
+    def test_same_seed_gives_same_vault(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = generate_vault(os.path.join(tmp, "a"), 20, seed=3)
+            second = generate_vault(os.path.join(tmp, "b"), 20, seed=3)
+
+            self.assertEqual(first, second)
+            self.assertEqual(len(first), 20)
+            for filename in first:
+                with open(os.path.join(tmp, "a", filename), encoding="utf-8") as a, \
+                     open(os.path.join(tmp, "b", filename), encoding="utf-8") as b:
+                    self.assertEqual(a.read(), b.read())
+                self.assertEqual(
+                    os.stat(os.path.join(tmp, "a", filename)).st_mtime,
+                    os.stat(os.path.join(tmp, "b", filename)).st_mtime,
+                )
+            self.assertNotEqual(generate_vault(os.path.join(tmp, "c"), 20, seed=4), first)
+
+
+class TestCompare(unittest.TestCase):
+    def test_reports_metrics_worse_than_tolerance(self):
+        baseline = {"metrics": {"1000": {"a_ms": 10.0, "b_per_s": 100.0, "c_s": 1.0, "hits": 5, "d_ms": 10.0}}}
+        results = {"metrics": {"1000": {"a_ms": 13.0, "b_per_s": 90.0, "c_s": 1.1, "hits": 50, "new_ms": 1.0}}}
+
+        regressions = compare(results, baseline, tolerance=0.2)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("1000 notes: a_ms 10.0 -> 13.0"))
+        self.assertEqual(compare(results, baseline, tolerance=0.5), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import os
+import sys
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunking import split_into_chunks
+
+
+class TestSplitIntoChunks(unittest.TestCase):
+    def test_short_note_is_one_chunk(self):
+        self.assertEqual(split_into_chunks("Just a thought.\n\nAnd another.\n"), ["Just a thought.\n\nAnd another."])
+        self.assertEqual(split_into_chunks("  \n"), [])
+
+    def test_split_at_headings(self):
+        text = "Intro\n\n# First\nOne\n\n## Second\nTwo"
+        self.assertEqual(split_into_chunks(text), ["Intro", "# First\n\nOne", "## Second\n\nTwo"])
+
+    def test_paragraphs_are_packed_and_keep_their_heading(self):
+        paragraph = "word " * 15  # 75 characters
+        text = "# Topic\n\n" + "\n\n".join([paragraph.strip()] * 4)
+        chunks = split_into_chunks(text, max_chars=200)
+
+        self.assertEqual(len(chunks), 2)
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith("# Topic\n\n"))
+            self.assertLessEqual(len(chunk), 200)
+
+    def test_oversized_paragraphs_are_split(self):
+        text = "This is a sentence. " * 50 + "x" * 250
+        chunks = split_into_chunks(text, max_chars=100)
+
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        self.assertTrue(chunks[0].endswith("sentence."))
+        self.assertEqual("".join(chunks).replace(" ", ""), text.replace(" ", ""))
+
+
+if __name__ == '__main__':
+    unittest.main()
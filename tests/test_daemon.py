@@ -0,0 +1,105 @@
+import io
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zkss_daemon
+from keyword_index import KeywordIndex
+from zkss_daemon import SearchDaemon, forward, show
+
+VAULT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "vault")
+
+
+class TestSearchDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp.name, "zkss.sock")
+        index_path = os.path.join(self.tmp.name, "keyword_index")
+        patcher = patch('zkss.KeywordIndex', lambda base_dir: KeywordIndex(base_dir, path=index_path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.daemon = SearchDaemon(VAULT, ".md", socket_path=self.socket_path)
+        self.assertTrue(self.daemon.start())
+        self.thread = threading.Thread(target=self.daemon._server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.thread.join()
+        self.daemon.stop()
+        self.tmp.cleanup()
+
+    def test_forwards_keyword_search(self):
+        response = forward(["sourdough"], socket_path=self.socket_path, base_dir=VAULT)
+
+        self.assertEqual(response["exit_code"], 0)
+        self.assertTrue(response["page"])
+        self.assertIn("202401031000 Sourdough starter", response["stdout"])
+
+        # The keyword index stays loaded for the next search
+        index = self.daemon.keyword_index
+        self.assertIsNotNone(index)
+        response = forward(["zettelkasten"], socket_path=self.socket_path, base_dir=VAULT)
+        self.assertIn("202401021530 Zettelkasten method", response["stdout"])
+        self.assertIs(self.daemon.keyword_index, index)
+        self.assertEqual(self.daemon.requests, 2)
+
+    def test_exit_codes_and_errors_are_forwarded(self):
+        response = forward([], socket_path=self.socket_path, base_dir=VAULT)
+        self.assertEqual(response["exit_code"], 0)
+        self.assertIn("No search string given.", response["stdout"])
+
+        response = forward(["--limit", "many", "x"], socket_path=self.socket_path, base_dir=VAULT)
+        self.assertEqual(response["exit_code"], 2)
+        self.assertIn("invalid int value", response["stderr"])
+
+    def test_semantic_search_reuses_index_manager(self):
+        index_manager = MagicMock()
+        index_manager.watched_elsewhere.return_value = True
+        index_manager.search.return_value = ["202401011200 Spaced repetition.md"]
+        self.daemon.index_manager = index_manager
+
+        response = forward(["-s", "memory"], socket_path=self.socket_path, base_dir=VAULT)
+
+        self.assertIn("202401011200 Spaced repetition", response["stdout"])
+        self.assertFalse(response["page"])
+        index_manager.search.assert_called_once_with("memory", n_results=10)
+        self.assertIs(self.daemon.index_manager, index_manager)
+
+    def test_other_vault_or_no_daemon_falls_back(self):
+        self.assertIsNone(forward(["x"], socket_path=self.socket_path, base_dir="/elsewhere"))
+        self.assertIsNone(forward(["x"], socket_path=os.path.join(self.tmp.name, "none.sock"), base_dir=VAULT))
+        # Only one daemon per socket
+        self.assertFalse(SearchDaemon(VAULT, ".md", socket_path=self.socket_path).start())
+
+    def test_main_prints_reply_or_searches_in_process(self):
+        stdout = io.StringIO()
+        with patch('zkss_daemon.forward', lambda argv: forward(argv, self.socket_path, VAULT)), \
+             patch('sys.stdout', stdout), \
+             self.assertRaises(SystemExit) as exited:
+            zkss_daemon.main(["evergreen"])
+        self.assertEqual(exited.exception.code, 0)
+        self.assertIn("202401050900 Evergreen notes", stdout.getvalue())
+
+        with patch('zkss_daemon.forward') as mock_forward, patch('zkss.ZKSearcher.run') as mock_run:
+            zkss_daemon.main(["--no-daemon", "evergreen"])
+        mock_forward.assert_not_called()
+        mock_run.assert_called_once_with(["--no-daemon", "evergreen"])
+
+    def test_show(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with patch('sys.stdout', stdout), patch('sys.stderr', stderr):
+            code = show({"stdout": "results\n", "stderr": "indexing\n", "exit_code": 3, "page": True})
+        self.assertEqual(code, 3)
+        self.assertEqual(stdout.getvalue(), "results\n")
+        self.assertEqual(stderr.getvalue(), "indexing\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedder import Embedder
+
+
+class TestEmbedder(unittest.TestCase):
+    def test_batches_by_length_and_keeps_order(self):
+        embedding_fn = MagicMock(side_effect=lambda texts: [[float(len(text))] for text in texts])
+        embedder = Embedder(embedding_fn, "sentence-transformers", "model", batch_size=2, processes=1)
+        texts = ["ccc", "a", "dddd", "bb", "eeeee"]
+
+        vectors = embedder.embed(texts)
+
+        self.assertEqual(vectors, [[3.0], [1.0], [4.0], [2.0], [5.0]])
+        batches = [encode_call[0][0] for encode_call in embedding_fn.call_args_list]
+        self.assertEqual(batches, [["a", "bb"], ["ccc", "dddd"], ["eeeee"]])
+
+    def test_single_process_does_not_start_pool(self):
+        embedder = Embedder(MagicMock(), "sentence-transformers", "model", processes=1)
+        self.assertFalse(embedder.start_pool())
+        self.assertEqual(embedder.embed([]), [])
+        embedder.close()
+
+    def test_pool_spawns_workers_that_load_the_model(self):
+        embedder = Embedder(MagicMock(), "onnx", "model", processes=2)
+        with patch('embedder.ProcessPoolExecutor') as pool_class:
+            self.assertTrue(embedder.start_pool())
+        kwargs = pool_class.call_args.kwargs
+        self.assertEqual(kwargs["mp_context"].get_start_method(), "spawn")
+        self.assertEqual(kwargs["initargs"], ("onnx", "model"))
+        embedder.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import os
+import sys
+import importlib.util
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunking import split_into_chunks
+from embedding_backends import OnnxEmbeddingFunction, create_embedding_function, embedding_model_id
+
+VAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "vault")
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def _installed(*modules):
+    return all(importlib.util.find_spec(module) is not None for module in modules)
+
+
+def _vault_chunks():
+    chunks = []
+    for filename in sorted(os.listdir(VAULT_DIR)):
+        with open(os.path.join(VAULT_DIR, filename), encoding="utf-8") as f:
+            chunks.extend(split_into_chunks(f.read()))
+    return chunks
+
+
+class TestOnnxEmbeddingFunction(unittest.TestCase):
+    def test_mean_pooling_ignores_padding(self):
+        fn = OnnxEmbeddingFunction(MODEL_NAME)
+        fn._tokenizer = MagicMock()
+        fn._tokenizer.encode_batch.return_value = [
+            MagicMock(ids=[1, 2], attention_mask=[1, 1], type_ids=[0, 0]),
+            MagicMock(ids=[1, 0], attention_mask=[1, 0], type_ids=[0, 0]),
+        ]
+        fn._session = MagicMock()
+        fn._session.get_inputs.return_value = [MagicMock(), MagicMock()]
+        fn._session.get_inputs.return_value[0].name = "input_ids"
+        fn._session.get_inputs.return_value[1].name = "attention_mask"
+        fn._session.run.return_value = [np.array([
+            [[3.0, 0.0], [0.0, 4.0]],
+            [[0.0, 2.0], [9.0, 9.0]],  # second token is padding
+        ])]
+
+        vectors = fn(["a b", "a"])
+
+        np.testing.assert_allclose(vectors[0], [0.6, 0.8])
+        np.testing.assert_allclose(vectors[1], [0.0, 1.0])
+        # Only the inputs the model declares are fed
+        self.assertEqual(sorted(fn._session.run.call_args[0][1]), ["attention_mask", "input_ids"])
+
+    def test_sentence_transformers_loads_model_on_first_use(self):
+        model = MagicMock()
+        model.encode.return_value = np.array([[0.6, 0.8]])
+        model_class = MagicMock(return_value=model)
+        modules = {"sentence_transformers": MagicMock(SentenceTransformer=model_class), "chromadb": None}
+
+        with patch.dict(sys.modules, modules):
+            fn = create_embedding_function("sentence-transformers", MODEL_NAME)
+            model_class.assert_not_called()
+            vectors = fn(["a"])
+
+        model_class.assert_called_once_with(MODEL_NAME, device="cpu")
+        self.assertEqual(vectors[0].dtype, np.float32)
+        np.testing.assert_allclose(vectors[0], [0.6, 0.8], rtol=1e-6)
+        self.assertEqual(fn([]), [])
+
+    def test_model_ids_and_unknown_backend(self):
+        self.assertEqual(embedding_model_id("onnx", MODEL_NAME), MODEL_NAME)
+        self.assertEqual(embedding_model_id("onnx-int8", MODEL_NAME), f"{MODEL_NAME} (int8)")
+        with self.assertRaises(ValueError):
+            create_embedding_function("tensorflow", MODEL_NAME)
+
+
+@unittest.skipUnless(
+    _installed("sentence_transformers", "onnxruntime", "tokenizers", "huggingface_hub")
+    and os.environ.get("ZKSS_PARITY_TESTS"),
+    "needs the model runtimes and downloaded models (set ZKSS_PARITY_TESTS=1)",
+)
+class TestBackendParity(unittest.TestCase):
+    """The ONNX backends embed the fixture vault like the sentence-transformers model."""
+
+    QUERIES = ["memorizing with flashcards", "linking ideas in a slip box", "baking bread", "running workouts"]
+
+    @classmethod
+    def setUpClass(cls):
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(MODEL_NAME, device="cpu")
+        cls.chunks = _vault_chunks()
+        cls.reference = model.encode(cls.chunks, normalize_embeddings=True)
+        cls.reference_queries = model.encode(cls.QUERIES, normalize_embeddings=True)
+
+    def _similarities(self, backend):
+        embedding_fn = create_embedding_function(backend, MODEL_NAME)
+        vectors = np.array(embedding_fn(self.chunks))
+        query_vectors = np.array(embedding_fn(self.QUERIES))
+        return (vectors * self.reference).sum(axis=1), vectors, query_vectors
+
+    def _assert_same_ranking(self, vectors, query_vectors):
+        """Every query finds the same best chunk as with the reference model."""
+        np.testing.assert_array_equal(
+            np.argmax(query_vectors @ vectors.T, axis=1),
+            np.argmax(self.reference_queries @ self.reference.T, axis=1),
+        )
+
+    def test_onnx_matches_reference(self):
+        similarities, vectors, query_vectors = self._similarities("onnx")
+        self.assertGreater(similarities.min(), 0.999)
+        self._assert_same_ranking(vectors, query_vectors)
+
+    def test_onnx_int8_is_close_to_reference(self):
+        similarities, vectors, query_vectors = self._similarities("onnx-int8")
+        self.assertGreater(similarities.min(), 0.97)
+        self._assert_same_ranking(vectors, query_vectors)
+
+
+if __name__ == '__main__':
+    unittest.main()
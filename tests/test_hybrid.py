@@ -0,0 +1,77 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hybrid import HybridSearcher, format_timings, reciprocal_rank_fusion
+from keyword_index import KeywordIndex
+from cancellation import SearchCancelled
+
+NOTES = {
+    "202101010000 Compost.md": "How to start a compost heap in the garden.",
+    "202101020000 Bees.md": "Bees need flowers; my garden has lavender.",
+    "202101030000 Taxes.md": "Filing taxes before April.",
+}
+
+
+class TestReciprocalRankFusion(unittest.TestCase):
+    def test_fusion(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+        self.assertEqual([f for f, _ in fused], ["b", "a", "d", "c"])
+        self.assertAlmostEqual(dict(fused)["b"], 1 / 62 + 1 / 61)
+
+    def test_format_timings(self):
+        timings = {"total": 0.01, "bm25": 0.0005, "vector": 0.002}
+        self.assertEqual(format_timings(timings), "bm25 0.5 ms, vector 2.0 ms, total 10.0 ms")
+
+
+class TestHybridSearcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base_dir = os.path.join(self.tmp.name, "zk")
+        os.mkdir(self.base_dir)
+        for filename, content in NOTES.items():
+            with open(os.path.join(self.base_dir, filename), "w") as f:
+                f.write(content)
+        index_path = os.path.join(self.tmp.name, "keyword_index")
+        patcher = patch('zkss.KeywordIndex', lambda base_dir: KeywordIndex(base_dir, path=index_path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.indexer = MagicMock()
+        self.indexer.search.return_value = ["202101020000 Bees.md", "202101030000 Taxes.md"]
+        self.searcher = HybridSearcher(self.indexer, base_dir=self.base_dir, ending=".md")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fuses_bm25_and_vector_rankings(self):
+        result = self.searcher.search("compost garden", limit=2)
+
+        # Bees ranks in both lists, Compost is the best BM25 match
+        self.assertEqual(result.filenames, ["202101020000 Bees.md", "202101010000 Compost.md"])
+        self.indexer.update_index.assert_called_once()
+        self.indexer.search.assert_called_once_with("compost garden", n_results=50)
+        for stage in ["keyword_index", "bm25", "semantic_index", "vector", "fusion", "total"]:
+            self.assertIn(stage, result.timings)
+
+    def test_skips_index_update_when_watched(self):
+        result = self.searcher.search("taxes", update_index=False)
+        self.indexer.update_index.assert_not_called()
+        self.assertNotIn("semantic_index", result.timings)
+        self.assertEqual(result.filenames[0], "202101030000 Taxes.md")
+
+    def test_cancellation(self):
+        cancel_event = threading.Event()
+        cancel_event.set()
+        with self.assertRaises(SearchCancelled):
+            self.searcher.search("garden", cancel_event=cancel_event)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 import os
 import sys
+import tempfile
+import threading
 from unittest.mock import MagicMock, patch, mock_open
 
 # Add parent directory to path so we can import modules
@@ -8,11 +10,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Mock external ML libraries BEFORE importing indexer
 sys.modules['chromadb'] = MagicMock()
-sys.modules['chromadb.utils'] = MagicMock()
-sys.modules['chromadb.utils.embedding_functions'] = MagicMock()
 
 from indexer import IndexManager
-from settings import DEFAULT_RESULTS
+from manifest import IndexManifest, content_hash
+from query_cache import QueryEmbeddingCache
+from settings import DEFAULT_RESULTS, SEMANTIC_CHUNKS_PER_RESULT
+from chunking import split_into_chunks
+from vault_snapshot import VaultSnapshots
 
 class TestIndexManager(unittest.TestCase):
     def setUp(self):
@@ -27,44 +31,109 @@ class TestIndexManager(unittest.TestCase):
         # Mock console
         self.indexer.console = MagicMock()
 
-    @patch('os.listdir')
-    @patch('os.path.isfile')
-    @patch('os.path.getmtime')
-    def test_get_all_files(self, mock_mtime, mock_isfile, mock_listdir):
-        """Test scanning directory for files and mtimes."""
-        mock_listdir.return_value = ["note1.md", "note2.md", "image.png", "folder"]
-        mock_isfile.side_effect = lambda p: "folder" not in p
-        mock_mtime.return_value = 12345.0
+        # Fake model: one small vector per text
+        self.indexer.embedder.embedding_fn = MagicMock(side_effect=lambda texts: [[0.5, 0.5] for _ in texts])
+
+        # Keep the manifest out of the real index directory
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        self.indexer.manifest = IndexManifest(self.manifest_path, "/tmp/test_zk")
+        self.indexer.query_cache = QueryEmbeddingCache(
+            os.path.join(self.tmp.name, "query_cache.pkl"), self.indexer.model_id
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_query_caches_are_saved_at_exit_without_keeping_managers_alive(self):
+        import gc
+        import weakref
+        import indexer as indexer_module
+
+        with patch('chromadb.PersistentClient', return_value=self.mock_client):
+            other = IndexManager(base_dir="/tmp/test_zk")
+        query_cache = weakref.ref(other.query_cache)
+        self.assertIn(other.query_cache, indexer_module._query_caches)
+        with patch.object(QueryEmbeddingCache, 'save') as save:
+            indexer_module._save_query_caches()
+        self.assertTrue(save.called)
+
+        del other
+        gc.collect()
+        self.assertIsNone(query_cache())
+
+    def test_get_all_files(self):
+        """Test scanning directory for files, mtimes and sizes."""
+        base_dir = os.path.join(self.tmp.name, "zk")
+        os.makedirs(os.path.join(base_dir, "folder.md"))
+        for name in ["note1.md", "note2.md", "image.png"]:
+            with open(os.path.join(base_dir, name), "w") as f:
+                f.write("content")
+        os.utime(os.path.join(base_dir, "note1.md"), (12345.0, 12345.0))
+        self.indexer.base_dir = base_dir
 
         files = self.indexer._get_all_files()
         
         self.assertEqual(len(files), 2)
-        self.assertIn("note1.md", files)
+        self.assertEqual(files["note1.md"], (12345.0, 7))
         self.assertIn("note2.md", files)
         self.assertNotIn("image.png", files) # Wrong extension
+        self.assertNotIn("folder.md", files) # Not a file
+
+    def _chunk_id(self, filename, text="content"):
+        return f"{filename}#{content_hash(text)}"
+
+    def _index_note(self, filename, mtime=1000.0, size=7, text="content"):
+        """Records a note with a single chunk in the manifest."""
+        self.indexer.manifest.set(filename, mtime, size, content_hash(text), [content_hash(text)])
+
+    def _numpy_indexer(self, notes):
+        """
+        An IndexManager with a NumPy store (in the temp dir) over a vault of
+        notes ({path: text}), whose fake model maps texts mentioning apples
+        and all others to two different vectors.
+        """
+        base_dir = os.path.join(self.tmp.name, "zk")
+        for name, text in notes.items():
+            os.makedirs(os.path.dirname(os.path.join(base_dir, name)), exist_ok=True)
+            with open(os.path.join(base_dir, name), "w") as f:
+                f.write(text)
+        with patch.object(IndexManager, 'DB_DIR_NAME', os.path.join(self.tmp.name, "index")):
+            indexer = IndexManager(base_dir=base_dir, vector_store="numpy")
+        indexer.console = MagicMock()
+        indexer.embedder.embedding_fn = MagicMock(
+            side_effect=lambda texts: [[1.0, 0.1] if "apple" in t else [0.1, 1.0] for t in texts]
+        )
+        return indexer
 
     def test_update_index_incremental(self):
         """Test logic for identifying new, modified, and deleted files."""
         # 1. Setup Filesystem state
         current_files = {
-            "new.md": 2000.0,      # New file
-            "modified.md": 2000.0, # Modified (newer than DB)
-            "unchanged.md": 1000.0 # Unchanged
+            "new.md": (2000.0, 7),      # New file
+            "modified.md": (2000.0, 7), # Modified (newer than DB)
+            "unchanged.md": (1000.0, 7) # Unchanged
         }
         
-        # 2. Setup DB state
+        # 2. Setup DB state (no manifest yet, so it is built from Chroma)
         # existing in DB: modified (old), unchanged, deleted
-        existing_ids = ["modified.md", "unchanged.md", "deleted.md"]
+        existing_ids = [
+            self._chunk_id("modified.md", "old content"),
+            self._chunk_id("unchanged.md"),
+            self._chunk_id("deleted.md"),
+        ]
         existing_metadatas = [
-            {"mtime": 1000.0}, # Old mtime
-            {"mtime": 1000.0}, # Same mtime
-            {"mtime": 1000.0}
+            {"parent": "modified.md", "hash": content_hash("old content")},
+            {"parent": "unchanged.md", "hash": content_hash("content")},
+            {"parent": "deleted.md", "hash": content_hash("content")},
         ]
         
-        self.mock_collection.get.return_value = {
-            'ids': existing_ids,
-            'metadatas': existing_metadatas
-        }
+        def get(ids=None, include=None):
+            if include == ['embeddings']:
+                return {'ids': ids, 'embeddings': [[0.1]] * len(ids)}
+            return {'ids': existing_ids, 'metadatas': existing_metadatas}
+
+        self.mock_collection.get.side_effect = get
 
         # Mock _get_all_files to return our controlled state
         self.indexer._get_all_files = MagicMock(return_value=current_files)
@@ -75,32 +144,287 @@ class TestIndexManager(unittest.TestCase):
 
         # 3. Assertions
         
-        # Verify Upserts (New + Modified)
-        # Should upsert "new.md" and "modified.md"
-        # "unchanged.md" should be skipped
-        self.assertTrue(self.mock_collection.upsert.called)
-        call_args = self.mock_collection.upsert.call_args[1] # kwargs
-        
-        upserted_ids = call_args['ids']
-        self.assertIn("new.md", upserted_ids)
-        self.assertIn("modified.md", upserted_ids)
-        self.assertNotIn("unchanged.md", upserted_ids)
+        # Nothing needs embedding: all chunks have the content of indexed ones
+        # ("deleted.md" is only removed after the others took over its vector)
+        upserted_ids = []
+        for upsert_call in self.mock_collection.upsert.call_args_list:
+            upserted_ids.extend(upsert_call[1]['ids'])
+        self.assertEqual(sorted(upserted_ids), [self._chunk_id("modified.md"), self._chunk_id("new.md")])
+        self.assertNotIn(self._chunk_id("unchanged.md"), upserted_ids)
         
         # Verify Deletes
-        # Should delete "deleted.md"
-        self.mock_collection.delete.assert_called_with(ids=["deleted.md"])
+        # The stale chunk of "modified.md" and all of "deleted.md"
+        deleted_ids = []
+        for delete_call in self.mock_collection.delete.call_args_list:
+            deleted_ids.extend(delete_call[1]['ids'])
+        self.assertEqual(
+            sorted(deleted_ids),
+            sorted([self._chunk_id("modified.md", "old content"), self._chunk_id("deleted.md")]),
+        )
+
+    def test_update_index_uses_manifest(self):
+        """With a manifest, syncing is a local diff; Chroma only sees the delta."""
+        manifest = self.indexer.manifest
+        self._index_note("unchanged.md", text="unchanged")
+        self._index_note("resized.md", text="old")
+        self._index_note("deleted.md", text="gone")
+        manifest.save()
+
+        self.indexer._get_all_files = MagicMock(return_value={
+            "unchanged.md": (1000.0, 7),
+            "resized.md": (1000.0, 9),
+            "new.md": (2000.0, 7),
+        })
+        with patch('builtins.open', mock_open(read_data="content")):
+            self.indexer.update_index()
+
+        self.mock_collection.get.assert_not_called()
+        call_args = self.mock_collection.upsert.call_args[1]
+        self.assertEqual(sorted(call_args['ids']), [self._chunk_id("new.md"), self._chunk_id("resized.md")])
+        self.assertEqual(call_args['metadatas'][0], {"parent": "resized.md", "hash": content_hash("content")})
+        deleted_ids = [delete_call[1]['ids'] for delete_call in self.mock_collection.delete.call_args_list]
+        self.assertEqual(deleted_ids, [[self._chunk_id("resized.md", "old")], [self._chunk_id("deleted.md", "gone")]])
+
+        # The manifest on disk reflects the new state
+        reloaded = IndexManifest(self.manifest_path, "/tmp/test_zk")
+        self.assertTrue(reloaded.load())
+        self.assertEqual(sorted(reloaded.entries), ["new.md", "resized.md", "unchanged.md"])
+        self.assertEqual(reloaded.entries["resized.md"]["size"], 9)
+        self.assertEqual(reloaded.entries["resized.md"]["chunks"], [content_hash("content")])
+
+    def test_only_changed_chunks_are_embedded(self):
+        text = "# Title\n\nFirst paragraph.\n\n# Other\n\nSecond paragraph."
+        old_text = text.replace("Second", "Old second")
+        chunks = split_into_chunks(old_text, max_chars=30)
+        self.indexer.manifest.set(
+            "note.md", 1000.0, len(old_text), content_hash(old_text), [content_hash(c) for c in chunks]
+        )
+        self.indexer.manifest.save()
+        self.indexer._get_all_files = MagicMock(return_value={"note.md": (2000.0, len(text))})
+
+        with patch('indexer.split_into_chunks', lambda content: split_into_chunks(content, max_chars=30)), \
+             patch('builtins.open', mock_open(read_data=text)):
+            self.indexer.update_index()
+
+        call_args = self.mock_collection.upsert.call_args[1]
+        self.assertEqual(call_args['documents'], ["# Other\n\nSecond paragraph."])
+        self.mock_collection.delete.assert_called_once_with(
+            ids=[self._chunk_id("note.md", "# Other\n\nOld second paragraph.")]
+        )
+        self.assertEqual(len(self.indexer.manifest.entries["note.md"]["chunks"]), 2)
+
+    def test_unchanged_content_is_not_reembedded(self):
+        """Notes whose mtime moved but whose content didn't are only updated in the manifest."""
+        manifest = self.indexer.manifest
+        self._index_note("touched.md")
+        manifest.save()
+        self.indexer._get_all_files = MagicMock(return_value={"touched.md": (2000.0, 7)})
+
+        with patch('builtins.open', mock_open(read_data="content")):
+            self.indexer.update_index()
+
+        self.mock_collection.upsert.assert_not_called()
+        self.mock_collection.delete.assert_not_called()
+        self.assertEqual(manifest.entries["touched.md"]["mtime"], 2000.0)
+
+    def test_forced_reindex_reuses_vectors(self):
+        """A forced reindex only embeds changed content; renamed notes take over stored vectors."""
+        manifest = self.indexer.manifest
+        manifest.model = IndexManager.MODEL_NAME
+        self._index_note("same.md")
+        self._index_note("old_name.md")
+        manifest.save()
+        self.indexer._get_all_files = MagicMock(return_value={
+            "same.md": (1000.0, 7),
+            "new_name.md": (2000.0, 7),
+        })
+        self.mock_collection.get.return_value = {
+            'ids': [self._chunk_id("old_name.md")],
+            'embeddings': [[0.1, 0.2]],
+        }
+
+        with patch('builtins.open', mock_open(read_data="content")):
+            self.indexer.update_index(force_reindex=True)
+
+        self.mock_collection.get.assert_called_once_with(ids=[self._chunk_id("old_name.md")], include=['embeddings'])
+        call_args = self.mock_collection.upsert.call_args[1]
+        self.assertEqual(call_args['ids'], [self._chunk_id("new_name.md")])
+        self.assertEqual(call_args['embeddings'], [[0.1, 0.2]])
+        self.mock_collection.delete.assert_called_once_with(ids=[self._chunk_id("old_name.md")])
+
+    def test_model_change_reembeds_everything(self):
+        manifest = self.indexer.manifest
+        manifest.model = "some-older-model"
+        self._index_note("same.md")
+        manifest.save()
+        self.indexer._get_all_files = MagicMock(return_value={"same.md": (1000.0, 7)})
+
+        with patch('builtins.open', mock_open(read_data="content")):
+            self.indexer.update_index()
+
+        call_args = self.mock_collection.upsert.call_args[1]
+        self.assertEqual(call_args['ids'], [self._chunk_id("same.md")])
+        self.assertEqual(call_args['embeddings'], [[0.5, 0.5]])
+        self.assertEqual(manifest.model, IndexManager.MODEL_NAME)
+
+    @patch('indexer.INDEX_BATCH_BYTES', 10)
+    def test_batches_are_written_in_background(self):
+        """Batches are sized by bytes; reads, encoding and writes all happen, in order."""
+        files = {f"{i}.md": (1000.0, 12) for i in range(5)}
+        self.indexer._get_all_files = MagicMock(return_value=files)
+        self.indexer._read_note = lambda filename: f"text of {filename}"
+        main_thread = threading.current_thread()
+        writer_threads = set()
+        self.mock_collection.upsert.side_effect = lambda **kwargs: writer_threads.add(threading.current_thread())
+
+        self.indexer.update_index()
+
+        upserted = [upsert_call[1]['ids'] for upsert_call in self.mock_collection.upsert.call_args_list]
+        self.assertEqual(upserted, [[self._chunk_id(f"{i}.md", f"text of {i}.md")] for i in range(5)])
+        self.assertNotIn(main_thread, writer_threads)
+        self.assertEqual(sorted(self.indexer.manifest.entries), sorted(files))
+
+    def test_int8_backend_has_its_own_vectors(self):
+        """Switching to quantized weights re-embeds instead of mixing vectors."""
+        self.assertEqual(self.indexer.model_id, IndexManager.MODEL_NAME)
+        with patch('chromadb.PersistentClient', return_value=self.mock_client):
+            indexer = IndexManager(base_dir="/tmp/test_zk", backend="onnx-int8")
+        self.assertEqual(indexer.model_id, f"{IndexManager.MODEL_NAME} (int8)")
+        self.mock_client.get_or_create_collection.assert_called_with(
+            name=IndexManager.COLLECTION_NAME, embedding_function=None, metadata={"hnsw:space": "cosine"}
+        )
+
+    def test_numpy_vector_store(self):
+        """The NumPy store serves the same update_index/search contract, without Chroma."""
+        indexer = self._numpy_indexer({"apple.md": "apple pie", "pear.md": "pear tart", "gone.md": "apple crumble"})
+        base_dir = indexer.base_dir
+
+        indexer.update_index()
+        self.assertIsNone(indexer.client)
+        self.assertEqual(indexer.search("apple", n_results=2), ["apple.md", "gone.md"])
+
+        os.remove(os.path.join(base_dir, "gone.md"))
+        indexer.update_index()
+        self.assertEqual(indexer.search("apple", n_results=2), ["apple.md", "pear.md"])
+        self.assertEqual(
+            indexer.manifest.path, os.path.join(self.tmp.name, "index", "numpy", IndexManifest.FILE_NAME)
+        )
+
+        with self.assertRaises(ValueError):
+            IndexManager(base_dir=base_dir, vector_store="faiss")
+
+    def test_search_many(self):
+        """Uncached queries are embedded in one batch and looked up with one multi-query call."""
+        indexer = self._numpy_indexer({"apple.md": "apple pie", "pear.md": "pear tart"})
+        indexer.update_index()
+        self.assertEqual(indexer.search("apple cake", n_results=1), ["apple.md"])
+        indexer.embedder.embedding_fn.reset_mock()
+
+        with patch.object(indexer.collection, 'query', wraps=indexer.collection.query) as query:
+            results = indexer.search_many(["pear", "apple cake", "pear"], n_results=1)
+
+        self.assertEqual(results, [["pear.md"], ["apple.md"], ["pear.md"]])
+        # "apple cake" comes from the result cache, "pear" is embedded once
+        indexer.embedder.embedding_fn.assert_called_once_with(["pear"])
+        query.assert_called_once()
+        self.assertEqual(len(query.call_args[1]["query_embeddings"]), 2)
+
+    def test_search_hits_point_at_best_chunk(self):
+        """Hits carry the hash of the best chunk, whose text chunk_text finds again."""
+        text = "# Fruit\n\n" + "apple " * 150 + "\n\n# Other\n\n" + "pear " * 150
+        indexer = self._numpy_indexer({"fruit.md": text})
+        indexer.update_index()
+
+        [hit] = indexer.search_hits("pear", n_results=1)
+
+        self.assertEqual(hit.filename, "fruit.md")
+        self.assertIn("pear", indexer.chunk_text(hit.filename, hit.chunk_hash))
+        self.assertNotIn("apple", indexer.chunk_text(hit.filename, hit.chunk_hash))
+        # Unknown chunks (the note changed) fall back to the whole note
+        self.assertEqual(indexer.chunk_text("fruit.md", "stale"), text)
+        self.assertEqual(indexer.chunk_text("missing.md", None), "")
+
+    def test_notes_in_subfolders_use_relative_ids(self):
+        indexer = self._numpy_indexer({os.path.join("projects", "apple.md"): "apple pie", "pear.md": "pear tart"})
+
+        with patch('indexer.vault_snapshots', VaultSnapshots(recursive=True)):
+            indexer.update_index()
+
+        [hit] = indexer.search_hits("apple", n_results=1)
+        self.assertEqual(hit.filename, "projects/apple.md")
+        self.assertEqual(indexer.chunk_text(hit.filename, hit.chunk_hash), "apple pie")
+        self.assertIn("projects/apple.md", indexer.manifest.entries)
+
+    def test_apply_changes(self):
+        """Watcher events update single notes without a full sync."""
+        self._index_note("deleted.md", text="gone")
+        self.indexer.manifest.save()
+
+        real_stat = os.stat
+        def fake_stat(path, *args, **kwargs):
+            if path.startswith("/tmp/test_zk"):
+                self.assertIn("changed", path)
+                return MagicMock(st_mtime=3000.0, st_size=7)
+            return real_stat(path, *args, **kwargs)
+
+        with patch('os.stat', side_effect=fake_stat), \
+             patch('builtins.open', mock_open(read_data="content")):
+            self.indexer.apply_changes(["changed.md"], ["deleted.md", "never_indexed.md"])
+
+        self.mock_collection.get.assert_not_called()
+        self.mock_collection.delete.assert_called_with(ids=[self._chunk_id("deleted.md", "gone")])
+        call_args = self.mock_collection.upsert.call_args[1]
+        self.assertEqual(call_args['ids'], [self._chunk_id("changed.md")])
+        self.assertEqual(self.indexer.manifest.entries["changed.md"]["mtime"], 3000.0)
 
     def test_search(self):
-        """Test search delegation to collection."""
-        self.mock_collection.query.return_value = {'ids': [['result1.md', 'result2.md']]}
+        """Chunk hits are pooled per note."""
+        self.mock_collection.query.return_value = {
+            'ids': [['a.md#1', 'b.md#1', 'a.md#2', 'legacy.md']],
+            'metadatas': [[{"parent": "a.md"}, {"parent": "b.md"}, {"parent": "a.md"}, {"mtime": 1.0}]],
+            'distances': [[0.1, 0.2, 0.5, 0.3]],
+        }
         
         results = self.indexer.search("query")
         
         self.mock_collection.query.assert_called_with(
-            query_texts=["query"],
-            n_results=DEFAULT_RESULTS
+            query_embeddings=[[0.5, 0.5]],
+            n_results=DEFAULT_RESULTS * SEMANTIC_CHUNKS_PER_RESULT,
+            include=["metadatas", "distances"],
         )
-        self.assertEqual(results, ['result1.md', 'result2.md'])
+        self.assertEqual(results, ['a.md', 'b.md', 'legacy.md'])
+        self.assertEqual(self.indexer.search("query", n_results=1), ['a.md'])
+
+        # Top-2 pooling favours notes with several good chunks
+        self.indexer.result_cache.clear()
+        with patch('indexer.SEMANTIC_POOLING_TOP_K', 2):
+            self.assertEqual(self.indexer.search("query"), ['b.md', 'a.md', 'legacy.md'])
+
+    def test_search_caches(self):
+        """Repeated queries skip the model and, until the index changes, Chroma."""
+        self.mock_collection.query.return_value = {
+            'ids': [['a.md#1']], 'metadatas': [[{"parent": "a.md"}]], 'distances': [[0.1]],
+        }
+        embedding_fn = self.indexer.embedder.embedding_fn
+
+        self.assertEqual(self.indexer.search("garden  plan"), ['a.md'])
+        self.assertEqual(self.indexer.search(" garden plan"), ['a.md'])
+        self.assertEqual(self.mock_collection.query.call_count, 1)
+        self.assertEqual(embedding_fn.call_count, 1)
+
+        # Any write to the index invalidates cached results, but not embeddings
+        self._index_note("b.md")
+        self.indexer._delete_files(["b.md"])
+        self.assertEqual(self.indexer.search("garden plan"), ['a.md'])
+        self.assertEqual(self.mock_collection.query.call_count, 2)
+        self.assertEqual(embedding_fn.call_count, 1)
+
+        # Query embeddings survive restarts
+        self.indexer.query_cache.save()
+        restarted = QueryEmbeddingCache(self.indexer.query_cache.path, self.indexer.model_id)
+        self.assertTrue(restarted.load())
+        self.assertEqual(restarted.get("garden plan"), [0.5, 0.5])
+        self.assertFalse(QueryEmbeddingCache(self.indexer.query_cache.path, "other-model").load())
 
 if __name__ == '__main__':
     unittest.main()
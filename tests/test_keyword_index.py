@@ -0,0 +1,159 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import MagicMock
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_index import KeywordIndex, split_words, has_split_character
+from zkss import ZKSearcher, NoteText
+
+NOTES = {
+    "202101010000 My Note.md": "This is my first note about gardening.",
+    "202101020000 Other.md": "Composting (and my garden) notes, see [link].",
+    "202101030000 Empty.md": "",
+    "202101040000 Garden plan.md": "Plan:\nbeds, paths and my compost heap",
+}
+
+
+class TestKeywordIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base_dir = os.path.join(self.tmp.name, "zk")
+        os.mkdir(self.base_dir)
+        for filename, content in NOTES.items():
+            self._write(filename, content)
+        self.index_path = os.path.join(self.tmp.name, "keyword_index")
+
+        self.searcher = ZKSearcher(base_dir=self.base_dir, ending=".md")
+        self.searcher.console = MagicMock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, filename, content):
+        with open(os.path.join(self.base_dir, filename), "w") as f:
+            f.write(content)
+
+    def _synced_index(self):
+        self.searcher.get_sorted_filenames()
+        index = KeywordIndex(self.base_dir, path=self.index_path)
+        return index.sync(self.searcher.note_stats, self.searcher.get_file_word_counts)
+
+    def test_split_words(self):
+        self.assertEqual(split_words("a b.c,(d)"), frozenset(["a", "b", "c", "d", ""]))
+        self.assertTrue(has_split_character("my note"))
+        self.assertFalse(has_split_character("my-note"))
+
+    def test_postings(self):
+        index = self._synced_index()
+        self.assertEqual(index.content_exact("my"), {
+            "202101010000 My Note.md", "202101020000 Other.md", "202101040000 Garden plan.md",
+        })
+        self.assertEqual(index.filename_exact("garden"), {"202101040000 Garden plan.md"})
+        self.assertEqual(index.content_substring("garden"), {
+            "202101010000 My Note.md", "202101020000 Other.md",
+        })
+        self.assertIsNone(index.content_substring("my garden"))
+        self.assertEqual(index.content_exact_all(["my", "compost"]), {"202101040000 Garden plan.md"})
+
+    def test_persistence_and_incremental_update(self):
+        self._synced_index()
+        self.assertTrue(os.path.exists(self.index_path))
+
+        reloaded = KeywordIndex(self.base_dir, path=self.index_path)
+        self.assertTrue(reloaded.load())
+        self.assertIn("gardening", reloaded.postings)
+
+        # Modify one note, delete another; only those must change
+        self._write("202101010000 My Note.md", "Now about bees, and a much longer text.")
+        os.remove(os.path.join(self.base_dir, "202101020000 Other.md"))
+        reads = []
+
+        def read(filename):
+            reads.append(filename)
+            return self.searcher.get_file_word_counts(filename)
+
+        self.searcher.get_sorted_filenames()
+        self.assertTrue(reloaded.update(self.searcher.note_stats, read))
+        self.assertEqual(reads, ["202101010000 My Note.md"])
+        self.assertNotIn("gardening", reloaded.postings)
+        self.assertNotIn("composting", reloaded.postings)
+        self.assertEqual(reloaded.content_exact("bees"), {"202101010000 My Note.md"})
+
+    def test_sync_leaves_index_in_use_unchanged(self):
+        index = self._synced_index()
+        self.assertIs(index.sync(self.searcher.note_stats, self.searcher.get_file_word_counts), index)
+        postings = {word: set(filenames) for word, filenames in index.postings.items()}
+
+        self._write("202101010000 My Note.md", "Now about bees.")
+        self._write("202101050000 New.md", "More bees and my compost.")
+        self.searcher.get_sorted_filenames()
+        synced = index.sync(self.searcher.note_stats, self.searcher.get_file_word_counts)
+
+        self.assertIsNot(synced, index)
+        self.assertEqual(index.postings, postings)
+        self.assertNotIn("bees", index.postings)
+        self.assertEqual(synced.content_exact("bees"), {"202101010000 My Note.md", "202101050000 New.md"})
+        self.assertIn("202101050000 New.md", synced.content_exact("my"))
+        self.assertNotIn("202101010000 My Note.md", synced.content_exact("gardening"))
+        # A later sync of the old index continues from the copy
+        self.assertIs(index.sync(self.searcher.note_stats, self.searcher.get_file_word_counts), synced)
+
+    def test_bm25(self):
+        index = self._synced_index()
+        ranking = index.bm25(["compost", "my"])
+        # "compost" is rarer than "my", so notes with it rank first
+        self.assertEqual([f for f, _ in ranking], [
+            "202101040000 Garden plan.md", "202101010000 My Note.md", "202101020000 Other.md",
+        ])
+        self.assertTrue(all(score > 0 for _, score in ranking))
+        self.assertEqual(len(index.bm25(["compost", "my"], limit=1)), 1)
+        self.assertEqual(index.bm25(["nothing", ""]), [])
+
+        # Lengths are restored on load and kept current on updates
+        reloaded = KeywordIndex(self.base_dir, path=self.index_path)
+        reloaded.load()
+        self.assertEqual(reloaded.total_length, index.total_length)
+        self.assertEqual(reloaded.bm25(["compost", "my"]), ranking)
+
+    def test_hits_carry_bm25_scores(self):
+        index = self._synced_index()
+        self.searcher.keyword_index = index
+        scores = dict(index.bm25(["my", "garden"]))
+
+        hits = list(self.searcher.iter_hits("My garden"))
+        limited = list(self.searcher.iter_hits("My garden", limit=2))
+
+        self.assertEqual(limited, hits[:2])
+        for hit in hits:
+            self.assertEqual(hit.title, hit.filename[:-len(".md")])
+            self.assertAlmostEqual(hit.score, scores.get(hit.filename, 0.0))
+        self.assertEqual(index.bm25_scores(["my", "garden"], ["202101020000 Other.md"]),
+                         {"202101020000 Other.md": scores["202101020000 Other.md"]})
+
+        self.searcher.use_keyword_index = False
+        self.assertTrue(all(hit.score is None for hit in self.searcher.iter_hits("My garden")))
+
+    def test_other_base_dir_is_ignored(self):
+        self._synced_index()
+        other = KeywordIndex("/somewhere/else", path=self.index_path)
+        self.assertFalse(other.load())
+
+    def test_tiers_match_scanning(self):
+        """Indexed tiers must select exactly the same notes as scanning contents."""
+        index = self._synced_index()
+        for query in ["my", "garden", "my garden", "my note", "compost heap", "nothing"]:
+            indexed = self.searcher.build_tiers(query, index)
+            scanned = self.searcher.build_tiers(query)
+            self.assertEqual([h for h, _ in indexed], [h for h, _ in scanned])
+            for (_, with_index), (_, without_index) in zip(indexed, scanned):
+                for filename in NOTES:
+                    note = NoteText(self.searcher, filename)
+                    self.assertEqual(with_index(note), without_index(note), (query, filename))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from manifest import IndexManifest, content_hash
+
+
+class TestIndexManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "index", "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_save_and_load_roundtrip(self):
+        manifest = IndexManifest(self.path, "/zk")
+        self.assertFalse(manifest.load())
+        manifest.set("a.md", 1000.0, 7, content_hash("content"))
+        manifest.save()
+
+        reloaded = IndexManifest(self.path, "/zk")
+        self.assertTrue(reloaded.load())
+        self.assertEqual(reloaded.entries, manifest.entries)
+        # No temp files are left behind
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["manifest.json"])
+
+    def test_other_base_dir_is_ignored(self):
+        manifest = IndexManifest(self.path, "/zk")
+        manifest.set("a.md", 1000.0, 7, None)
+        manifest.save()
+        self.assertFalse(IndexManifest(self.path, "/other").load())
+
+    def test_is_current(self):
+        manifest = IndexManifest(self.path, "/zk")
+        manifest.set("a.md", 1000.0, 7, None, ["c1"])
+        manifest.set("no_size.md", 1000.0, None, None, ["c1"])
+        manifest.set("unchunked.md", 1000.0, 7, None)
+
+        self.assertTrue(manifest.is_current("a.md", 1000.0, 7))
+        self.assertTrue(manifest.is_current("a.md", 999.0, 7))
+        self.assertFalse(manifest.is_current("a.md", 1000.5, 7))
+        self.assertFalse(manifest.is_current("a.md", 1000.0, 8))
+        self.assertTrue(manifest.is_current("no_size.md", 1000.0, 8))
+        self.assertFalse(manifest.is_current("unchunked.md", 1000.0, 7))
+        self.assertFalse(manifest.is_current("missing.md", 1000.0, 7))
+
+    def test_content_hash_is_stable(self):
+        self.assertEqual(content_hash("note"), content_hash("note"))
+        self.assertNotEqual(content_hash("note"), content_hash("Note"))
+
+
+if __name__ == '__main__':
+    unittest.main()
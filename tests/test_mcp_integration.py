@@ -8,6 +8,7 @@ from unittest.mock import patch, MagicMock
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from mcp_server import list_tools, call_tool
+from settings import SNIPPET_MAX_BYTES
 
 class TestMCPServerIntegration(unittest.TestCase):
     def test_list_tools_in_process(self):
@@ -33,7 +34,7 @@ class TestMCPServerIntegration(unittest.TestCase):
         result = asyncio.run(call_tool("search_notes", {"query": "test query", "semantic": False}))
         
         # Verify
-        mock_search.assert_called_with("test query")
+        mock_search.assert_called_with("test query", 15, SNIPPET_MAX_BYTES)
         self.assertEqual(result, ["Result"])
 
     @patch('mcp_server.perform_semantic_search')
@@ -43,7 +44,7 @@ class TestMCPServerIntegration(unittest.TestCase):
         
         asyncio.run(call_tool("search_notes", {"query": "test query", "semantic": True, "limit": 10}))
         
-        mock_search.assert_called_with("test query", 10)
+        mock_search.assert_called_with("test query", 10, SNIPPET_MAX_BYTES)
 
     @patch('mcp_server.read_note_content')
     def test_call_tool_read_note(self, mock_read):
@@ -1,93 +1,345 @@
 import pytest
 import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, MagicMock
-from zkss_markdown import convert_rich_to_markdown
-from mcp_server import perform_keyword_search, perform_semantic_search, read_note_content, format_note_hit
-
-def test_convert_rich_to_markdown_basic():
-    """Test basic green (stripped) and yellow (bold) tag conversion."""
-    markup = "[green]keyword[/green] in [yellow]filename[/yellow]"
-    expected = "keyword in **filename**"
-    assert convert_rich_to_markdown(markup) == expected
-
-def test_convert_rich_to_markdown_no_closing():
-    """Test tags without closing tags (Rich renders these to the end)."""
-    markup = "[yellow]filename: content"
-    expected = "**filename: content**"
-    assert convert_rich_to_markdown(markup) == expected
-
-def test_convert_rich_to_markdown_bold_colors():
-    """Test bold combined with colors."""
-    markup = "[bold green]Match found:[/bold green]"
-    expected = "Match found:"
-    assert convert_rich_to_markdown(markup) == expected
-
-def test_convert_rich_to_markdown_strip_others():
-    """Test that other Rich tags are stripped."""
-    markup = "[blue]Blue text[/blue] [red]Red text[/red] [green]Green[/green]"
-    expected = "Blue text Red text Green"
-    assert convert_rich_to_markdown(markup) == expected
-
-def test_convert_rich_to_markdown_empty():
-    """Test empty input."""
-    assert convert_rich_to_markdown("") == ""
-    assert convert_rich_to_markdown(None) == ""
-
-def test_convert_rich_to_markdown_mixed():
-    """Test complex mixed markup."""
-    markup = "[yellow]File:[/yellow] [green]key1[/green] and [green]key2[/green] found in [blue]section 1[/blue]"
-    expected = "**File:** key1 and key2 found in section 1"
-    assert convert_rich_to_markdown(markup) == expected
+from mcp_server import (
+    perform_keyword_search, perform_semantic_search, read_note_content, format_note_hit,
+    close_index_manager, preload_index_manager, run_blocking, call_tool, _hybrid_search,
+)
+from hybrid import HybridResult
+from indexer import SemanticHit
+from settings import SNIPPET_MAX_BYTES
+from cancellation import SearchCancelled, check_cancelled
 
 def test_perform_keyword_search_markdown_formatting():
-    """Verify that keyword search output is converted to markdown."""
+    """Keyword search output is formatted as markdown straight from the hits."""
+    from zkss import KeywordHit
+
     with patch('mcp_server.ZKSearcher') as mock_searcher_class:
         mock_searcher = MagicMock()
         mock_searcher_class.return_value = mock_searcher
-        
-        def mock_run():
-            mock_searcher.console.print("[green]Found 1 relevant notes:[/green]")
-            mock_searcher.console.print("- \"test\" in [yellow]filename:")
-            mock_searcher.console.print("    20231027 Test Note")
-            
-        mock_searcher.run.side_effect = mock_run
-        
-        results = asyncio.run(perform_keyword_search("test"))
+        mock_searcher.get_file_text.return_value = ""
+        mock_searcher.iter_hits.return_value = iter([
+            KeywordHit(2, "- \"test\" in **filename:**", "20231027 Test Note.md", "20231027 Test Note"),
+            KeywordHit(2, "- \"test\" in **filename:**", "20231028 Other Test.md", "20231028 Other Test"),
+            KeywordHit(4, "- \"test\" exact in **content:**", "20231029 Note.md", "20231029 Note"),
+        ])
+
+        results = asyncio.run(perform_keyword_search("  test ", 3))
         output = results[0].text
-        
-        # [green] should be stripped, not backticked
-        assert "Found 1 relevant notes:" in output
-        # [yellow] should be bold
-        assert "- \"test\" in **filename:**" in output
+
+        # Headers appear once per tier
+        assert mock_searcher.field_format == "**{}:**"
+        assert output.count("- \"test\" in **filename:**") == 1
+        assert "- \"test\" exact in **content:**" in output
         assert "    - **20231027 Test Note** — `20231027 Test Note.md`" in output
-        assert "[green]" not in output
-        assert "[yellow]" not in output
+        mock_searcher.iter_hits.assert_called_once_with("test", limit=3)
+
+def test_keyword_search_stops_at_limit(tmp_path):
+    """Filename matches fill the limit without reading note contents."""
+    for name in ["garden plan.md", "garden tools.md", "other.md"]:
+        (tmp_path / name).write_text("garden " * 10)
+    with patch('mcp_server.ZKSearcher') as mock_searcher_class, \
+         patch('zkss.NoteText.contains_all') as contains_all, \
+         patch('zkss.ZKSearcher.get_file_words') as get_file_words:
+        from zkss import ZKSearcher
+        mock_searcher_class.side_effect = lambda *args: ZKSearcher(base_dir=str(tmp_path), use_keyword_index=False)
+
+        output = asyncio.run(perform_keyword_search("garden", 2))[0].text
+
+    assert "`garden plan.md`" in output and "`garden tools.md`" in output
+    assert '"garden" exact in **filename:**' in output and "[yellow]" not in output
+    assert "other" not in output
+    contains_all.assert_not_called()
+    get_file_words.assert_not_called()
+
+def test_keyword_index_is_loaded_once(tmp_path):
+    """The keyword index stays resident instead of being unpickled for every search."""
+    from zkss import ZKSearcher
+    from keyword_index import KeywordIndex
+
+    vault = tmp_path / "zk"
+    vault.mkdir()
+    (vault / "garden.md").write_text("compost")
+    created = []
+
+    def keyword_index(base_dir):
+        created.append(KeywordIndex(base_dir, path=str(tmp_path / "keyword_index")))
+        return created[-1]
+
+    with patch('mcp_server.ZKSearcher', lambda *args: ZKSearcher(base_dir=str(vault))), \
+            patch('mcp_server.KeywordIndex', keyword_index), \
+            patch.dict('mcp_server._keyword_indexes', clear=True):
+        first = asyncio.run(perform_keyword_search("compost", 5))[0].text
+        second = asyncio.run(call_tool("search_notes_batch", {"queries": ["compost"]}))[0].text
+
+    assert "`garden.md`" in first and "`garden.md`" in second
+    assert len(created) == 1
+
+def test_keyword_search_does_not_wait_for_hybrid_reindex(tmp_path):
+    """The resident keyword index isn't locked while a hybrid search updates the semantic index."""
+    from zkss import ZKSearcher
+    from keyword_index import KeywordIndex
+
+    vault = tmp_path / "zk"
+    vault.mkdir()
+    (vault / "garden.md").write_text("compost")
+    indexing, release = threading.Event(), threading.Event()
+    indexer = MagicMock()
+    indexer.update_index.side_effect = lambda **kwargs: indexing.set() or release.wait(5)
+    indexer.search.return_value = []
+    indexer.chunk_text.return_value = ""
+
+    with patch('mcp_server.ZKSearcher', lambda *args: ZKSearcher(base_dir=str(vault))), \
+            patch('mcp_server.KeywordIndex', lambda base_dir: KeywordIndex(base_dir, path=str(tmp_path / "keyword_index"))), \
+            patch('mcp_server.get_index_manager', return_value=indexer), \
+            patch('mcp_server.settings.ZK_BASE_DIR', str(vault)), \
+            patch.dict('mcp_server._keyword_indexes', clear=True):
+        hybrid = ThreadPoolExecutor(max_workers=1).submit(_hybrid_search, "compost", 5, 0, cancel_event=threading.Event())
+        try:
+            assert indexing.wait(5)
+            started = time.monotonic()
+            text = asyncio.run(perform_keyword_search("compost", 5))[0].text
+            elapsed = time.monotonic() - started
+        finally:
+            release.set()
+        result, _ = hybrid.result(5)
+
+    assert "`garden.md`" in text
+    assert elapsed < 2
+    assert result.filenames == ["garden.md"]
 
 def test_perform_semantic_search_markdown_formatting():
     """Verify that semantic search output uses bold for filenames."""
+    close_index_manager()
     with patch('mcp_server.IndexManager') as mock_index_class:
         mock_index = MagicMock()
         mock_index_class.return_value = mock_index
-        mock_index.search.return_value = ["20231027 Test Note.md"]
+        mock_index.search_hits.return_value = [SemanticHit("20231027 Test Note.md", 0.9, None)]
+        mock_index.chunk_text.return_value = ""
         
         results = asyncio.run(perform_semantic_search("test", 5))
         output = results[0].text
         
         assert "**20231027 Test Note** — `20231027 Test Note.md`" in output
+    close_index_manager()
+
+def test_index_manager_is_reused_across_calls():
+    """The IndexManager (DB client + model) is created once, not per search."""
+    close_index_manager()
+    with patch('mcp_server.IndexManager') as mock_index_class:
+        mock_index_class.return_value.search_hits.return_value = []
+
+        asyncio.run(perform_semantic_search("first", 5))
+        asyncio.run(perform_semantic_search("second", 5))
+
+        assert mock_index_class.call_count == 1
+        assert mock_index_class.return_value.search_hits.call_count == 2
+    close_index_manager()
+
+def test_close_index_manager_stops_watcher():
+    import mcp_server
+    watcher = MagicMock()
+    with patch('mcp_server._index_watcher', watcher):
+        close_index_manager()
+        assert mcp_server._index_watcher is None
+    watcher.stop.assert_called_once()
+
+def test_settings_change_restarts_what_uses_them():
+    """After settings.py changes, the next tool call rebuilds the manager, watcher, keyword indexes and listings."""
+    import mcp_server
+    old_manager, old_watcher, old_thread = MagicMock(), MagicMock(), MagicMock()
+    with patch('mcp_server._index_manager', old_manager), \
+            patch('mcp_server._index_watcher', old_watcher), \
+            patch('mcp_server._index_watcher_thread', old_thread), \
+            patch('mcp_server._settings_mtime', -1), \
+            patch.dict('mcp_server._keyword_indexes', {"/vault": MagicMock()}), \
+            patch('mcp_server.importlib.reload') as reload, \
+            patch('mcp_server.vault_snapshots') as snapshots, \
+            patch('mcp_server.preload_index_manager') as preload, \
+            patch('mcp_server.start_index_watcher') as start_watcher, \
+            patch('mcp_server.settings.MCP_WATCH_INDEX', True), \
+            patch('mcp_server.server_stats', return_value={}):
+        asyncio.run(call_tool("server_stats", {}))
+
+        reload.assert_called_once_with(mcp_server.settings)
+        old_watcher.stop.assert_called_once()
+        old_thread.join.assert_called_once()
+        assert mcp_server._index_manager is None
+        assert mcp_server._keyword_indexes == {}
+        assert snapshots.configure.call_args.kwargs["recursive"] == mcp_server.settings.VAULT_RECURSIVE
+        preload.assert_called_once()
+        start_watcher.assert_called_once()
+        assert mcp_server._settings_mtime == mcp_server._get_settings_mtime()
+
+        # Unchanged settings aren't reloaded again
+        asyncio.run(call_tool("server_stats", {}))
+        reload.assert_called_once()
+        assert not mcp_server.reload_settings_if_changed()
+
+def test_preload_warms_up_model():
+    close_index_manager()
+    with patch('mcp_server.IndexManager') as mock_index_class:
+        preload_index_manager().join(timeout=5)
+        mock_index_class.return_value.warm_up.assert_called_once()
+    close_index_manager()
+
+def test_search_notes_mode_selects_search():
+    """`mode` picks the search; the older `semantic` flag still works."""
+    close_index_manager()
+    with patch('mcp_server.IndexManager') as mock_index_class, \
+            patch('mcp_server.HybridSearcher') as mock_hybrid_class, \
+            patch('mcp_server.perform_keyword_search') as mock_keyword:
+        mock_index_class.return_value.search_hits.return_value = [SemanticHit("semantic.md", 0.9, None)]
+        mock_index_class.return_value.chunk_text.return_value = ""
+        mock_hybrid_class.return_value.search.return_value = HybridResult(
+            ["hybrid.md"], {"bm25": 0.001, "vector": 0.002, "total": 0.004}
+        )
+
+        hybrid = asyncio.run(call_tool("search_notes", {"query": "q", "mode": "hybrid", "limit": 3}))[0].text
+        semantic = asyncio.run(call_tool("search_notes", {"query": "q", "semantic": True}))[0].text
+        asyncio.run(call_tool("search_notes", {"query": "q", "mode": "keyword", "semantic": True}))
+
+        assert "(Hybrid)" in hybrid and "`hybrid.md`" in hybrid
+        assert "Timings: bm25 1.0 ms, vector 2.0 ms, total 4.0 ms" in hybrid
+        search_args = mock_hybrid_class.return_value.search.call_args
+        assert search_args[0] == ("q", 3)
+        assert "`semantic.md`" in semantic
+        mock_keyword.assert_called_once_with("q", 15, SNIPPET_MAX_BYTES)
+    close_index_manager()
+
+def test_server_stats_reports_tool_and_stage_latencies(tmp_path):
+    import json
+    close_index_manager()
+    (tmp_path / "garden plan.md").write_text("garden")
+    with patch('mcp_server.ZKSearcher') as mock_searcher_class:
+        from zkss import ZKSearcher
+        mock_searcher_class.side_effect = lambda *args: ZKSearcher(base_dir=str(tmp_path), use_keyword_index=False)
+        asyncio.run(call_tool("search_notes", {"query": "garden"}))
+
+    stats = json.loads(asyncio.run(call_tool("server_stats", {}))[0].text)
+
+    assert stats["stages"]["tool.search_notes.keyword"]["calls"] >= 1
+    listing = stats["stages"]["list_notes"]
+    assert listing["window"] >= 1 and listing["p50_ms"] <= listing["max_ms"]
+    assert sum(listing["histogram"].values()) == listing["window"]
+    assert "hits" in stats["note_cache"]
+    assert stats["vault_snapshots"]["scans"] >= 1
+    # Without a semantic search, the model isn't loaded just for the stats
+    assert "semantic" not in stats
+
+def test_batch_search(tmp_path):
+    (tmp_path / "garden plan.md").write_text("compost")
+    (tmp_path / "compost.md").write_text("my garden")
+    with patch('mcp_server.ZKSearcher') as mock_searcher_class:
+        from zkss import ZKSearcher
+        mock_searcher_class.side_effect = lambda *args: ZKSearcher(base_dir=str(tmp_path), use_keyword_index=False)
+
+        output = asyncio.run(call_tool("search_notes_batch", {"queries": ["garden", " ", "compost"], "limit": 1}))[0].text
+
+    garden, empty, compost = output.split("\n\n")
+    assert garden.startswith("Search Results for 'garden':") and "`garden plan.md`" in garden
+    assert "`compost.md`" not in garden
+    assert "No search string given." in empty
+    assert "`compost.md`" in compost
+
+    close_index_manager()
+    with patch('mcp_server.IndexManager') as mock_index_class:
+        mock_index_class.return_value.search_hits_many.return_value = [
+            [SemanticHit("a.md", 0.9, None)], [SemanticHit("b.md", 0.8, None)]
+        ]
+        mock_index_class.return_value.chunk_text.return_value = ""
+        output = asyncio.run(call_tool("search_notes_batch", {"queries": ["x", "y"], "mode": "semantic"}))[0].text
+        mock_index_class.return_value.search_hits_many.assert_called_once_with(["x", "y"], n_results=15)
+    assert "Results for 'x':\nFound 1 relevant notes (Semantic):" in output and "`b.md`" in output
+    close_index_manager()
 
 def test_format_note_hit():
     assert format_note_hit("20231027 Test Note.md") == (
         "- **20231027 Test Note** — `20231027 Test Note.md`"
     )
+    assert format_note_hit("a.md", "A", "an excerpt") == "- **A** — `a.md`\n  > an excerpt"
+
+def test_search_results_include_snippets(tmp_path):
+    (tmp_path / "plan.md").write_text("# Plan\n\nIntro. " + "filler " * 100 + "Turn the Compost weekly.\n")
+    with patch('mcp_server.ZKSearcher') as mock_searcher_class:
+        from zkss import ZKSearcher
+        mock_searcher_class.side_effect = lambda *args: ZKSearcher(base_dir=str(tmp_path), use_keyword_index=False)
+
+        output = asyncio.run(call_tool("search_notes", {"query": "compost", "snippet_bytes": 60}))[0].text
+        titles_only = asyncio.run(call_tool("search_notes", {"query": "compost", "snippet_bytes": 0}))[0].text
+
+    snippet = output.split("\n      > ")[1]
+    assert "Turn the Compost weekly." in snippet and snippet.startswith("…")
+    assert len(snippet.encode("utf-8")) <= 60
+    assert ">" not in titles_only
+
+    close_index_manager()
+    with patch('mcp_server.IndexManager') as mock_index_class:
+        mock_index = mock_index_class.return_value
+        mock_index.search_hits.return_value = [SemanticHit("plan.md", 0.9, "abc")]
+        mock_index.chunk_text.return_value = "Turn the compost weekly."
+        output = asyncio.run(perform_semantic_search("compost", 5))[0].text
+        mock_index.chunk_text.assert_called_once_with("plan.md", "abc")
+    assert "`plan.md`\n  > Turn the compost weekly." in output
+    close_index_manager()
 
 def test_read_note_appends_md_suffix():
     with patch('mcp_server.ZKSearcher') as mock_searcher_class:
         mock_searcher = MagicMock()
         mock_searcher_class.return_value = mock_searcher
-        mock_searcher.get_file_content.side_effect = lambda name: "content" if name.endswith(".md") else ""
+        mock_searcher.get_file_text.side_effect = lambda name: "Content" if name.endswith(".md") else ""
 
         results = asyncio.run(read_note_content("20231027 Test Note"))
         output = results[0].text
 
-        assert "Content of 20231027 Test Note.md:" in output
-        mock_searcher.get_file_content.assert_any_call("20231027 Test Note.md")
+        # As written, not lowercased
+        assert "Content of 20231027 Test Note.md:\n\nContent" in output
+        mock_searcher.get_file_text.assert_any_call("20231027 Test Note.md")
+
+def test_run_blocking_keeps_event_loop_responsive():
+    """Blocking work runs in a worker thread while the event loop keeps serving."""
+    release = threading.Event()
+
+    def blocking(cancel_event):
+        release.wait(timeout=5)
+        return threading.current_thread().name
+
+    async def scenario():
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="test-worker") as executor:
+            task = asyncio.ensure_future(run_blocking(executor, blocking))
+            await asyncio.sleep(0.01)
+            assert not task.done()
+            release.set()
+            return await task
+
+    assert asyncio.run(scenario()).startswith("test-worker")
+
+def test_run_blocking_cancellation_stops_worker():
+    """Cancelling the request sets the worker's cancel_event."""
+    started = threading.Event()
+    outcome = []
+
+    def blocking(cancel_event):
+        started.set()
+        try:
+            for _ in range(500):
+                check_cancelled(cancel_event)
+                threading.Event().wait(0.01)
+            outcome.append("finished")
+        except SearchCancelled:
+            outcome.append("cancelled")
+
+    async def scenario(executor):
+        task = asyncio.ensure_future(run_blocking(executor, blocking))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        asyncio.run(scenario(executor))
+    assert outcome == ["cancelled"]
@@ -0,0 +1,96 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from note_cache import NoteCache, contains_all_ascii
+
+
+class TestNoteCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = NoteCache(max_bytes=10 * 1024 * 1024)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, content, mtime=None):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_repeat_reads_hit_cache(self):
+        path = self._write("a.md", "Hello World, again")
+        self.assertEqual(self.cache.text(path), "Hello World, again")
+        self.assertEqual(self.cache.lower(path), "hello world, again")
+        self.assertIn("world", self.cache.words(path))
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 2))
+
+    def test_changed_note_is_reread(self):
+        path = self._write("a.md", "old", mtime=1000)
+        self.assertEqual(self.cache.lower(path), "old")
+        self._write("a.md", "New text", mtime=2000)
+        self.assertEqual(self.cache.lower(path), "new text")
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_lru_eviction_under_budget(self):
+        paths = [self._write(f"{i}.md", "x" * 1000) for i in range(3)]
+        one_note = NoteCache().get(paths[0]).size
+        cache = NoteCache(max_bytes=2 * one_note)
+
+        cache.get(paths[0])
+        cache.get(paths[1])
+        cache.get(paths[0])  # paths[1] is now least recently used
+        cache.get(paths[2])
+
+        self.assertLessEqual(cache.total_bytes, cache.max_bytes)
+        cache.get(paths[0])
+        self.assertEqual(cache.hits, 2)
+        cache.get(paths[1])
+        self.assertEqual(cache.misses, 4)
+
+    def test_contains_all_searches_raw_bytes(self):
+        """ASCII terms are matched case-insensitively without caching the note."""
+        path = self._write("a.md", "Über den Garten: My GARDEN plan\n")
+        self.assertTrue(self.cache.contains_all(path, ["my garden", "plan"]))
+        self.assertFalse(self.cache.contains_all(path, ["my garden", "beds"]))
+        self.assertEqual(self.cache.total_bytes, 0)
+
+        # Non-ASCII terms need the decoded, lowercased text
+        self.assertTrue(self.cache.contains_all(path, ["über"]))
+        self.assertGreater(self.cache.total_bytes, 0)
+
+        # Cached notes are searched as text
+        with patch('note_cache.contains_all_ascii') as mock_bytes:
+            self.assertTrue(self.cache.contains_all(path, ["garten"]))
+            mock_bytes.assert_not_called()
+
+    def test_contains_all_agrees_with_text_for_letters_lowercased_to_ascii(self):
+        """The Kelvin sign and the dotted capital I lowercase to ASCII letters."""
+        path = self._write("kelvin.md", "300 \u212aelvin in \u0130zmir\n")
+        # The raw bytes can't tell, so the text decides (as once it is cached)
+        self.assertIsNone(contains_all_ascii(path, ["kelvin"]))
+        self.assertTrue(contains_all_ascii(path, ["elvin", "zmir"]))
+        self.assertFalse(contains_all_ascii(path, ["celsius"]))
+        self.assertTrue(self.cache.contains_all(path, ["kelvin"]))
+        self.assertFalse(self.cache.contains_all(path, ["kilo"]))
+        self.assertEqual(self.cache.contains_all(path, ["i"]), "i" in self.cache.lower(path))
+
+    def test_contains_all_empty_note(self):
+        path = self._write("empty.md", "")
+        self.assertFalse(self.cache.contains_all(path, ["x"]))
+
+    def test_missing_note_raises(self):
+        with self.assertRaises(OSError):
+            self.cache.get(os.path.join(self.tmp.name, "missing.md"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from note_cache import NoteCache
+from profiling import LatencyHistogram, Profiler, StatsRecorder
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = NoteCache()
+        self.recorder = StatsRecorder(window=10)
+        self.profiler = Profiler(self.cache, self.recorder)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_stage_counts_reads_and_cache_hits(self):
+        path = os.path.join(self.tmp.name, "a.md")
+        with open(path, "w") as f:
+            f.write("Twelve bytes")
+
+        with self.profiler.stage("read"):
+            self.cache.lower(path)
+            self.cache.lower(path)
+        other = os.path.join(self.tmp.name, "b.md")
+        with open(other, "w") as f:
+            f.write("Bytes")
+        with self.profiler.stage("scan"):
+            self.assertTrue(self.cache.contains_all(other, ["byte"]))
+
+        read = self.profiler.stages["read"]
+        self.assertEqual((read.calls, read.files_read, read.bytes_read, read.cache_hits), (1, 1, 12, 1))
+        # Scanned as raw bytes, without caching
+        scan = self.profiler.stages["scan"]
+        self.assertEqual((scan.files_read, scan.bytes_read, scan.cache_hits), (1, 5, 0))
+        self.assertEqual([row[0] for row in self.profiler.rows()], ["read", "scan"])
+        self.assertEqual(self.recorder.snapshot()["read"]["files_read"], 1)
+
+    def test_stage_is_recorded_when_it_fails(self):
+        with self.assertRaises(ValueError), self.profiler.stage("failing"):
+            raise ValueError()
+        self.assertEqual(self.profiler.stages["failing"].calls, 1)
+        self.assertEqual(self.recorder.snapshot()["failing"]["calls"], 1)
+
+    def test_histogram_keeps_a_rolling_window(self):
+        histogram = LatencyHistogram(window=4)
+        for ms in (100, 0.5, 3, 4, 30000):
+            histogram.add(ms / 1000)
+
+        snapshot = histogram.snapshot()
+
+        self.assertEqual(snapshot["window"], 4)
+        self.assertEqual((snapshot["p50_ms"], snapshot["max_ms"]), (3.0, 30000.0))
+        self.assertEqual(snapshot["histogram"]["<=1ms"], 1)
+        self.assertEqual(snapshot["histogram"]["<=5ms"], 2)
+        self.assertEqual(snapshot["histogram"]["<=100ms"], 0)
+        self.assertEqual(snapshot["histogram"][">10000ms"], 1)
+        self.assertEqual(LatencyHistogram().snapshot(), {"window": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
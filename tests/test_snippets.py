@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snippets import ELLIPSIS, make_snippet, truncate_bytes
+
+
+def test_short_text_is_kept_whole():
+    assert make_snippet("A short\n\nnote.", "note") == "A short note."
+
+
+def test_snippet_is_centred_on_first_match():
+    text = "intro " * 100 + "the Compost heap " + "outro " * 100
+    snippet = make_snippet(text, "compost", 80)
+
+    assert snippet.startswith(ELLIPSIS) and snippet.endswith(ELLIPSIS)
+    assert "the Compost heap" in snippet
+    assert len(snippet.encode("utf-8")) <= 80
+    # Cut between words
+    assert all(word in ("intro", "outro", "the", "Compost", "heap") for word in snippet.strip(ELLIPSIS).split())
+
+
+def test_phrase_before_single_terms():
+    text = "heap " + "x " * 200 + "compost heap"
+    assert "compost heap" in make_snippet(text, "compost heap", 40)
+
+
+def test_no_match_starts_at_beginning():
+    snippet = make_snippet("first words " + "more " * 100, "absent", 50)
+    assert snippet.startswith("first words") and snippet.endswith(ELLIPSIS)
+
+
+def test_zero_budget_and_empty_text():
+    assert make_snippet("text", "text", 0) == ""
+    assert make_snippet("", "text") == ""
+
+
+def test_tiny_budgets_stay_within_limit():
+    text = "intro " * 100 + "compost " + "outro " * 100
+    for max_bytes in range(1, 12):
+        for search in ("", "compost"):
+            snippet = make_snippet(text, search, max_bytes)
+            assert len(snippet.encode("utf-8")) <= max_bytes
+    assert make_snippet(text, "", 2) == ""
+    assert make_snippet(text, "compost", 4) == ELLIPSIS
+    assert truncate_bytes("text", -3) == ""
+
+
+def test_truncate_bytes_keeps_whole_characters():
+    assert truncate_bytes("äöü", 3) == "ä"
+    assert truncate_bytes("äöü", 6) == "äöü"
+    assert len(make_snippet("ü" * 500, "", 51).encode("utf-8")) <= 51
@@ -0,0 +1,201 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vault_snapshot import NoteStat, VaultSnapshots
+
+
+class TestVaultSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        for name in ["a.md", "b.md", "image.png"]:
+            self._write(name, "content")
+        os.makedirs(os.path.join(self.dir, "folder.md"))
+        os.utime(os.path.join(self.dir, "a.md"), (100.0, 200.0))
+        self._age_directory()
+        self.snapshots = VaultSnapshots(max_age=60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, text):
+        with open(os.path.join(self.dir, name), "w") as f:
+            f.write(text)
+
+    def _age_directory(self, mtime=1000.0):
+        # Changed long ago, so its snapshots may be reused
+        os.utime(self.dir, (mtime, mtime))
+
+    def test_lists_notes_with_stats(self):
+        notes = self.snapshots.get(self.dir, ".md")
+
+        self.assertEqual(sorted(notes), ["a.md", "b.md"])
+        self.assertEqual(notes["a.md"], NoteStat(200.0, 7, 100.0))
+
+    def test_reused_until_directory_changes(self):
+        with patch("vault_snapshot.os.scandir", wraps=os.scandir) as scandir:
+            first = self.snapshots.get(self.dir, ".md")
+            self.assertIs(self.snapshots.get(self.dir, ".md"), first)
+            self.assertEqual(scandir.call_count, 1)
+
+            self._write("c.md", "new")
+            self._age_directory(2000.0)
+            self.assertIn("c.md", self.snapshots.get(self.dir, ".md"))
+            self.assertEqual(scandir.call_count, 2)
+        self.assertEqual(self.snapshots.stats()["hits"], 1)
+
+    def test_rescanned_when_old_invalidated_or_racy(self):
+        self.snapshots.get(self.dir, ".md")
+        self.snapshots.invalidate(self.dir)
+        self.snapshots.get(self.dir, ".md")
+        self.assertEqual(self.snapshots.scans, 2)
+
+        self.snapshots.max_age = 0
+        self.snapshots.get(self.dir, ".md")
+        self.assertEqual(self.snapshots.scans, 3)
+
+        # Just changed: timestamps may be too coarse to notice the next change
+        self.snapshots.max_age = 60
+        os.utime(self.dir)
+        self.snapshots.get(self.dir, ".md")
+        self.snapshots.get(self.dir, ".md")
+        self.assertEqual(self.snapshots.scans, 5)
+
+    def test_configure_applies_settings_and_drops_listings(self):
+        self.snapshots.get(self.dir, ".md")
+        scans = self.snapshots.scans
+        self.snapshots.configure(max_age=60, recursive=False, include=["a*"], exclude=[], workers=1)
+
+        self.assertEqual(list(self.snapshots.get(self.dir, ".md")), ["a.md"])
+        self.assertEqual(self.snapshots.scans, scans + 1)
+
+    def test_missing_directory(self):
+        with self.assertRaises(FileNotFoundError):
+            self.snapshots.get(os.path.join(self.dir, "missing"), ".md")
+
+    def test_keyword_and_semantic_share_a_scan(self):
+        from zkss import ZKSearcher
+        from indexer import IndexManager
+
+        searcher = ZKSearcher(base_dir=self.dir, ending=".md")
+        indexer = IndexManager.__new__(IndexManager)
+        indexer.base_dir = self.dir
+        indexer.console = MagicMock()
+        with patch("zkss.vault_snapshots", self.snapshots), patch("indexer.vault_snapshots", self.snapshots):
+            self.assertEqual(sorted(searcher.get_sorted_filenames()), ["a.md", "b.md"])
+            self.assertEqual(indexer._get_all_files()["a.md"], (200.0, 7))
+        self.assertEqual(self.snapshots.scans, 1)
+
+
+class TestRecursiveVault(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        for path in ["top.md", "projects/plan.md", "projects/2024/q1.md", "archive/old.md",
+                     ".obsidian/workspace.md", "projects/.trash/gone.md", "projects/image.png"]:
+            os.makedirs(os.path.join(self.dir, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(self.dir, path), "w") as f:
+                f.write("content")
+        for root, dirs, _ in os.walk(self.dir):
+            os.utime(root, (1000.0, 1000.0))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_relative_ids_and_hidden_folders_skipped(self):
+        snapshots = VaultSnapshots(recursive=True, exclude=[".*/"], workers=4)
+        self.assertEqual(
+            sorted(snapshots.get(self.dir, ".md")),
+            ["archive/old.md", "projects/2024/q1.md", "projects/plan.md", "top.md"],
+        )
+        # The top level only, as before
+        self.assertEqual(list(VaultSnapshots(recursive=False).get(self.dir, ".md")), ["top.md"])
+
+    def test_default_exclude_keeps_dot_notes(self):
+        with open(os.path.join(self.dir, ".hidden note.md"), "w") as f:
+            f.write("content")
+        os.utime(self.dir, (1000.0, 1000.0))
+
+        flat = VaultSnapshots(recursive=False)
+        self.assertEqual(sorted(flat.get(self.dir, ".md")), [".hidden note.md", "top.md"])
+        self.assertEqual(flat.note_id(self.dir, os.path.join(self.dir, ".hidden note.md")), ".hidden note.md")
+
+        recursive = VaultSnapshots(recursive=True)
+        notes = recursive.get(self.dir, ".md")
+        self.assertIn(".hidden note.md", notes)
+        self.assertNotIn(".obsidian/workspace.md", notes)
+        self.assertIsNone(recursive.note_id(self.dir, os.path.join(self.dir, ".obsidian", "workspace.md")))
+
+    def test_include_and_exclude_globs(self):
+        snapshots = VaultSnapshots(recursive=True, include=["projects/*"], exclude=[".*/", "2024"])
+        self.assertEqual(list(snapshots.get(self.dir, ".md")), ["projects/plan.md"])
+        self.assertEqual(snapshots.note_id(self.dir, os.path.join(self.dir, "projects", "plan.md")), "projects/plan.md")
+        self.assertIsNone(snapshots.note_id(self.dir, os.path.join(self.dir, "projects", "2024", "q1.md")))
+        self.assertIsNone(snapshots.note_id(self.dir, os.path.join(self.dir, "top.md")))
+        self.assertIsNone(snapshots.note_id(self.dir, os.path.join(os.path.dirname(self.dir), "other.md")))
+
+    def test_include_folder_pattern_selects_notes_below(self):
+        snapshots = VaultSnapshots(recursive=True, include=["projects/"])
+        self.assertEqual(sorted(snapshots.get(self.dir, ".md")), ["projects/2024/q1.md", "projects/plan.md"])
+        self.assertEqual(
+            snapshots.note_id(self.dir, os.path.join(self.dir, "projects", "2024", "q1.md")), "projects/2024/q1.md"
+        )
+        self.assertIsNone(snapshots.note_id(self.dir, os.path.join(self.dir, "top.md")))
+
+        nested = VaultSnapshots(recursive=True, include=["projects/2*/"])
+        self.assertEqual(list(nested.get(self.dir, ".md")), ["projects/2024/q1.md"])
+
+    def test_warm_walk_only_stats_directories(self):
+        snapshots = VaultSnapshots(recursive=True, max_age=60, workers=4)
+        first = snapshots.get(self.dir, ".md")
+        scans = snapshots.scans
+
+        with patch("vault_snapshot.os.scandir") as scandir:
+            self.assertIs(snapshots.get(self.dir, ".md"), first)
+        scandir.assert_not_called()
+
+        # Only the changed folder is listed again
+        with open(os.path.join(self.dir, "archive", "new.md"), "w") as f:
+            f.write("new")
+        os.utime(os.path.join(self.dir, "archive"), (2000.0, 2000.0))
+        self.assertIn("archive/new.md", snapshots.get(self.dir, ".md"))
+        self.assertEqual(snapshots.scans, scans + 1)
+
+    def test_access_times_are_refreshed_after_max_age(self):
+        snapshots = VaultSnapshots(recursive=True, max_age=60)
+        snapshots.get(self.dir, ".md")
+        os.utime(os.path.join(self.dir, "projects", "plan.md"), (5000.0, 1000.0))
+        os.utime(os.path.join(self.dir, "projects"), (1000.0, 1000.0))
+
+        # Reading a note changes no folder's mtime, so only the age expires the listing
+        self.assertNotEqual(snapshots.get(self.dir, ".md")["projects/plan.md"].atime, 5000.0)
+        snapshots.max_age = 0
+        self.assertEqual(snapshots.get(self.dir, ".md")["projects/plan.md"].atime, 5000.0)
+
+        # The watcher's invalidation only rescans the folder it names
+        snapshots.max_age = 60
+        scans = snapshots.scans
+        snapshots.invalidate(os.path.join(self.dir, "projects"), below=False)
+        snapshots.get(self.dir, ".md")
+        self.assertEqual(snapshots.scans, scans + 1)
+
+    def test_keyword_search_titles_and_filename_tiers(self):
+        from zkss import ZKSearcher
+
+        searcher = ZKSearcher(base_dir=self.dir, ending=".md", use_keyword_index=False)
+        with patch("zkss.vault_snapshots", VaultSnapshots(recursive=True)):
+            hits = list(searcher.iter_hits("plan"))
+            # Folder names aren't part of the note's name
+            folder_hits = list(searcher.iter_hits("projects"))
+
+        self.assertEqual([(hit.filename, hit.title) for hit in hits], [("projects/plan.md", "plan")])
+        self.assertEqual(folder_hits, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_store import NumpyVectorStore
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class TestNumpyVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "numpy")
+        self.store = NumpyVectorStore(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _vector_files(self):
+        return sorted(name for name in os.listdir(self.path) if name.endswith(".npy"))
+
+    def test_empty_store(self):
+        self.assertEqual(self.store.count(), 0)
+        self.assertEqual(self.store.get(include=["metadatas"]), {"ids": [], "metadatas": []})
+        results = self.store.query(query_embeddings=[[1.0, 0.0]], n_results=3)
+        self.assertEqual(results["ids"], [[]])
+
+    def test_query_returns_exact_top_k_by_cosine_distance(self):
+        self.store.upsert(
+            ids=["a", "b", "c", "d"],
+            embeddings=[[1, 0], [0, 1], [1, 1], [2, 0.2]],
+            documents=["not stored"] * 4,
+            metadatas=[{"parent": name} for name in "abcd"],
+        )
+
+        results = self.store.query(query_embeddings=[[1, 0]], n_results=2, include=["metadatas", "distances"])
+
+        self.assertEqual(results["ids"], [["a", "d"]])
+        self.assertEqual(results["metadatas"], [[{"parent": "a"}, {"parent": "d"}]])
+        self.assertAlmostEqual(results["distances"][0][0], 0.0, places=6)
+        self.assertAlmostEqual(results["distances"][0][1], 1 - float(unit(2, 0.2) @ unit(1, 0)), places=6)
+        self.assertNotIn("documents", results)
+
+    def test_updates_do_not_write_rows_being_searched(self):
+        """An updated id gets a new row; the old one (maybe scored right now) stays intact."""
+        self.store.upsert(ids=["a", "b"], embeddings=[[1, 0], [0, 1]], metadatas=[{"v": 1}, {"v": 1}])
+        vectors = self.store._vectors
+        old_row = np.array(vectors[0])
+
+        self.store.upsert(ids=["a"], embeddings=[[0, 1]], metadatas=[{"v": 2}])
+
+        np.testing.assert_array_equal(vectors[0], old_row)
+        self.assertEqual(self.store.count(), 2)
+        results = self.store.query(query_embeddings=[[0, 1]], n_results=5, include=["metadatas", "distances"])
+        self.assertEqual(sorted(results["ids"][0]), ["a", "b"])
+        self.assertIn({"v": 2}, results["metadatas"][0])
+        self.assertEqual(self.store.get(ids=["a"])["metadatas"], [{"v": 2}])
+
+    def test_several_queries_at_once(self):
+        self.store.upsert(ids=["a", "b", "c"], embeddings=[[1, 0], [0, 1], [1, 1]])
+        self.store.delete(ids=["c"])
+
+        results = self.store.query(query_embeddings=[[1, 0.1], [0.1, 1]], n_results=5, include=["distances"])
+
+        self.assertEqual(results["ids"], [["a", "b"], ["b", "a"]])
+        self.assertEqual(len(results["distances"]), 2)
+        self.assertEqual(NumpyVectorStore(os.path.join(self.tmp.name, "empty")).query(
+            query_embeddings=[[1, 0], [0, 1]], n_results=1)["ids"], [[], []])
+
+    def test_upsert_replaces_existing_ids(self):
+        self.store.upsert(ids=["a", "b"], embeddings=[[1, 0], [0, 1]], metadatas=[{"v": 1}, {"v": 1}])
+        self.store.upsert(ids=["a"], embeddings=[[0, 1]], metadatas=[{"v": 2}])
+
+        self.assertEqual(self.store.count(), 2)
+        stored = self.store.get(ids=["a", "missing"], include=["embeddings", "metadatas"])
+        self.assertEqual(stored["ids"], ["a"])
+        self.assertEqual(stored["metadatas"], [{"v": 2}])
+        np.testing.assert_allclose(stored["embeddings"][0], [0, 1])
+
+    def test_delete_masks_rows(self):
+        self.store.upsert(ids=["a", "b"], embeddings=[[1, 0], [0.9, 0.1]])
+        self.store.delete(ids=["a", "unknown"])
+
+        self.assertEqual(self.store.count(), 1)
+        self.assertEqual(self.store.query(query_embeddings=[[1, 0]], n_results=5)["ids"], [["b"]])
+        # Deleted rows are kept until they make up half of the matrix
+        self.assertEqual(len(self._vector_files()), 1)
+
+    def test_grows_and_compacts(self):
+        NumpyVectorStore.MIN_CAPACITY, old_capacity = 4, NumpyVectorStore.MIN_CAPACITY
+        self.addCleanup(setattr, NumpyVectorStore, "MIN_CAPACITY", old_capacity)
+        ids = [f"note{i}" for i in range(10)]
+        self.store.upsert(ids=ids, embeddings=[[1, i] for i in range(10)])
+        self.store.upsert(ids=["late"], embeddings=[[0, 1]])
+        self.assertEqual(self.store.count(), 11)
+
+        self.store.delete(ids=ids[:8])
+
+        # Rewritten without the deleted rows; the old file is gone
+        self.assertEqual(len(self._vector_files()), 1)
+        self.assertEqual(sorted(self.store.get()["ids"]), ["late", "note8", "note9"])
+        self.assertEqual(self.store.query(query_embeddings=[[0, 1]], n_results=1)["ids"], [["late"]])
+
+    def test_changes_are_seen_by_other_instances(self):
+        self.store.upsert(ids=["a"], embeddings=[[1, 0]], metadatas=[{"parent": "a.md"}])
+        reader = NumpyVectorStore(self.path)
+        self.assertEqual(reader.query(query_embeddings=[[1, 0]], n_results=1)["ids"], [["a"]])
+
+        self.store.upsert(ids=["b"], embeddings=[[0, 1]])
+        self.store.delete(ids=["a"])
+
+        self.assertEqual(reader.query(query_embeddings=[[1, 0]], n_results=5)["ids"], [["b"]])
+
+    def test_float16_matrix(self):
+        store = NumpyVectorStore(self.path, dtype="float16")
+        store.upsert(ids=["a", "b"], embeddings=[[1, 0], [0.6, 0.8]])
+
+        results = store.query(query_embeddings=[[1, 0]], n_results=2)
+
+        self.assertEqual(results["ids"], [["a", "b"]])
+        self.assertAlmostEqual(results["distances"][0][1], 0.4, places=3)
+        vectors = np.load(os.path.join(self.path, self._vector_files()[0]), mmap_mode="r")
+        self.assertEqual(vectors.dtype, np.float16)
+
+    def test_other_dimension_replaces_vectors(self):
+        self.store.upsert(ids=["a"], embeddings=[[1, 0]])
+        self.store.upsert(ids=["b"], embeddings=[[1, 0, 0]])
+
+        self.assertEqual(self.store.get()["ids"], ["b"])
+        self.assertEqual(len(self._vector_files()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
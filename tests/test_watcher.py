@@ -0,0 +1,101 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from watcher import IndexWatcher
+
+
+class TestIndexWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base_dir = os.path.join(self.tmp.name, "zk")
+        self.db_path = os.path.join(self.tmp.name, "index")
+        os.mkdir(self.base_dir)
+
+        self.indexer = MagicMock()
+        self.indexer.base_dir = self.base_dir
+        self.indexer.db_path = self.db_path
+        self.watcher = IndexWatcher(self.indexer, reconcile_seconds=0.01)
+        self.watcher.console = MagicMock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _path(self, filename):
+        return os.path.join(self.base_dir, filename)
+
+    def test_handle_changes(self):
+        """Only notes in the vault are applied, classified by their current state."""
+        with open(self._path("kept.md"), "w") as f:
+            f.write("content")
+        changes = {
+            ("added", self._path("kept.md")),
+            ("modified", self._path("kept.md")),
+            ("deleted", self._path("gone.md")),
+            ("added", self._path("image.png")),
+            ("added", os.path.join(self.tmp.name, "elsewhere.md")),
+        }
+
+        self.watcher.handle_changes(changes)
+
+        self.indexer.apply_changes.assert_called_once_with(["kept.md"], ["gone.md"])
+
+    def test_handle_changes_in_subfolders(self):
+        """With a recursive vault, notes in subfolders are applied by their relative path."""
+        os.makedirs(self._path("projects"))
+        with open(self._path(os.path.join("projects", "plan.md")), "w") as f:
+            f.write("content")
+        changes = {
+            ("added", self._path(os.path.join("projects", "plan.md"))),
+            ("added", self._path(os.path.join(".trash", "old.md"))),
+        }
+
+        with patch('watcher.vault_snapshots.recursive', True):
+            self.watcher.handle_changes(changes)
+
+        self.indexer.apply_changes.assert_called_once_with(["projects/plan.md"], [])
+
+    def test_ignores_irrelevant_changes(self):
+        self.watcher.handle_changes({("added", self._path("image.png"))})
+        self.indexer.apply_changes.assert_not_called()
+
+    def test_run_reconciles_and_marks_watcher(self):
+        """Without notifications, run() falls back to periodic full syncs."""
+        synced = threading.Event()
+
+        def update_index(cancel_event=None):
+            if self.indexer.update_index.call_count >= 3:
+                synced.set()
+
+        self.indexer.update_index.side_effect = update_index
+
+        with patch('watcher.watchfiles', None):
+            thread = threading.Thread(target=self.watcher.run)
+            thread.start()
+            self.assertTrue(synced.wait(timeout=5))
+            self.assertTrue(self.watcher.active)
+            # Other processes can tell that the index is being watched
+            with patch('os.getpid', return_value=-1):
+                self.assertTrue(IndexWatcher.running_elsewhere(self.db_path))
+            self.watcher.stop()
+            thread.join(timeout=5)
+
+        self.assertFalse(self.watcher.active)
+        self.assertFalse(os.path.exists(self.watcher.pid_path))
+        self.assertFalse(IndexWatcher.running_elsewhere(self.db_path))
+
+    def test_running_elsewhere_ignores_stale_pid_file(self):
+        os.makedirs(self.db_path)
+        with open(self.watcher.pid_path, "w") as f:
+            f.write("999999999")
+        self.assertFalse(IndexWatcher.running_elsewhere(self.db_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,15 @@
+import io
 import unittest
 import os
 import sys
+import tempfile
 from unittest.mock import MagicMock, patch, mock_open
 
 # Add parent directory to path so we can import zkss
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from zkss import ZKSearcher
+from zkss import ZKSearcher, KeywordHit
+from note_cache import NoteCache
 from settings import DEFAULT_RESULTS
 
 class TestZKSearcher(unittest.TestCase):
@@ -31,59 +34,21 @@ class TestZKSearcher(unittest.TestCase):
         self.assertEqual(self.searcher.strip_ending("my[note].md"), "my[note]")
         self.assertEqual(self.searcher.strip_ending("version 1.0.md"), "version 1.0")
 
-    @patch('os.listdir')
-    @patch('os.path.isfile')
-    @patch('os.lstat')
-    def test_get_sorted_filenames(self, mock_lstat, mock_isfile, mock_listdir):
+    def test_get_sorted_filenames(self):
         """Test getting files sorted by access time."""
-        # Setup mocks
-        mock_listdir.return_value = ["file1.md", "file2.md", "not_a_note.txt", "folder"]
-        
-        # mock isfile to return true for files and false for folders
-        def isfile_side_effect(path):
-            return "folder" not in path
-        mock_isfile.side_effect = isfile_side_effect
-        
-        # mock lstat to return different access times
-        mock_stat1 = MagicMock()
-        mock_stat1.st_atime = 1000 # Older
-        
-        mock_stat2 = MagicMock()
-        mock_stat2.st_atime = 2000 # Newer
-        
-        def lstat_side_effect(path):
-            if "file1.md" in path: return mock_stat1
-            if "file2.md" in path: return mock_stat2
-            return MagicMock()
-        mock_lstat.side_effect = lstat_side_effect
-
-        # Run method
-        files = self.searcher.get_sorted_filenames()
-
-        # Check results
-        self.assertEqual(len(files), 2)
-        self.assertEqual(files[0], "file2.md") # Newer should be first
-        self.assertEqual(files[1], "file1.md")
-
-    def test_filter_and_print(self):
-        """Test that filter_and_print correctly separates matches and calls console."""
-        filenames = ["match.md", "no_match.md", "match2.md"]
-        
-        def predicate(filename):
-            return "match" in filename and "no" not in filename
+        with tempfile.TemporaryDirectory() as base_dir:
+            for name in ["file1.md", "file2.md", "not_a_note.txt"]:
+                with open(os.path.join(base_dir, name), "w") as f:
+                    f.write("content")
+            os.makedirs(os.path.join(base_dir, "folder.md"))
+            os.utime(os.path.join(base_dir, "file1.md"), (1000, 1000))  # Older
+            os.utime(os.path.join(base_dir, "file2.md"), (2000, 3000))  # Newer
+            self.searcher.base_dir = base_dir
 
-        # Run method
-        remaining = self.searcher.filter_and_print(filenames, predicate, "Header")
+            files = self.searcher.get_sorted_filenames()
 
-        # Check returned remaining files
-        self.assertEqual(remaining, ["no_match.md"])
-        
-        # Check console calls
-        # Should print header once
-        self.searcher.console.print.assert_any_call("Header")
-        # Should print matched filenames
-        self.searcher.console.print.assert_any_call("    match")
-        self.searcher.console.print.assert_any_call("    match2")
+        self.assertEqual(files, ["file2.md", "file1.md"])
+        self.assertEqual(self.searcher.note_stats["file2.md"], (3000, 7))
 
     def test_get_file_content(self):
         """Test reading file content safely."""
@@ -118,29 +83,99 @@ class TestZKSearcher(unittest.TestCase):
         self.assertTrue(self.searcher.check_multi_filename("my nice note.md", ["my", "note"]))
         self.assertFalse(self.searcher.check_multi_filename("my nice.md", ["my", "note"]))
 
-    @patch('zkss.ZKSearcher.get_file_content')
-    def test_check_exact_content(self, mock_content):
-        mock_content.return_value = "this is my content"
-        self.assertTrue(self.searcher.check_exact_content("f.md", "my"))
-        self.assertFalse(self.searcher.check_exact_content("f.md", "content2"))
-
-    @patch('zkss.ZKSearcher.get_file_content')
-    def test_check_substring_content(self, mock_content):
-        mock_content.return_value = "this is my content"
-        self.assertTrue(self.searcher.check_substring_content("f.md", "is m"))
-        self.assertFalse(self.searcher.check_substring_content("f.md", "foobar"))
-
-    @patch('zkss.ZKSearcher.get_file_content')
-    def test_check_multi_exact_content(self, mock_content):
-        mock_content.return_value = "this is my content"
-        self.assertTrue(self.searcher.check_multi_exact_content("f.md", ["my", "content"]))
-        self.assertFalse(self.searcher.check_multi_exact_content("f.md", ["my", "foobar"]))
-
-    @patch('zkss.ZKSearcher.get_file_content')
-    def test_check_multi_content(self, mock_content):
-        mock_content.return_value = "this is my content"
-        self.assertTrue(self.searcher.check_multi_content("f.md", ["is m", "content"]))
-        self.assertFalse(self.searcher.check_multi_content("f.md", ["is m", "foobar"]))
+    # --- Tier Engine Tests ---
+
+    def test_assign_tiers_reads_each_note_once(self):
+        """Content tiers share one read per note, even for notes matching nothing."""
+        contents = {
+            "1 alpha.md": "nothing here",
+            "2 beta.md": "my garden notes",
+            "3 gamma.md": "garden of my dreams",
+            "4 my garden.md": "",
+        }
+        with tempfile.TemporaryDirectory() as base_dir:
+            for filename, content in contents.items():
+                with open(os.path.join(base_dir, filename), "w") as f:
+                    f.write(content)
+            searcher = ZKSearcher(base_dir=base_dir, ending=".md")
+            searcher.note_cache = NoteCache()
+
+            with patch('builtins.open', wraps=open) as mock_open_:
+                tiers = searcher.build_tiers("my garden")
+                tier_of = searcher.assign_tiers(list(contents), tiers)
+
+        opened = [os.path.basename(c.args[0]) for c in mock_open_.call_args_list]
+        self.assertEqual(sorted(opened), ["1 alpha.md", "2 beta.md", "3 gamma.md"])
+        self.assertEqual(tier_of, {"4 my garden.md": 0, "2 beta.md": 5, "3 gamma.md": 6})
+
+    def test_parallel_assign_tiers_matches_sequential(self):
+        """Thread and process pools assign the same tiers as a sequential scan."""
+        with tempfile.TemporaryDirectory() as base_dir:
+            filenames = []
+            for i in range(40):
+                filename = f"{i:03d} note {'garden' if i % 7 == 0 else 'misc'}.md"
+                with open(os.path.join(base_dir, filename), "w") as f:
+                    f.write(["my garden", "garden of mine", "my other garden", "nothing"][i % 4])
+                filenames.append(filename)
+
+            sequential = ZKSearcher(base_dir=base_dir, ending=".md", jobs=1)
+            tiers = sequential.build_tiers("my garden")
+            expected = sequential.assign_tiers(filenames, tiers)
+
+            threaded = ZKSearcher(base_dir=base_dir, ending=".md", jobs=4)
+            self.assertEqual(threaded.assign_tiers(filenames, threaded.build_tiers("my garden")), expected)
+
+            in_processes = ZKSearcher(base_dir=base_dir, ending=".md", jobs=2)
+            self.assertEqual(in_processes.assign_tiers_in_processes(filenames, "my garden"), expected)
+
+    def test_iter_hits_stops_at_limit(self):
+        """Limited searches yield the ranked prefix and stop before reading contents."""
+        with tempfile.TemporaryDirectory() as base_dir:
+            for i, content in enumerate(["my garden", "", "garden of my dreams", "nothing"]):
+                filename = f"{i} {'my garden' if i % 2 else 'note'}.md"
+                with open(os.path.join(base_dir, filename), "w") as f:
+                    f.write(content)
+                os.utime(os.path.join(base_dir, filename), (1000 - i, 1000))
+
+            for jobs in (1, 4):
+                searcher = ZKSearcher(base_dir=base_dir, ending=".md", use_keyword_index=False, jobs=jobs)
+                searcher.note_cache = NoteCache()
+                everything = list(searcher.iter_hits("My garden"))
+                self.assertEqual(
+                    [(hit.tier, hit.filename) for hit in everything],
+                    [(0, "1 my garden.md"), (0, "3 my garden.md"), (5, "0 note.md"), (6, "2 note.md")],
+                )
+
+                searcher.note_cache = NoteCache()
+                with patch('builtins.open', wraps=open) as mock_open_:
+                    self.assertEqual(list(searcher.iter_hits("My garden", limit=2)), everything[:2])
+                mock_open_.assert_not_called()
+                self.assertEqual(list(searcher.iter_hits("My garden", limit=3)), everything[:3])
+
+    def test_search_many_reads_each_note_once(self):
+        """A batch of searches gives the same hits as separate searches from one pass over the notes."""
+        vault = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "vault")
+        queries = ["notes", "flour", "spaced repetition", "nothing at all"]
+        searcher = ZKSearcher(base_dir=vault, use_keyword_index=False)
+        separate = [list(searcher.iter_hits(query)) for query in queries]
+
+        searcher.note_cache = NoteCache()
+        batch = searcher.search_many(queries)
+
+        self.assertEqual(batch, separate)
+        self.assertEqual(searcher.note_cache.files_read, len(os.listdir(vault)))
+        self.assertEqual(searcher.search_many(queries, limit=1), [hits[:1] for hits in separate])
+
+    def test_print_hits(self):
+        hits = [
+            KeywordHit(0, "Header A", "a.md", "a"), KeywordHit(0, "Header A", "b.md", "b"),
+            KeywordHit(2, "Header C", "c.md", "c"),
+        ]
+        self.searcher.print_hits(iter(hits))
+        self.assertEqual(
+            [c.args[0] for c in self.searcher.console.print.call_args_list],
+            ["Header A", "    a", "    b", "Header C", "    c"],
+        )
 
     @patch('argparse.ArgumentParser.parse_args')
     @patch('indexer.IndexManager')
@@ -151,6 +186,9 @@ class TestZKSearcher(unittest.TestCase):
             search_terms=["query"],
             semantic=True,
             reindex=False,
+            watch=False,
+            daemon=False,
+            stats=False,
             limit=5
         )
         
@@ -173,6 +211,9 @@ class TestZKSearcher(unittest.TestCase):
             search_terms=["query"],
             semantic=True,
             reindex=False,
+            watch=False,
+            daemon=False,
+            stats=False,
             limit=DEFAULT_RESULTS 
         )
         
@@ -186,5 +227,43 @@ class TestZKSearcher(unittest.TestCase):
         # Assert
         mock_indexer_instance.search.assert_called_with("query", n_results=DEFAULT_RESULTS)
 
+    @patch('argparse.ArgumentParser.parse_args')
+    @patch('hybrid.HybridSearcher')
+    @patch('indexer.IndexManager')
+    def test_run_hybrid_search(self, MockIndexManager, MockHybridSearcher, mock_args):
+        """--hybrid prints the fused ranking and the stage timings."""
+        from hybrid import HybridResult
+        mock_args.return_value = MagicMock(
+            search_terms=["query"], semantic=False, hybrid=True, reindex=False, watch=False, daemon=False, stats=False, limit=5
+        )
+        MockIndexManager.return_value.watched_elsewhere.return_value = False
+        MockHybridSearcher.return_value.search.return_value = HybridResult(["a note.md"], {"total": 0.002})
+
+        self.searcher.run()
+
+        MockHybridSearcher.return_value.search.assert_called_with("query", limit=5, update_index=True)
+        printed = [c[0][0] for c in self.searcher.console.print.call_args_list]
+        self.assertIn("    a note", printed)
+        self.assertIn("[dim]total 2.0 ms[/dim]", printed)
+
+    def test_run_prints_stats(self):
+        """--stats prints the time and reads of each stage to stderr."""
+        vault = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "vault")
+        searcher = ZKSearcher(base_dir=vault, use_keyword_index=False)
+        searcher.note_cache = NoteCache()
+        searcher.profiler.note_cache = searcher.note_cache
+        searcher.use_pager = False
+        searcher.console = MagicMock()
+
+        with patch('sys.stderr', io.StringIO()) as stderr:
+            searcher.run(["--stats", "-n", "1", "flour"])
+
+        stages = searcher.profiler.stages
+        self.assertEqual(list(stages)[:3], ["total", "list_notes", "build_tiers"])
+        self.assertEqual(stages["tier 1"].files_read, 0)
+        self.assertGreater(stages["total"].files_read, 0)
+        self.assertEqual(stages["total"].bytes_read, sum(s.bytes_read for name, s in stages.items() if name.startswith("tier")))
+        self.assertIn("list_notes", stderr.getvalue())
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,291 @@
+import os
+import fnmatch
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from settings import (
+    ENDING,
+    SNAPSHOT_MAX_AGE_SECONDS,
+    VAULT_EXCLUDE,
+    VAULT_INCLUDE,
+    VAULT_RECURSIVE,
+    VAULT_WALK_WORKERS,
+)
+
+
+class NoteStat(NamedTuple):
+    """What a directory listing tells about one note."""
+    mtime: float
+    size: int
+    atime: float
+
+
+class Listing(NamedTuple):
+    """The notes and subdirectories of one directory, as of one scandir pass."""
+    # None if the directory changed too recently to be trusted (see RACY_SECONDS)
+    mtime_ns: Optional[int]
+    taken: float
+    notes: Dict[str, NoteStat]
+    subdirs: Tuple[str, ...]
+
+
+def note_name(note_id: str) -> str:
+    """The file name of a note, without the folders of its id."""
+    return note_id.rsplit("/", 1)[-1]
+
+
+class VaultSnapshots:
+    """
+    Process-wide cache of the notes in a vault and their stat results.
+
+    Notes are identified by their path relative to the vault, with "/" as
+    separator ("folder/note.md"; just the file name at the top level). A
+    snapshot is taken with one os.scandir pass per directory (one stat call
+    per note, none on Windows), subdirectories of a level in parallel, and is
+    shared by keyword search and the semantic indexer.
+
+    Each directory's listing is reused while the directory's mtime is
+    unchanged (no note added, removed or renamed) and it is younger than
+    max_age seconds; in-place edits don't touch the directory, so the age
+    bounds how long they can go unnoticed. A watcher calls invalidate() when
+    it sees changes, but the age applies to watched directories as well:
+    watchers don't report reads, so it also bounds how stale the access
+    times used for ordering results get.
+    """
+
+    # A directory changed this recently (seconds) may change again without a
+    # new mtime (coarse timestamps), so its listing is not reused
+    RACY_SECONDS = 1.0
+
+    def __init__(
+        self,
+        max_age: float = SNAPSHOT_MAX_AGE_SECONDS,
+        recursive: bool = VAULT_RECURSIVE,
+        include: Iterable[str] = VAULT_INCLUDE,
+        exclude: Iterable[str] = VAULT_EXCLUDE,
+        workers: int = VAULT_WALK_WORKERS,
+    ):
+        self.hits = 0
+        self.scans = 0
+        # (directory path, ending) -> Listing
+        self._listings: Dict[Tuple[str, str], Listing] = {}
+        # (vault path, ending) -> (listings and their selected notes by relative
+        # directory, all notes by id)
+        self._vaults: Dict[Tuple[str, str], tuple] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.configure(max_age, recursive, include, exclude, workers)
+
+    def configure(
+        self,
+        max_age: float,
+        recursive: bool,
+        include: Iterable[str],
+        exclude: Iterable[str],
+        workers: int,
+    ):
+        """Applies new settings (e.g. after settings.py changed); cached listings are dropped."""
+        with self._lock:
+            self.max_age = max_age
+            self.recursive = recursive
+            self.include = tuple(include)
+            self.exclude = tuple(exclude)
+            self.workers = workers
+            self._listings.clear()
+            self._vaults.clear()
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    # Include and exclude globs
+
+    @staticmethod
+    def _matches(patterns: Tuple[str, ...], relative_path: str, folder: bool = False) -> bool:
+        """
+        fnmatch-style; patterns without "/" match a file or folder name at any
+        depth, and patterns ending with "/" only match folders.
+        """
+        name = note_name(relative_path)
+        for pattern in patterns:
+            if pattern.endswith("/"):
+                if not folder:
+                    continue
+                pattern = pattern.rstrip("/")
+            if fnmatch.fnmatchcase(relative_path if "/" in pattern else name, pattern):
+                return True
+        return False
+
+    def _selected(self, note_id: str) -> bool:
+        """
+        Not excluded, and included if there are include patterns: by the note
+        itself or (for patterns ending with "/") by one of its folders.
+        """
+        if self._matches(self.exclude, note_id):
+            return False
+        if not self.include or self._matches(self.include, note_id):
+            return True
+        folders = note_id.split("/")[:-1]
+        return any(
+            self._matches(self.include, "/".join(folders[:depth]), folder=True) for depth in range(1, len(folders) + 1)
+        )
+
+    def note_id(self, directory: str, path: str, ending: str = ENDING) -> Optional[str]:
+        """The id of the file at path in the vault at directory (None if it isn't one of its notes)."""
+        relative_path = os.path.relpath(os.path.abspath(path), os.path.abspath(directory))
+        if relative_path == os.curdir or relative_path.split(os.sep, 1)[0] == os.pardir:
+            return None
+        note_id = relative_path.replace(os.sep, "/")
+        folders = note_id.split("/")[:-1]
+        if not note_id.endswith(ending) or (folders and not self.recursive):
+            return None
+        for depth in range(1, len(folders) + 1):
+            if self._matches(self.exclude, "/".join(folders[:depth]), folder=True):
+                return None
+        return note_id if self._selected(note_id) else None
+
+    # Listings
+
+    def _listing(self, path: str, ending: str) -> Optional[Listing]:
+        """The listing of one directory, from the cache if still valid (None if it is gone)."""
+        key = (path, ending)
+        try:
+            directory_mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            listing = self._listings.get(key)
+            if (
+                listing is not None
+                and listing.mtime_ns == directory_mtime
+                and time.monotonic() - listing.taken < self.max_age
+            ):
+                self.hits += 1
+                return listing
+
+        taken = time.monotonic()
+        if time.time() - directory_mtime / 1e9 < self.RACY_SECONDS:
+            directory_mtime = None
+        try:
+            notes, subdirs = self._scan(path, ending)
+        except FileNotFoundError:
+            return None
+        listing = Listing(directory_mtime, taken, notes, subdirs)
+        with self._lock:
+            self.scans += 1
+            self._listings[key] = listing
+        return listing
+
+    @staticmethod
+    def _scan(path: str, ending: str) -> Tuple[Dict[str, NoteStat], Tuple[str, ...]]:
+        notes = {}
+        subdirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.name.endswith(ending) and entry.is_file():
+                        stat = entry.stat()
+                        notes[entry.name] = NoteStat(stat.st_mtime, stat.st_size, stat.st_atime)
+                    elif entry.is_dir(follow_symlinks=False):
+                        # Symlinked folders aren't followed (no loops)
+                        subdirs.append(entry.name)
+                except OSError:
+                    # Removed while listing
+                    continue
+        return notes, tuple(subdirs)
+
+    def _walk(self, directory: str, ending: str) -> Dict[str, Listing]:
+        """Listings of the vault's directories by relative path ("" for the vault itself)."""
+        root = self._listing(directory, ending)
+        if root is None:
+            raise FileNotFoundError(directory)
+        listings = {"": root}
+        level = [""]
+        while self.recursive and level:
+            subdirs = [
+                f"{parent}/{name}" if parent else name
+                for parent in level
+                for name in listings[parent].subdirs
+            ]
+            subdirs = [subdir for subdir in subdirs if not self._matches(self.exclude, subdir, folder=True)]
+            paths = [os.path.join(directory, *subdir.split("/")) for subdir in subdirs]
+            if len(paths) > 1 and self.workers > 1:
+                found = list(self._executor().map(self._listing, paths, [ending] * len(paths)))
+            else:
+                found = [self._listing(path, ending) for path in paths]
+            level = []
+            for subdir, listing in zip(subdirs, found):
+                if listing is not None:
+                    listings[subdir] = listing
+                    level.append(subdir)
+        return listings
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="zkss-walk")
+            return self._pool
+
+    # Snapshots
+
+    def get(self, directory: str, ending: str = ENDING) -> Dict[str, NoteStat]:
+        """
+        Returns {note id: NoteStat} for the notes (files ending with ending)
+        in the vault at directory. The dict is shared and must not be
+        modified. Raises FileNotFoundError if the directory doesn't exist.
+        """
+        key = (directory, ending)
+        listings = self._walk(directory, ending)
+        with self._lock:
+            previous, selections, notes = self._vaults.get(key, ({}, {}, None))
+        if previous.keys() == listings.keys() and all(
+            previous[subdir] is listing for subdir, listing in listings.items()
+        ):
+            return notes
+
+        # Only the folders whose listing changed are filtered again
+        selections = {
+            subdir: selections[subdir] if previous.get(subdir) is listing else self._select(subdir, listing)
+            for subdir, listing in listings.items()
+        }
+        notes = {}
+        for selected in selections.values():
+            notes.update(selected)
+        with self._lock:
+            self._vaults[key] = (listings, selections, notes)
+        return notes
+
+    def _select(self, subdir: str, listing: Listing) -> Dict[str, NoteStat]:
+        """The notes of one folder's listing that belong to the vault, by id."""
+        selected = {}
+        for name, stat in listing.notes.items():
+            note_id = f"{subdir}/{name}" if subdir else name
+            if self._selected(note_id):
+                selected[note_id] = stat
+        return selected
+
+    def invalidate(self, directory: Optional[str] = None, below: bool = True):
+        """Drops the listing of directory and (with below) of the directories under it; all if None."""
+        with self._lock:
+            if directory is None:
+                self._listings.clear()
+                return
+            directory = os.path.abspath(directory)
+            for key in list(self._listings):
+                path = os.path.abspath(key[0])
+                if path == directory or (below and path.startswith(directory + os.sep)):
+                    del self._listings[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "directories": len(self._listings),
+                "notes": sum(len(listing.notes) for listing in self._listings.values()),
+                "hits": self.hits,
+                "scans": self.scans,
+            }
+
+
+# Shared by all searchers and index managers in this process
+vault_snapshots = VaultSnapshots()
@@ -0,0 +1,275 @@
+import os
+import uuid
+import pickle
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from settings import NUMPY_VECTOR_DTYPE
+from atomic_write import atomic_write
+
+
+class NumpyVectorStore:
+    """
+    Exact vector search over a memory-mapped matrix.
+
+    Chunk vectors are kept in one `.npy` file (a row per chunk, L2-normalized,
+    float32 or float16) next to an id table with the id and metadata of every
+    row. A query is a single matrix-vector product over all rows plus an
+    argpartition for the top k, which for vaults of up to ~100k notes is
+    exact and faster than an HNSW index, and opening the store only maps the
+    file instead of starting a database.
+
+    Implements the part of the Chroma collection API that IndexManager uses
+    (get, upsert, delete, query), with cosine distances. Documents aren't
+    stored; the notes are the source of truth.
+
+    Rows are only appended, also for updated ids, so searches running
+    concurrently never score a row being written: replaced and deleted rows
+    are masked until they make up half of the matrix, then the matrix is
+    rewritten without them. The matrix grows by doubling its capacity. Rewritten matrices get a new file name
+    and the id table (written atomically after the vectors) names the current
+    one, so searches in other processes never see a half-written state.
+    """
+
+    DIR_NAME = "numpy"
+    TABLE_FILE = "ids.pkl"
+    FORMAT_VERSION = 1
+    MIN_CAPACITY = 1024
+    # Rows scored at a time (bounds the float32 copy of float16 matrices)
+    QUERY_BLOCK_ROWS = 65536
+
+    def __init__(self, path: str, dtype: str = NUMPY_VECTOR_DTYPE):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.table_path = os.path.join(path, self.TABLE_FILE)
+        self._lock = threading.Lock()
+        # Identifies the id table in memory; it is replaced by every write
+        self._table_version_loaded: Optional[tuple] = None
+        self._clear()
+
+    def _clear(self):
+        self._file: Optional[str] = None
+        self._vectors: Optional[np.ndarray] = None
+        # Per row; None for deleted rows
+        self._ids: List[Optional[str]] = []
+        self._metadatas: List[Optional[dict]] = []
+        self._rows: Dict[str, int] = {}
+        self._deleted: List[int] = []
+
+    # Loading and saving
+
+    def _table_version(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.table_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        """(Re)loads the id table and matrix if another process (or nobody yet) wrote them."""
+        table_version = self._table_version()
+        if table_version == self._table_version_loaded:
+            return
+        self._clear()
+        self._table_version_loaded = table_version
+        if table_version is None:
+            return
+        try:
+            with open(self.table_path, "rb") as f:
+                table = pickle.load(f)
+            if table.get("version") != self.FORMAT_VERSION:
+                raise ValueError(f"Unsupported vector table version: {table.get('version')}")
+            vectors = np.load(os.path.join(self.path, table["file"]), mmap_mode="r+")
+        except Exception:
+            # Rewritten concurrently, or unusable: treated as empty (and
+            # retried on the next call)
+            self._table_version_loaded = None
+            return
+        self._file = table["file"]
+        self._vectors = vectors
+        self._ids = table["ids"]
+        self._metadatas = table["metadatas"]
+        self._rows = {id_: row for row, id_ in enumerate(self._ids) if id_ is not None}
+        self._deleted = [row for row, id_ in enumerate(self._ids) if id_ is None]
+
+    def _save_table(self):
+        """Flushes the matrix, then writes the id table atomically (temp file + rename)."""
+        if self._vectors is not None:
+            self._vectors.flush()
+        table = {
+            "version": self.FORMAT_VERSION,
+            "file": self._file,
+            "ids": self._ids,
+            "metadatas": self._metadatas,
+        }
+        with atomic_write(self.table_path) as f:
+            pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._table_version_loaded = self._table_version()
+
+    def _rewrite(self, capacity: int, dim: int):
+        """
+        Copies the live rows into a new matrix of the given capacity (and the
+        configured dtype). The previous file is removed once the new table is saved.
+        """
+        live = [row for row, id_ in enumerate(self._ids) if id_ is not None]
+        file_name = f"vectors-{uuid.uuid4().hex}.npy"
+        vectors = np.lib.format.open_memmap(
+            os.path.join(self.path, file_name), mode="w+", dtype=self.dtype, shape=(capacity, dim)
+        )
+        if live:
+            vectors[: len(live)] = self._vectors[live]
+        old_file = self._file
+        self._file = file_name
+        self._vectors = vectors
+        self._ids = [self._ids[row] for row in live]
+        self._metadatas = [self._metadatas[row] for row in live]
+        self._rows = {id_: row for row, id_ in enumerate(self._ids)}
+        self._deleted = []
+        return old_file
+
+    def _remove_file(self, file_name: Optional[str]):
+        if file_name is None:
+            return
+        try:
+            os.remove(os.path.join(self.path, file_name))
+        except OSError:
+            # Still mapped elsewhere (Windows), or already gone
+            pass
+
+    def _capacity(self, rows: int) -> int:
+        """Room for twice the given number of rows, in powers of two."""
+        capacity = self.MIN_CAPACITY
+        while capacity < 2 * rows:
+            capacity *= 2
+        return capacity
+
+    @staticmethod
+    def _normalized(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.clip(norms, 1e-12, None)
+
+    # Collection API
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._rows)
+
+    def get(self, ids: Optional[Iterable[str]] = None, include: Iterable[str] = ("metadatas",)) -> dict:
+        """Returns the stored ids (all, or those of ids that exist) and the requested fields."""
+        with self._lock:
+            self._refresh()
+            if ids is None:
+                rows = sorted(self._rows.values())
+            else:
+                rows = [self._rows[id_] for id_ in ids if id_ in self._rows]
+            result = {"ids": [self._ids[row] for row in rows]}
+            if "metadatas" in include:
+                result["metadatas"] = [self._metadatas[row] for row in rows]
+            if "embeddings" in include:
+                result["embeddings"] = [np.array(self._vectors[row], dtype=np.float32) for row in rows]
+            return result
+
+    def upsert(self, ids: List[str], embeddings, documents: Optional[List[str]] = None, metadatas: Optional[List[dict]] = None):
+        if not ids:
+            return
+        vectors = self._normalized(embeddings)
+        metadatas = metadatas if metadatas is not None else [None] * len(ids)
+        with self._lock:
+            self._refresh()
+            os.makedirs(self.path, exist_ok=True)
+            old_file = None
+            if self._vectors is not None and self._vectors.shape[1] != vectors.shape[1]:
+                # Vectors of another model can't be mixed with these
+                old_file = self._file
+                self._clear()
+
+            # Copy on write, so that searches running concurrently keep a
+            # consistent snapshot: rows they may be scoring are never written.
+            # Updated ids get new rows and their old ones are masked like
+            # deleted rows. Duplicates within one call: the last one wins.
+            new = {id_: i for i, id_ in enumerate(ids)}
+            replaced_rows = [self._rows.pop(id_) for id_ in new if id_ in self._rows]
+            if replaced_rows:
+                row_ids, row_metadatas = list(self._ids), list(self._metadatas)
+                for row in replaced_rows:
+                    row_ids[row] = None
+                    row_metadatas[row] = None
+                self._ids, self._metadatas = row_ids, row_metadatas
+                self._deleted = self._deleted + replaced_rows
+
+            if (
+                self._vectors is None
+                or self._vectors.dtype != self.dtype
+                or len(self._ids) + len(new) > len(self._vectors)
+                or len(self._deleted) > max(self.MIN_CAPACITY, len(self._ids)) // 2
+            ):
+                replaced = self._rewrite(self._capacity(len(self._rows) + len(new)), vectors.shape[1])
+                old_file = old_file or replaced
+
+            start = len(self._ids)
+            for offset, (id_, i) in enumerate(new.items()):
+                self._vectors[start + offset] = vectors[i]
+                self._rows[id_] = start + offset
+            self._ids = self._ids + list(new)
+            self._metadatas = self._metadatas + [metadatas[i] for i in new.values()]
+            self._save_table()
+            self._remove_file(old_file)
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            self._refresh()
+            rows = [self._rows.pop(id_) for id_ in ids if id_ in self._rows]
+            if not rows:
+                return
+            row_ids = list(self._ids)
+            row_metadatas = list(self._metadatas)
+            for row in rows:
+                row_ids[row] = None
+                row_metadatas[row] = None
+            self._ids, self._metadatas = row_ids, row_metadatas
+            self._deleted = self._deleted + rows
+
+            old_file = None
+            if len(self._deleted) > max(self.MIN_CAPACITY, len(self._ids)) // 2:
+                old_file = self._rewrite(self._capacity(len(self._rows)), self._vectors.shape[1])
+            self._save_table()
+            self._remove_file(old_file)
+
+    def query(self, query_embeddings, n_results: int = 10, include: Iterable[str] = ("metadatas", "distances")) -> dict:
+        """
+        Exact nearest neighbours by cosine distance, best first (one result
+        list per query). Several queries are scored in one pass over the matrix.
+        """
+        with self._lock:
+            self._refresh()
+            vectors, ids, metadatas, deleted = self._vectors, self._ids, self._metadatas, self._deleted
+
+        queries = self._normalized(query_embeddings)
+        count = len(ids)
+        k = min(n_results, count - len(deleted))
+        result = {"ids": [], "metadatas": [], "distances": []}
+        if vectors is None or k <= 0 or vectors.shape[1] != queries.shape[1]:
+            for _ in range(len(queries)):
+                for values in result.values():
+                    values.append([])
+            return {key: value for key, value in result.items() if key == "ids" or key in include}
+
+        scores = np.empty((len(queries), count), dtype=np.float32)
+        for start in range(0, count, self.QUERY_BLOCK_ROWS):
+            block = vectors[start:min(start + self.QUERY_BLOCK_ROWS, count)]
+            scores[:, start:start + len(block)] = queries @ block.astype(np.float32, copy=False).T
+        if deleted:
+            scores[:, deleted] = -np.inf
+        for query_scores in scores:
+            top = np.argpartition(-query_scores, k - 1)[:k]
+            top = top[np.argsort(-query_scores[top], kind="stable")]
+            result["ids"].append([ids[row] for row in top])
+            result["metadatas"].append([metadatas[row] for row in top])
+            result["distances"].append([float(1 - query_scores[row]) for row in top])
+        return {key: value for key, value in result.items() if key == "ids" or key in include}
@@ -0,0 +1,155 @@
+import os
+import time
+import threading
+from typing import Iterable, Tuple
+
+from rich.console import Console
+
+from settings import ENDING, WATCH_RECONCILE_SECONDS
+from vault_snapshot import vault_snapshots
+from cancellation import SearchCancelled
+
+try:
+    # Filesystem notifications: inotify on Linux, FSEvents on macOS.
+    # Installed alongside the MCP server dependencies (via uvicorn).
+    import watchfiles
+except ImportError:  # pragma: no cover - depends on the environment
+    watchfiles = None
+
+
+class IndexWatcher:
+    """
+    Keeps the vector index current by embedding notes as they change.
+
+    Changed and deleted notes are applied to the index individually as the
+    filesystem reports them, so searches can skip the full sync in
+    IndexManager.update_index(). A full sync still runs at startup and every
+    reconcile_seconds as a safety net for missed events.
+    """
+
+    PID_FILE_NAME = "watcher.pid"
+
+    def __init__(self, indexer, reconcile_seconds: float = WATCH_RECONCILE_SECONDS):
+        self.indexer = indexer
+        self.reconcile_seconds = reconcile_seconds
+        self.console = Console(stderr=True)
+        self.pid_path = os.path.join(indexer.db_path, self.PID_FILE_NAME)
+        self._ready = threading.Event()
+        self._stop_event = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        """True once the initial sync is done and while changes are being watched."""
+        return self._ready.is_set() and not self._stop_event.is_set()
+
+    @classmethod
+    def running_elsewhere(cls, db_path: str) -> bool:
+        """True if another process (e.g. `zkss --watch`) is watching the index at db_path."""
+        try:
+            with open(os.path.join(db_path, cls.PID_FILE_NAME)) as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            return False
+        if pid == os.getpid():
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # Exists, but belongs to someone else
+            return True
+        return True
+
+    def stop(self):
+        """Makes run() return (within about a second)."""
+        self._stop_event.set()
+
+    def run(self):
+        """Watches until stop() is called (blocking)."""
+        self._write_pid_file()
+        try:
+            self.reconcile()
+            self._ready.set()
+
+            if watchfiles is None:
+                self.console.print(
+                    "[yellow]watchfiles is not installed; syncing the index every "
+                    f"{self.reconcile_seconds:g}s instead of watching for changes.[/yellow]"
+                )
+                while not self._stop_event.wait(self.reconcile_seconds):
+                    self.reconcile()
+                return
+
+            last_reconcile = time.monotonic()
+            for changes in watchfiles.watch(
+                self.indexer.base_dir,
+                stop_event=self._stop_event,
+                rust_timeout=1000,
+                yield_on_timeout=True,
+                recursive=vault_snapshots.recursive,
+                raise_interrupt=False,
+            ):
+                if changes:
+                    self.handle_changes(changes)
+                if time.monotonic() - last_reconcile >= self.reconcile_seconds:
+                    self.reconcile()
+                    last_reconcile = time.monotonic()
+        finally:
+            self._ready.clear()
+            self._remove_pid_file()
+
+    def handle_changes(self, changes: Iterable[Tuple[object, str]]):
+        """Applies a batch of (change, path) events to the index."""
+        changed = set()
+        deleted = set()
+        for _, path in changes:
+            # The listing of its folder is out of date (and those of a removed folder)
+            vault_snapshots.invalidate(os.path.dirname(path), below=False)
+            vault_snapshots.invalidate(path)
+            filename = vault_snapshots.note_id(self.indexer.base_dir, path, ENDING)
+            if filename is None:
+                continue
+            # The event type is not reliable for atomic saves (write + rename),
+            # so the file's current state decides.
+            if os.path.isfile(path):
+                changed.add(filename)
+                deleted.discard(filename)
+            else:
+                deleted.add(filename)
+                changed.discard(filename)
+
+        if changed or deleted:
+            try:
+                self.indexer.apply_changes(sorted(changed), sorted(deleted))
+            except Exception as e:
+                self.console.print(f"[red]Error updating the index: {e}[/red]")
+
+    def reconcile(self):
+        """Runs a full sync of the index with the filesystem."""
+        # A fresh listing, in case a change notification was missed
+        vault_snapshots.invalidate(self.indexer.base_dir)
+        try:
+            # Stopping the watcher interrupts a long sync
+            self.indexer.update_index(cancel_event=self._stop_event)
+        except SearchCancelled:
+            pass
+        except Exception as e:
+            self.console.print(f"[red]Error syncing the index: {e}[/red]")
+
+    def _write_pid_file(self):
+        try:
+            os.makedirs(os.path.dirname(self.pid_path), exist_ok=True)
+            with open(self.pid_path, "w") as f:
+                f.write(str(os.getpid()))
+        except OSError as e:
+            self.console.print(f"[yellow]Could not write {self.pid_path}: {e}[/yellow]")
+
+    def _remove_pid_file(self):
+        try:
+            with open(self.pid_path) as f:
+                if f.read().strip() != str(os.getpid()):
+                    return
+            os.remove(self.pid_path)
+        except OSError:
+            pass
@@ -2,20 +2,103 @@ import os
 import re
 import sys
 import argparse
-from typing import List, Callable, Optional
+import multiprocessing
+from contextlib import nullcontext
+from functools import cached_property
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, FrozenSet, Iterator, List, Callable, NamedTuple, Optional, Tuple
 
 from rich.console import Console
 from rich import print
-from settings import ZK_BASE_DIR, ENDING, DEFAULT_RESULTS
+from settings import (
+    ZK_BASE_DIR, ENDING, DEFAULT_RESULTS, USE_KEYWORD_INDEX, SEARCH_JOBS, SEARCH_USE_PROCESSES,
+)
+from keyword_index import KeywordIndex, SPLIT_CHARACTERS, count_words, split_words
+from note_cache import note_cache
+from vault_snapshot import note_name, vault_snapshots
+from cancellation import check_cancelled
+from profiling import Profiler
+
+
+class NoteText:
+    """A note's lowercased content and its words, read and split at most once."""
+
+    def __init__(self, searcher: "ZKSearcher", filename: str):
+        self.filename = filename
+        self._searcher = searcher
+
+    @cached_property
+    def content(self) -> str:
+        return self._searcher.get_file_content(self.filename)
+
+    @cached_property
+    def words(self) -> FrozenSet[str]:
+        return self._searcher.get_file_words(self.filename)
+
+    def contains_all(self, terms_lower: List[str]) -> bool:
+        """Checks if all terms are substrings of the content."""
+        if "content" in self.__dict__ or "words" in self.__dict__:
+            # Already decoded for another tier
+            return all(term in self.content for term in terms_lower)
+        return self._searcher.file_contains_all(self.filename, terms_lower)
+
+
+# A result tier: the header printed above its matches and the predicate a
+# note has to satisfy to be listed in it.
+Tier = Tuple[str, Callable[[NoteText], bool]]
+
+
+class KeywordHit(NamedTuple):
+    """
+    A note found by keyword search: the tier it matched (position and
+    header), the note's filename (its path in the vault) and title (its
+    name without ending), and its BM25 score for the search words (None
+    without keyword index).
+    """
+    tier: int
+    header: str
+    filename: str
+    title: str
+    score: Optional[float] = None
 
 
 class ZKSearcher:
-    SPLIT_CHARACTERS = r"[ \.,\[\]\(\)\n]"
+    SPLIT_CHARACTERS = SPLIT_CHARACTERS
 
-    def __init__(self, base_dir: str = ZK_BASE_DIR, ending: str = ENDING):
+    def __init__(
+        self,
+        base_dir: str = ZK_BASE_DIR,
+        ending: str = ENDING,
+        use_keyword_index: bool = USE_KEYWORD_INDEX,
+        jobs: int = SEARCH_JOBS,
+        use_processes: bool = SEARCH_USE_PROCESSES,
+    ):
         self.base_dir = base_dir
         self.ending = ending
+        self.use_keyword_index = use_keyword_index
+        # Number of notes evaluated concurrently (1 = sequential), and whether
+        # to use worker processes instead of threads for scanning contents
+        self.jobs = jobs
+        self.use_processes = use_processes
         self.console = Console()
+        self.note_cache = note_cache
+        # Set by a caller running the search in a worker thread to abort it
+        self.cancel_event: Optional[threading.Event] = None
+        # filename -> (mtime, size), filled by get_sorted_filenames()
+        self.note_stats: Dict[str, Tuple[float, int]] = {}
+        # Created on first use and reused by later searches (the daemon hands
+        # them from one searcher to the next)
+        self.keyword_index: Optional[KeywordIndex] = None
+        self.index_manager = None
+        # Whether keyword results go through the pager, and if they were printed
+        self.use_pager = True
+        self.paged = False
+        # Time and reads per stage of this searcher's searches (`--stats`)
+        self.profiler = Profiler()
+        # How tier headers show where the terms matched ("filename"/"content"):
+        # Rich markup for the terminal (the MCP server uses Markdown)
+        self.field_format = "[yellow]{}:"
 
     def strip_ending(self, filename: str) -> str:
         """Removes the file extension from the filename."""
@@ -24,65 +107,70 @@ class ZKSearcher:
             return match.group(1)
         return filename
 
+    def note_title(self, filename: str) -> str:
+        """The note's name without extension (and without the folders of a note in a subfolder)."""
+        return self.strip_ending(note_name(filename))
+
     def get_sorted_filenames(self) -> List[str]:
         """Returns a list of filenames sorted by last access time (descending)."""
+        with self.profiler.stage("list_notes"):
+            return self._list_sorted_filenames()
+
+    def _list_sorted_filenames(self) -> List[str]:
         try:
-            file_and_folder_names = os.listdir(self.base_dir)
+            # Shared with the semantic indexer (one scandir pass for both)
+            notes = vault_snapshots.get(self.base_dir, self.ending)
         except FileNotFoundError:
             self.console.print(f"[red]Directory not found: {self.base_dir}[/red]")
             return []
 
-        files_with_last_access_time = {
-            filename: os.lstat(os.path.join(self.base_dir, filename)).st_atime
-            for filename in file_and_folder_names
-            if os.path.isfile(os.path.join(self.base_dir, filename))
-            and filename.endswith(self.ending)
-        }
-
-        return sorted(
-            files_with_last_access_time.keys(),
-            key=lambda f: files_with_last_access_time[f],
-            reverse=True,
-        )
-
-    def filter_and_print(
-        self,
-        filenames: List[str],
-        predicate: Callable[[str], bool],
-        header_message: str,
-    ) -> List[str]:
-        """
-        Filters filenames based on a predicate, prints matches, and returns remaining files.
-        """
-        matches = []
-        remaining = []
-        print_heading = True
-
-        for filename in filenames:
-            if predicate(filename):
-                matches.append(filename)
-                if print_heading:
-                    self.console.print(header_message)
-                    print_heading = False
-                self.console.print("    " + self.strip_ending(filename))
-            else:
-                remaining.append(filename)
-        
-        return remaining
+        self.note_stats = {filename: (note.mtime, note.size) for filename, note in notes.items()}
+        return sorted(notes, key=lambda f: notes[f].atime, reverse=True)
 
     def get_file_content(self, filename: str) -> str:
+        """Returns the lowercased content of a note ("" if it cannot be read)."""
+        try:
+            return self.note_cache.lower(os.path.join(self.base_dir, filename))
+        except Exception:
+            return ""
+
+    def get_file_text(self, filename: str) -> str:
+        """Returns the content of a note as stored ("" if it cannot be read)."""
         try:
-            with open(os.path.join(self.base_dir, filename), "r", errors="ignore") as f:
-                return f.read().lower()
+            return self.note_cache.text(os.path.join(self.base_dir, filename))
         except Exception:
             return ""
 
+    def get_file_words(self, filename: str) -> FrozenSet[str]:
+        """Returns the words of a note's lowercased content."""
+        try:
+            return self.note_cache.words(os.path.join(self.base_dir, filename))
+        except Exception:
+            return split_words("")
+
+    def get_file_word_counts(self, filename: str) -> Dict[str, int]:
+        """Returns how often each word occurs in a note's lowercased content."""
+        try:
+            return count_words(self.note_cache.lower(os.path.join(self.base_dir, filename)))
+        except Exception:
+            return count_words("")
+
+    def file_contains_all(self, filename: str, terms_lower: List[str]) -> bool:
+        """
+        Checks if a note's lowercased content contains all terms, without
+        decoding the note if it isn't cached and the terms are ASCII.
+        """
+        try:
+            return self.note_cache.contains_all(os.path.join(self.base_dir, filename), terms_lower)
+        except Exception:
+            return False
+
     # --- Search Predicates ---
 
     def check_very_exact(self, filename: str, search_string_lower: str) -> bool:
         """Checks if filename (minus ID) exactly matches search string."""
         try:
-            stripped = self.strip_ending(filename.lower())
+            stripped = self.strip_ending(note_name(filename).lower())
             match = re.search(r"^[0-9]* (.*)", stripped)
             cleaned_name = match.group(1) if match else stripped
             return search_string_lower == cleaned_name
@@ -91,50 +179,365 @@ class ZKSearcher:
 
     def check_exact_filename(self, filename: str, search_string_lower: str) -> bool:
         """Checks if search string is an exact word in filename."""
-        return search_string_lower in set(re.split(self.SPLIT_CHARACTERS, filename.lower()))
+        return search_string_lower in set(re.split(self.SPLIT_CHARACTERS, note_name(filename).lower()))
 
     def check_substring_filename(self, filename: str, search_string_lower: str) -> bool:
         """Checks if search string is a substring of filename."""
-        return search_string_lower in filename.lower()
+        return search_string_lower in note_name(filename).lower()
 
     def check_multi_filename(self, filename: str, search_words: List[str]) -> bool:
         """Checks if all search words are present in filename."""
-        return all(word in filename.lower() for word in search_words)
-
-    def check_exact_content(self, filename: str, search_string_lower: str) -> bool:
-        """Checks if search string is an exact word in content."""
-        content = self.get_file_content(filename)
-        return search_string_lower in set(re.split(self.SPLIT_CHARACTERS, content))
-
-    def check_substring_content(self, filename: str, search_string_lower: str) -> bool:
-        """Checks if search string is a substring of content."""
-        content = self.get_file_content(filename)
-        return search_string_lower in content
-
-    def check_multi_exact_content(self, filename: str, search_words: List[str]) -> bool:
-        """Checks if all search words are exact words in content."""
-        content = self.get_file_content(filename)
-        content_words = set(re.split(self.SPLIT_CHARACTERS, content))
-        return all(word in content_words for word in search_words)
-
-    def check_multi_content(self, filename: str, search_words: List[str]) -> bool:
-        """Checks if all search words are present in content."""
-        content = self.get_file_content(filename)
-        return all(word in content for word in search_words)
-
-    def run(self):
+        return all(word in note_name(filename).lower() for word in search_words)
+
+    # --- Tiers ---
+
+    def load_keyword_index(self) -> Optional[KeywordIndex]:
+        """
+        Returns the inverted index, brought up to date with note_stats.
+        Returns None if the index is disabled or cannot be used.
+        """
+        if not self.use_keyword_index:
+            return None
+        try:
+            with self.profiler.stage("keyword_index"):
+                index = self.keyword_index or KeywordIndex(self.base_dir)
+                index = index.sync(self.note_stats, self.get_file_word_counts)
+            self.keyword_index = index
+            return index
+        except Exception as e:
+            self.console.print(f"[yellow]Keyword index unavailable, scanning notes: {e}[/yellow]")
+            return None
+
+    def build_tiers(
+        self, search_string_lower: str, index: Optional[KeywordIndex] = None
+    ) -> List[Tier]:
+        """
+        Returns the result tiers for a search, most relevant first.
+
+        Filename tiers never read note contents. With an index, the exact
+        content tiers are answered from its postings and the substring tiers
+        only fall back to reading contents if the index cannot answer them.
+        """
+        search_words = search_string_lower.split()
+        multi_word = len(search_words) > 1
+        field = self.field_format.format
+
+        # Format message for multi-word search
+        message = ""
+        if multi_word:
+            message = " and ".join([f'"{s}"' for s in search_words])
+
+        if index is not None:
+            exact_filename = index.filename_exact(search_string_lower)
+            check_exact_filename = lambda n: n.filename in exact_filename
+
+            exact_content = index.content_exact(search_string_lower)
+            check_exact_content = lambda n: n.filename in exact_content
+
+            substring_content = index.content_substring(search_string_lower)
+            if substring_content is None:
+                check_substring_content = lambda n: n.contains_all([search_string_lower])
+            else:
+                check_substring_content = lambda n: n.filename in substring_content
+
+            multi_exact_content = index.content_exact_all(search_words)
+            check_multi_exact_content = lambda n: n.filename in multi_exact_content
+
+            word_candidates = [index.content_substring(word) for word in search_words]
+            if any(candidates is None for candidates in word_candidates):
+                check_multi_content = lambda n: n.contains_all(search_words)
+            else:
+                multi_content = set.intersection(*word_candidates) if word_candidates else set()
+                check_multi_content = lambda n: n.filename in multi_content
+        else:
+            check_exact_filename = lambda n: self.check_exact_filename(n.filename, search_string_lower)
+            check_exact_content = lambda n: search_string_lower in n.words
+            check_substring_content = lambda n: n.contains_all([search_string_lower])
+            check_multi_exact_content = lambda n: all(word in n.words for word in search_words)
+            check_multi_content = lambda n: n.contains_all(search_words)
+
+        # 1. Very Exact Filename
+        tiers: List[Tier] = [(
+            f'- "{search_string_lower}" very exact in {field("filename")}',
+            lambda n: self.check_very_exact(n.filename, search_string_lower),
+        )]
+
+        # 2. Exact Word in Filename
+        tiers.append((
+            f'- "{search_string_lower}" exact in {field("filename")}',
+            check_exact_filename,
+        ))
+
+        # 3. Substring in Filename
+        tiers.append((
+            f'- "{search_string_lower}" in {field("filename")}',
+            lambda n: self.check_substring_filename(n.filename, search_string_lower),
+        ))
+
+        # 4. Multi-word in Filename
+        if multi_word:
+            tiers.append((
+                f"- {message} in {field('filename')}",
+                lambda n: self.check_multi_filename(n.filename, search_words),
+            ))
+
+        # Content Searches
+        # 5. Exact Word in Content
+        tiers.append((
+            f'- "{search_string_lower}" exact in {field("content")}',
+            check_exact_content,
+        ))
+
+        # 6. Substring in Content
+        tiers.append((
+            f'- "{search_string_lower}" in {field("content")}',
+            check_substring_content,
+        ))
+
+        if multi_word:
+            # 7. Multi-word Exact in Content
+            tiers.append((
+                f"- {message} exact in {field('content')}",
+                check_multi_exact_content,
+            ))
+
+            # 8. Multi-word in Content
+            tiers.append((
+                f"- {message} in {field('content')}",
+                check_multi_content,
+            ))
+
+        return tiers
+
+    def classify(self, filename: str, tiers: List[Tier]) -> Optional[int]:
+        """Returns the position of the first tier the note matches (None if none)."""
+        return self.classify_many(filename, [tiers])[0]
+
+    def classify_many(self, filename: str, tier_lists: List[List[Tier]]) -> List[Optional[int]]:
+        """Like classify, for the tiers of several searches, reading the note at most once."""
+        check_cancelled(self.cancel_event)
+        note = NoteText(self, filename)
+        positions: List[Optional[int]] = []
+        for tiers in tier_lists:
+            positions.append(next(
+                (position for position, (_, predicate) in enumerate(tiers) if predicate(note)), None
+            ))
+        return positions
+
+    def assign_tiers(self, filenames: List[str], tiers: List[Tier]) -> Dict[str, int]:
+        """
+        Evaluates the tiers in a single pass over the notes.
+
+        Each note is read and split into words at most once; the result maps
+        every matching filename to the position of the first tier it matches.
+        With jobs > 1, notes are evaluated by a pool of threads, which mostly
+        helps on storage with high per-file latency (e.g. synced folders).
+        """
+        if self.jobs > 1:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                positions = list(executor.map(lambda f: self.classify(f, tiers), filenames))
+        else:
+            positions = [self.classify(filename, tiers) for filename in filenames]
+        return {f: p for f, p in zip(filenames, positions) if p is not None}
+
+    def assign_tiers_in_processes(self, filenames: List[str], search_string_lower: str) -> Dict[str, int]:
+        """
+        Like assign_tiers, but reads and tokenizes the notes in a pool of
+        worker processes, so splitting large notes into words uses all cores.
+        """
+        chunk_size = max(1, len(filenames) // (self.jobs * 4))
+        chunks = [filenames[i:i + chunk_size] for i in range(0, len(filenames), chunk_size)]
+        positions: List[Optional[int]] = []
+        # Spawned, not forked, since the caller may run other threads (e.g. the daemon)
+        with ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(_classify_chunk, self.base_dir, self.ending, search_string_lower, chunk)
+                for chunk in chunks
+            ]
+            try:
+                for future in futures:
+                    check_cancelled(self.cancel_event)
+                    positions.extend(future.result())
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return {f: p for f, p in zip(filenames, positions) if p is not None}
+
+    def get_index_manager(self):
+        """Returns the semantic index (Chroma client and embedding model), created on first use."""
+        if self.index_manager is None:
+            from indexer import IndexManager
+            self.index_manager = IndexManager(self.base_dir)
+        # Its stages are reported with ours
+        self.index_manager.profiler = self.profiler
+        return self.index_manager
+
+    def page_output(self):
+        """Context in which keyword results are printed (through the pager if use_pager)."""
+        self.paged = True
+        if not self.use_pager:
+            return nullcontext()
+        return self.console.pager(styles=True)
+
+    def iter_hits(self, search_string: str, limit: Optional[int] = None) -> Iterator[KeywordHit]:
+        """
+        Yields the notes matching a search in ranked order: tier by tier, and
+        by last access within a tier. Stops after limit hits.
+
+        With a limit, the tiers are evaluated one after the other and only
+        until enough hits are found, so a search with enough filename matches
+        never reads note contents. Without one, all notes are classified in a
+        single pass (each note is read at most once) before the first hit.
+        With a limit, the time of a tier's profiler stage includes handling
+        its hits.
+        """
+        search_string_lower = search_string.lower()
+        filenames = self.get_sorted_filenames()
+        index = self.load_keyword_index()
+        with self.profiler.stage("build_tiers"):
+            tiers = self.build_tiers(search_string_lower, index)
+        words = split_words(search_string_lower)
+
+        if limit is None:
+            with self.profiler.stage("classify"):
+                # With an index there is little tokenizing left to spread over processes
+                if self.use_processes and self.jobs > 1 and index is None:
+                    tier_of = self.assign_tiers_in_processes(filenames, search_string_lower)
+                else:
+                    tier_of = self.assign_tiers(filenames, tiers)
+            yield from self.ranked_hits(tiers, tier_of, index, words)
+            return
+
+        found = 0
+        remaining = filenames
+        with ThreadPoolExecutor(max_workers=self.jobs) if self.jobs > 1 else nullcontext() as executor:
+            for position, (header, predicate) in enumerate(tiers):
+                if found >= limit:
+                    return
+                unmatched = []
+                with self.profiler.stage(f"tier {position + 1}"):
+                    for filename, matched in self.evaluate(remaining, predicate, executor):
+                        if not matched:
+                            unmatched.append(filename)
+                            continue
+                        score = None if index is None else index.bm25_scores(words, [filename]).get(filename, 0.0)
+                        yield KeywordHit(position, header, filename, self.note_title(filename), score)
+                        found += 1
+                        if found >= limit:
+                            return
+                remaining = unmatched
+
+    def ranked_hits(
+        self,
+        tiers: List[Tier],
+        tier_of: Dict[str, int],
+        index: Optional[KeywordIndex],
+        words: FrozenSet[str],
+        limit: Optional[int] = None,
+    ) -> List[KeywordHit]:
+        """The best limit hits of a classified search in tier order (tier_of is in last-access order)."""
+        # A stable sort keeps the last-access order within each tier
+        ranked = sorted(tier_of.items(), key=lambda item: item[1])[:limit]
+        scores = index.bm25_scores(words, [filename for filename, _ in ranked]) if index is not None else None
+        return [
+            KeywordHit(position, tiers[position][0], filename, self.note_title(filename),
+                       None if scores is None else scores.get(filename, 0.0))
+            for filename, position in ranked
+        ]
+
+    def search_many(self, search_strings: List[str], limit: Optional[int] = None) -> List[List[KeywordHit]]:
+        """
+        Runs several keyword searches over one listing of the notes, one
+        keyword index sync and a single pass over the notes (each note is
+        read at most once for all searches). Returns the ranked hits of each
+        search, at most limit of them.
+        """
+        filenames = self.get_sorted_filenames()
+        index = self.load_keyword_index()
+        lowered = [search_string.lower() for search_string in search_strings]
+        with self.profiler.stage("build_tiers"):
+            tier_lists = [self.build_tiers(search_string_lower, index) for search_string_lower in lowered]
+
+        with self.profiler.stage("classify"):
+            if self.jobs > 1:
+                with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                    positions = list(executor.map(lambda f: self.classify_many(f, tier_lists), filenames))
+            else:
+                positions = [self.classify_many(filename, tier_lists) for filename in filenames]
+
+        results = []
+        for i, (search_string_lower, tiers) in enumerate(zip(lowered, tier_lists)):
+            tier_of = {f: p[i] for f, p in zip(filenames, positions) if p[i] is not None}
+            results.append(self.ranked_hits(tiers, tier_of, index, split_words(search_string_lower), limit))
+        return results
+
+    def evaluate(
+        self,
+        filenames: List[str],
+        predicate: Callable[[NoteText], bool],
+        executor: Optional[ThreadPoolExecutor] = None,
+    ) -> Iterator[Tuple[str, bool]]:
+        """
+        Yields (filename, whether the note satisfies predicate) in order. With
+        an executor, a small batch of notes is evaluated concurrently at a time,
+        so that stopping early doesn't leave a whole tier being evaluated.
+        """
+        def check(filename: str) -> bool:
+            check_cancelled(self.cancel_event)
+            return predicate(NoteText(self, filename))
+
+        if executor is None:
+            for filename in filenames:
+                yield filename, check(filename)
+            return
+        batch_size = self.jobs * 4
+        for start in range(0, len(filenames), batch_size):
+            batch = filenames[start:start + batch_size]
+            yield from zip(batch, executor.map(check, batch))
+
+    def print_hits(self, hits: Iterator[KeywordHit]):
+        """Prints hits as they come, with the header of each tier above its first hit."""
+        tier = None
+        for hit in hits:
+            if hit.tier != tier:
+                self.console.print(hit.header)
+                tier = hit.tier
+            self.console.print("    " + hit.title)
+
+    def run(self, argv: Optional[List[str]] = None):
         parser = argparse.ArgumentParser(description="Smart Zettelkasten Search")
         parser.add_argument("search_terms", nargs="*", help="Terms to search for")
         parser.add_argument("-s", "--semantic", action="store_true", help="Use semantic search")
-        parser.add_argument("-n", "--limit", type=int, default=DEFAULT_RESULTS, help=f"Number of results to return (default: {DEFAULT_RESULTS})")
+        parser.add_argument("--hybrid", action="store_true", help="Rank notes by combining keyword (BM25) and semantic search")
+        parser.add_argument("-n", "--limit", type=int, default=None, help=f"Number of results to return (default: {DEFAULT_RESULTS}; keyword search: all)")
         parser.add_argument("--reindex", action="store_true", help="Force re-indexing for semantic search")
+        parser.add_argument("--watch", action="store_true", help="Keep the semantic index current by watching the notes for changes")
+        parser.add_argument("-j", "--jobs", type=int, default=None, help=f"Number of notes to search in parallel (default: {SEARCH_JOBS})")
+        parser.add_argument("--processes", action="store_true", help="With --jobs, scan note contents in worker processes instead of threads")
+        parser.add_argument("--daemon", action="store_true", help="Keep indexes and the model loaded and answer `zkss` searches from memory")
+        parser.add_argument("--no-daemon", action="store_true", help="Search in this process even if a daemon is running")
+        parser.add_argument("--stats", action="store_true", help="Print the time, notes read and cache hits of each search stage to stderr")
         
-        args = parser.parse_args()
+        args = parser.parse_args(argv)
+
+        if args.daemon:
+            from zkss_daemon import SearchDaemon
+            SearchDaemon(self.base_dir, self.ending).serve_forever()
+            return
+
+        if args.watch:
+            self.console.print(f"[bold blue]Watching {self.base_dir} for changes (Ctrl-C to stop)...[/bold blue]")
+            from watcher import IndexWatcher
+            try:
+                IndexWatcher(self.get_index_manager()).run()
+            except KeyboardInterrupt:
+                pass
+            return
 
         if args.reindex:
             self.console.print("[bold blue]Forcing semantic index update...[/bold blue]")
-            from indexer import IndexManager
-            indexer = IndexManager(self.base_dir)
+            indexer = self.get_index_manager()
             indexer.update_index(force_reindex=True)
             if not args.search_terms:
                 return
@@ -144,15 +547,31 @@ class ZKSearcher:
             sys.exit()
 
         search_string = " ".join(args.search_terms)
+        try:
+            with self.profiler.stage("total"):
+                self.search(args, search_string)
+        finally:
+            if args.stats:
+                self.print_stats()
+
+    def print_stats(self):
+        """Prints the profiler's stages to stderr (with the results on stdout)."""
+        Console(stderr=True).print(self.profiler.table())
+
+    def search(self, args: argparse.Namespace, search_string: str):
+        """Runs the search selected by the command line arguments and prints the results."""
+        # Keyword search lists all matches unless limited
+        ranked_limit = DEFAULT_RESULTS if args.limit is None else args.limit
         
         if args.semantic:
             self.console.print(f"[bold blue]Performing Semantic Search for: '{search_string}'[/bold blue]")
             try:
-                from indexer import IndexManager
-                indexer = IndexManager(self.base_dir)
-                indexer.update_index() # Incremental update
+                indexer = self.get_index_manager()
+                # Incremental update, unless a running `zkss --watch` keeps the index current
+                if not indexer.watched_elsewhere():
+                    indexer.update_index()
                 
-                results = indexer.search(search_string, n_results=args.limit)
+                results = indexer.search(search_string, n_results=ranked_limit)
                 
                 self.console.print(f"[green]Found {len(results)} relevant notes:[/green]")
                 for filename in results:
@@ -166,77 +585,48 @@ class ZKSearcher:
                  self.console.print(f"[red]Semantic search error: {e}[/red]")
                  sys.exit(1)
 
+        if args.hybrid:
+            self.console.print(f"[bold blue]Performing Hybrid Search for: '{search_string}'[/bold blue]")
+            try:
+                from hybrid import HybridSearcher, format_timings
+                indexer = self.get_index_manager()
+                hybrid = HybridSearcher(
+                    indexer, self.base_dir, self.ending, keyword_index=self.keyword_index, profiler=self.profiler
+                )
+                result = hybrid.search(search_string, limit=ranked_limit, update_index=not indexer.watched_elsewhere())
+                self.keyword_index = hybrid.keyword_index
+
+                self.console.print(f"[green]Found {len(result.filenames)} relevant notes:[/green]")
+                for filename in result.filenames:
+                    self.console.print("    " + self.strip_ending(filename))
+                self.console.print(f"[dim]{format_timings(result.timings)}[/dim]")
+                return
+            except ImportError:
+                self.console.print("[red]Error: Semantic search dependencies not installed. Run `pip install -r requirements.txt`[/red]")
+                sys.exit(1)
+            except Exception as e:
+                self.console.print(f"[red]Hybrid search error: {e}[/red]")
+                sys.exit(1)
+
         # --- Standard Keyword Search ---
-        search_string_lower = search_string.lower()
-        search_words = search_string_lower.split()
-        len_search_string = len(search_words)
-        
-        # Format message for multi-word search
-        message = ""
-        if len_search_string > 1:
-             message = " and ".join([f'"{s}"' for s in search_words])
+        if args.jobs is not None:
+            self.jobs = max(1, args.jobs)
+        if args.processes:
+            self.use_processes = True
 
-        filenames = self.get_sorted_filenames()
+        hits = self.iter_hits(search_string, limit=args.limit)
+        with self.page_output():
+            self.print_hits(hits)
 
-        with self.console.pager(styles=True):
-            # 1. Very Exact Filename
-            filenames = self.filter_and_print(
-                filenames,
-                lambda f: self.check_very_exact(f, search_string_lower),
-                f'- "{search_string_lower}" very exact in [yellow]filename:',
-            )
-
-            # 2. Exact Word in Filename
-            filenames = self.filter_and_print(
-                filenames,
-                lambda f: self.check_exact_filename(f, search_string_lower),
-                f'- "{search_string_lower}" exact in [yellow]filename:',
-            )
-
-            # 3. Substring in Filename
-            filenames = self.filter_and_print(
-                filenames,
-                lambda f: self.check_substring_filename(f, search_string_lower),
-                f'- "{search_string_lower}" in [yellow]filename:',
-            )
-
-            # 4. Multi-word in Filename
-            if len_search_string > 1:
-                filenames = self.filter_and_print(
-                    filenames,
-                    lambda f: self.check_multi_filename(f, search_words),
-                    f"- {message} in [yellow]filename:",
-                )
 
-            # Content Searches
-            # 5. Exact Word in Content
-            filenames = self.filter_and_print(
-                filenames,
-                lambda f: self.check_exact_content(f, search_string_lower),
-                f'- "{search_string_lower}" exact in [yellow]content:',
-            )
-
-            # 6. Substring in Content
-            filenames = self.filter_and_print(
-                filenames,
-                lambda f: self.check_substring_content(f, search_string_lower),
-                f'- "{search_string_lower}" in [yellow]content:',
-            )
-
-            if len_search_string > 1:
-                # 7. Multi-word Exact in Content
-                filenames = self.filter_and_print(
-                    filenames,
-                    lambda f: self.check_multi_exact_content(f, search_words),
-                    f"- {message} exact in [yellow]content:",
-                )
+def _classify_chunk(
+    base_dir: str, ending: str, search_string_lower: str, filenames: List[str]
+) -> List[Optional[int]]:
+    """Process pool worker for assign_tiers_in_processes()."""
+    searcher = ZKSearcher(base_dir, ending, use_keyword_index=False, jobs=1)
+    tiers = searcher.build_tiers(search_string_lower)
+    return [searcher.classify(filename, tiers) for filename in filenames]
 
-                # 8. Multi-word in Content
-                filenames = self.filter_and_print(
-                    filenames,
-                    lambda f: self.check_multi_content(f, search_words),
-                    f"- {message} in [yellow]content:",
-                )
 
 def main():
     searcher = ZKSearcher()
@@ -0,0 +1,259 @@
+"""
+Resident search daemon for zkss, and the `zkss` command itself.
+
+`zkss --daemon` keeps the keyword index, the note cache and (after the first
+semantic search) the embedding model in memory and answers searches sent to
+a Unix socket. The `zkss` command (main() below) only needs the standard
+library to forward its arguments there and print the reply; if no daemon is
+running, it imports zkss and searches in-process as before.
+"""
+import io
+import os
+import sys
+import json
+import socket
+from contextlib import redirect_stderr, redirect_stdout
+from typing import List, Optional
+
+from settings import ZK_BASE_DIR, ENDING, USE_DAEMON, DAEMON_SOCKET
+
+PROTOCOL_VERSION = 1
+# Commands that have to run in the calling process
+IN_PROCESS_OPTIONS = {"--daemon", "--watch", "--no-daemon"}
+# A daemon that doesn't accept within this time is treated as not running
+CONNECT_TIMEOUT = 0.5
+
+
+# --- Client ---
+
+def _color_system() -> Optional[str]:
+    """The colors of the calling terminal, as rich names them (None = no colors)."""
+    if not sys.stdout.isatty() or "NO_COLOR" in os.environ or os.environ.get("TERM") == "dumb":
+        return None
+    if os.environ.get("COLORTERM", "").lower() in ("truecolor", "24bit"):
+        return "truecolor"
+    if "256" in os.environ.get("TERM", ""):
+        return "256"
+    return "standard"
+
+
+def _terminal_width() -> Optional[int]:
+    try:
+        return os.get_terminal_size(sys.stdout.fileno()).columns
+    except (OSError, ValueError):
+        return None
+
+
+def forward(argv: List[str], socket_path: str = DAEMON_SOCKET, base_dir: str = ZK_BASE_DIR) -> Optional[dict]:
+    """
+    Runs a search in the daemon. Returns its reply (captured stdout and
+    stderr, exit code), or None if no daemon is running for base_dir.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    request = {
+        "version": PROTOCOL_VERSION,
+        "base_dir": base_dir,
+        "argv": list(argv),
+        "terminal": sys.stdout.isatty(),
+        "color_system": _color_system(),
+        "width": _terminal_width(),
+    }
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(os.path.expanduser(socket_path))
+            # Searches (and index updates) take as long as they take
+            sock.settimeout(None)
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reply:
+                response = json.loads(reply.readline())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(response, dict) or "error" in response:
+        return None
+    return response
+
+
+def show(response: dict) -> int:
+    """Prints a reply of the daemon like the search would have. Returns its exit code."""
+    sys.stderr.write(response["stderr"])
+    sys.stderr.flush()
+    if response["page"] and sys.stdout.isatty():
+        # What rich's pager does for the in-process search
+        import pydoc
+
+        pydoc.pager(response["stdout"])
+    else:
+        sys.stdout.write(response["stdout"])
+        sys.stdout.flush()
+    return response["exit_code"]
+
+
+def main(argv: Optional[List[str]] = None):
+    """Entry point of the `zkss` command."""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if USE_DAEMON and not IN_PROCESS_OPTIONS.intersection(argv):
+        response = forward(argv)
+        if response is not None:
+            sys.exit(show(response))
+
+    from zkss import ZKSearcher
+
+    ZKSearcher().run(argv)
+
+
+# --- Daemon ---
+
+def _exit_code(code) -> int:
+    """The exit status of a process ending with SystemExit(code)."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+class SearchDaemon:
+    """
+    Serves `zkss` searches from one long-running process.
+
+    Every request is run by a fresh ZKSearcher (so options like --jobs don't
+    carry over), which is handed the keyword index and IndexManager kept
+    from earlier requests. Its output is captured and sent back with the
+    exit code. Requests are answered one at a time.
+    """
+
+    def __init__(self, base_dir: str = ZK_BASE_DIR, ending: str = ENDING, socket_path: str = DAEMON_SOCKET):
+        from rich.console import Console
+
+        self.base_dir = base_dir
+        self.ending = ending
+        self.socket_path = os.path.expanduser(socket_path)
+        self.console = Console(stderr=True)
+        self.keyword_index = None
+        self.index_manager = None
+        self.requests = 0
+        self._server = None
+
+    def handle(self, request: dict) -> dict:
+        """Runs one search and returns the reply for the client."""
+        from rich.console import Console
+        from zkss import ZKSearcher
+
+        if request.get("version") != PROTOCOL_VERSION:
+            return {"error": f"Unsupported protocol version: {request.get('version')}"}
+        if request.get("base_dir") != self.base_dir:
+            return {"error": f"This daemon searches {self.base_dir}"}
+        argv = request.get("argv", [])
+        if IN_PROCESS_OPTIONS.intersection(argv):
+            return {"error": f"Not available through the daemon: {' '.join(argv)}"}
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        searcher = ZKSearcher(self.base_dir, self.ending)
+        # The client pages the output
+        searcher.use_pager = False
+        searcher.console = Console(
+            file=stdout,
+            force_terminal=request.get("terminal", False),
+            color_system=request.get("color_system"),
+            width=request.get("width"),
+        )
+        searcher.keyword_index = self.keyword_index
+        searcher.index_manager = self.index_manager
+
+        exit_code = 0
+        # Also captures argparse errors and the IndexManager's progress output
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                searcher.run(argv)
+            except SystemExit as e:
+                exit_code = _exit_code(e.code)
+            except Exception as e:
+                print(f"Search failed: {e}", file=sys.stderr)
+                exit_code = 1
+
+        self.keyword_index = searcher.keyword_index
+        self.index_manager = searcher.index_manager
+        self.requests += 1
+        return {
+            "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue(),
+            "exit_code": exit_code,
+            "page": searcher.paged,
+        }
+
+    def _running_elsewhere(self) -> bool:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(CONNECT_TIMEOUT)
+                sock.connect(self.socket_path)
+            return True
+        except OSError:
+            return False
+
+    def start(self):
+        """Binds the socket (readable by the current user only). Returns False if another daemon has it."""
+        import socketserver
+
+        if self._running_elsewhere():
+            return False
+        if os.path.exists(self.socket_path):
+            # Left behind by a daemon that didn't shut down cleanly
+            os.remove(self.socket_path)
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline())
+                except ValueError:
+                    return
+                response = daemon.handle(request)
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.UnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(old_umask)
+        return True
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.server_close()
+        self._server = None
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
+
+    def serve_forever(self):
+        """Answers searches until interrupted (Ctrl-C)."""
+        if not hasattr(socket, "AF_UNIX"):
+            self.console.print("[red]The daemon needs Unix domain sockets, which this platform doesn't support.[/red]")
+            sys.exit(1)
+        if not self.start():
+            self.console.print(f"[yellow]A zkss daemon is already listening on {self.socket_path}.[/yellow]")
+            sys.exit(1)
+        self.console.print(
+            f"[bold blue]Serving searches of {self.base_dir} on {self.socket_path} (Ctrl-C to stop)...[/bold blue]"
+        )
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def shutdown(self):
+        """Makes serve_forever() return (from another thread)."""
+        if self._server is not None:
+            self._server.shutdown()
+
+
+if __name__ == "__main__":
+    main()